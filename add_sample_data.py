@@ -9,6 +9,20 @@ import json
 BACKEND_URL = "http://localhost:8001"
 API_BASE = f"{BACKEND_URL}/api"
 
+def add_bulk(path, items, label):
+    """Create all items in one request through the bulk endpoint"""
+    response = requests.post(f"{API_BASE}/{path}/bulk", json=items)
+    if response.status_code != 200:
+        print(f"❌ Failed to add {label}: {response.text}")
+        return None
+
+    result = response.json()
+    for item in result["results"]:
+        if item["status"] != "created":
+            print(f"❌ Failed to add {label} #{item['index']}: {item.get('error') or item['status']}")
+    print(f"✅ Added {result['inserted']} sample {label}")
+    return result
+
 def add_sample_project():
     project_data = {
         "title": "AI-Powered Chatbot",
@@ -21,13 +35,7 @@ def add_sample_project():
         "featured": True
     }
     
-    response = requests.post(f"{API_BASE}/projects", json=project_data)
-    if response.status_code == 200:
-        print("✅ Added sample project")
-        return response.json()
-    else:
-        print(f"❌ Failed to add project: {response.text}")
-        return None
+    return add_bulk("projects", [project_data], "projects")
 
 def add_sample_certification():
     cert_data = {
@@ -39,13 +47,7 @@ def add_sample_certification():
         "badge_url": "https://images.unsplash.com/photo-1507003211169-0a1dd7228f2d?w=100&q=80"
     }
     
-    response = requests.post(f"{API_BASE}/certifications", json=cert_data)
-    if response.status_code == 200:
-        print("✅ Added sample certification")
-        return response.json()
-    else:
-        print(f"❌ Failed to add certification: {response.text}")
-        return None
+    return add_bulk("certifications", [cert_data], "certifications")
 
 def add_sample_artwork():
     artwork_data = {
@@ -57,13 +59,7 @@ def add_sample_artwork():
         "year_created": "2024"
     }
     
-    response = requests.post(f"{API_BASE}/artwork", json=artwork_data)
-    if response.status_code == 200:
-        print("✅ Added sample artwork")
-        return response.json()
-    else:
-        print(f"❌ Failed to add artwork: {response.text}")
-        return None
+    return add_bulk("artwork", [artwork_data], "artwork")
 
 if __name__ == "__main__":
     print("🚀 Adding sample data to portfolio...")
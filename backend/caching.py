@@ -0,0 +1,204 @@
+"""Response caching and the content versions that invalidate it across workers"""
+
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from pymongo import ReturnDocument
+
+if TYPE_CHECKING:
+    from services import Services
+
+logger = logging.getLogger("portfolio")
+
+class ResponseCache:
+    """Bounded LRU cache with a TTL, invalidated per collection by the write handlers"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[Tuple[str, Any], Tuple[float, Any]]" = OrderedDict()
+        # Bumped on every invalidation so a read that raced a write never stores stale data
+        self.generations: Dict[str, int] = {}
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    async def get_or_load(self, namespace: str, key: Any, loader):
+        """Return the cached value for (namespace, key), calling `loader()` on a miss"""
+        entry_key = (namespace, key)
+        entry = self.entries.get(entry_key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.entries.move_to_end(entry_key)
+            self.stats["hits"] += 1
+            return entry[1]
+
+        self.stats["misses"] += 1
+        generation = self.generations.get(namespace, 0)
+        value = await loader()
+        if self.max_entries > 0 and generation == self.generations.get(namespace, 0):
+            self.entries[entry_key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(entry_key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return value
+
+    def invalidate(self, namespace: str):
+        """Drop every entry cached for a collection"""
+        self.generations[namespace] = self.generations.get(namespace, 0) + 1
+        for entry_key in [k for k in self.entries if k[0] == namespace]:
+            del self.entries[entry_key]
+        self.stats["invalidations"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "size": len(self.entries), "max_entries": self.max_entries, "ttl_seconds": self.ttl}
+
+class ContentVersions:
+    """Per-collection version counters and last write times, used for ETag/Last-Modified"""
+
+    def __init__(self):
+        # Part of every ETag so counters restarting at 0 after a reboot never match old tags
+        self.boot_id = uuid.uuid4().hex[:12]
+        self.started = datetime.now(timezone.utc).replace(microsecond=0)
+        self.versions: Dict[str, Tuple[str, int]] = {}  # name -> (epoch, version)
+        self.modified: Dict[str, datetime] = {}
+
+    def bump(self, name: str):
+        """Local-only bump, used when the shared version document cannot be updated"""
+        epoch, version = self.versions.get(name, (self.boot_id, 0))
+        self.versions[name] = (epoch, version + 1)
+        self.modified[name] = datetime.now(timezone.utc).replace(microsecond=0)
+
+    def apply(self, name: str, epoch: str, version: int, modified: Optional[datetime]) -> bool:
+        """Adopt a version published by any worker, returning True if it differs from ours"""
+        if self.versions.get(name) == (epoch, version):
+            return False
+        self.versions[name] = (epoch, version)
+        if modified is not None:
+            self.modified[name] = modified.replace(tzinfo=timezone.utc, microsecond=0)
+        return True
+
+    def etag(self, name: str) -> str:
+        epoch, version = self.versions.get(name, (self.boot_id, 0))
+        return f'"{name}-{epoch}-{version}"'
+
+    def last_modified(self, name: str) -> datetime:
+        return self.modified.get(name, self.started)
+
+class InvalidationChannel:
+    """Follows the shared content versions (change stream or polling) and drops cached reads that moved"""
+
+    def __init__(self, services: "Services", poll_interval: float):
+        self.services = services
+        self.collection = services.database.content_versions
+        self.poll_interval = poll_interval
+        self.mode = "stopped"
+        self.task: Optional[asyncio.Task] = None
+
+    async def publish(self, name: str):
+        content_versions = self.services.content_versions
+        now = datetime.utcnow()
+        try:
+            doc = await self.collection.find_one_and_update(
+                {"_id": name},
+                {"$inc": {"version": 1}, "$set": {"modified": now}, "$setOnInsert": {"epoch": uuid.uuid4().hex[:12]}},
+                upsert=True, return_document=ReturnDocument.AFTER)
+            content_versions.apply(name, doc["epoch"], doc["version"], doc["modified"])
+        except Exception as e:
+            logger.warning("Could not publish %s change to other workers: %s", name, e)
+            content_versions.bump(name)
+
+    async def ensure(self, names):
+        """Create missing version documents, so every worker builds ETags from the same shared epoch"""
+        now = datetime.utcnow()
+        for name in names:
+            doc = await self.collection.find_one_and_update(
+                {"_id": name},
+                {"$setOnInsert": {"epoch": uuid.uuid4().hex[:12], "version": 0, "modified": now}},
+                upsert=True, return_document=ReturnDocument.AFTER)
+            self.receive(doc)
+
+    def receive(self, doc: Dict[str, Any]):
+        name = doc["_id"]
+        if self.services.content_versions.apply(name, doc.get("epoch", ""), doc.get("version", 0), doc.get("modified")):
+            self.services.drop_cached(name)
+
+    async def sync(self):
+        for doc in await self.collection.find():
+            self.receive(doc)
+
+    async def run(self):
+        try:
+            await self.sync()
+            await self.follow_change_stream()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info("Change streams unavailable (%s), polling content versions every %ss", e, self.poll_interval)
+        self.mode = "polling"
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning("Content version poll failed: %s", e)
+
+    async def follow_change_stream(self):
+        run_blocking = self.services.database.run_blocking
+        stream = await run_blocking(self.collection.collection.watch,
+                                    full_document="updateLookup", max_await_time_ms=1000)
+        self.mode = "change_stream"
+        try:
+            while True:
+                change = await run_blocking(stream.try_next)
+                if change and change.get("fullDocument"):
+                    self.receive(change["fullDocument"])
+        finally:
+            await run_blocking(stream.close)
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        self.mode = "stopped"
+
+def conditional_get(request: Request, response: Response, *names: str) -> Optional[Response]:
+    """Set validators for one or more collections and return a 304 if the client's copy is current"""
+    content_versions = request.app.state.services.content_versions
+    if len(names) == 1:
+        etag = content_versions.etag(names[0])
+    else:
+        combined = "".join(content_versions.etag(name) for name in names).encode()
+        etag = f'"{"+".join(names)}-{hashlib.sha1(combined).hexdigest()[:16]}"'
+    last_modified = max(content_versions.last_modified(name) for name in names)
+    headers = {"ETag": etag, "Last-Modified": format_datetime(last_modified, usegmt=True), "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+    else:
+        fresh = False
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                fresh = last_modified <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                fresh = False
+
+    if fresh:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,143 @@
+"""Negotiated br/zstd/gzip response compression"""
+
+import gzip
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+from starlette.datastructures import Headers
+
+from settings import BROTLI_QUALITY, GZIP_LEVEL, ZSTD_LEVEL
+from metrics import metrics
+from encoding import optional_import
+from caching import ResponseCache
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/plain", "text/html")
+
+def available_encodings(preference: str) -> List[str]:
+    installed = {"br": optional_import("brotli") is not None, "zstd": optional_import("zstandard") is not None,
+                 "gzip": True}
+    return [name for name in (e.strip() for e in preference.split(",")) if installed.get(name)]
+
+def negotiate_encoding(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """Pick the client's highest-q encoding, breaking ties by our order of preference"""
+    weights: Dict[str, float] = {}
+    for token in accept_encoding.split(","):
+        name, _, params = token.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    ranked = [(weights.get(name, weights.get("*", 0.0)), -index, name) for index, name in enumerate(encodings)]
+    best = max(ranked, default=None)
+    return best[2] if best and best[0] > 0 else None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return optional_import("brotli").compress(body, quality=BROTLI_QUALITY)
+    if encoding == "zstd":
+        return optional_import("zstandard").ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+class StreamCompressor:
+    """Incremental compressor for streamed bodies, flushed after every chunk so clients see it promptly"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = optional_import("brotli").Compressor(quality=BROTLI_QUALITY)
+        elif encoding == "zstd":
+            self.compressor = optional_import("zstandard").ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        else:
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.process(data) + self.compressor.flush()
+        if self.encoding == "zstd":
+            return self.compressor.compress(data) + self.compressor.flush(optional_import("zstandard").COMPRESSOBJ_FLUSH_BLOCK)
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+class CompressionMiddleware:
+    """Negotiated br/zstd/gzip compression, cached per URI and ETag for versioned GETs"""
+
+    def __init__(self, app, minimum_size: int, encodings: List[str], cache: ResponseCache):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = encodings
+        # Keyed by URI and ETag, so an entry can never outlive the content it was compressed from
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.encodings:
+            return await self.app(scope, receive, send)
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start: Optional[Dict[str, Any]] = None
+        streamer: Optional[StreamCompressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, streamer, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                content_type = headers.get("content-type", "")
+                if "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    return await send(message)
+                start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                response_start, start = start, None
+                headers = [(k, v) for k, v in response_start.get("headers", []) if k.lower() != b"content-length"]
+                headers.append((b"vary", b"Accept-Encoding"))
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send({**response_start, "headers": headers + [(b"content-length", str(len(body)).encode())]})
+                    return await send(message)
+                headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    compressed = await self.compress_once(scope, response_start, body, encoding)
+                    await send({**response_start, "headers": headers + [(b"content-length", str(len(compressed)).encode())]})
+                    return await send({"type": "http.response.body", "body": compressed})
+                streamer = StreamCompressor(encoding)
+                await send({**response_start, "headers": headers})
+            # Streamed body (NDJSON export and the like)
+            metrics.inc("portfolio_compression_bytes_total", {"encoding": encoding, "stage": "in"}, len(body))
+            data = streamer.chunk(body) if body else b""
+            if not more_body:
+                data += streamer.finish()
+            metrics.inc("portfolio_compression_bytes_total", {"encoding": encoding, "stage": "out"}, len(data))
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def compress_once(self, scope, response_start, body: bytes, encoding: str) -> bytes:
+        async def load() -> bytes:
+            started = time.perf_counter()
+            compressed = compress(body, encoding)
+            metrics.observe("portfolio_compression_seconds", {"encoding": encoding}, time.perf_counter() - started)
+            metrics.inc("portfolio_compression_bytes_total", {"encoding": encoding, "stage": "in"}, len(body))
+            metrics.inc("portfolio_compression_bytes_total", {"encoding": encoding, "stage": "out"}, len(compressed))
+            return compressed
+
+        etag = Headers(raw=response_start.get("headers", [])).get("etag")
+        if scope["method"] != "GET" or response_start["status"] != 200 or etag is None:
+            return await load()
+        key = (scope["path"], scope.get("query_string", b""), etag)
+        return await self.cache.get_or_load(encoding, key, load)
@@ -0,0 +1,99 @@
+"""Buffered contact message ingest, flushed to the database in batches"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from pymongo.errors import BulkWriteError
+
+if TYPE_CHECKING:
+    from services import Services
+
+logger = logging.getLogger("portfolio")
+
+class ContactIngestQueue:
+    """Write-behind buffer for contact messages, flushed to Mongo in insert_many batches"""
+
+    def __init__(self, services: "Services", max_size: int, batch_size: int, flush_interval: float,
+                 drain_timeout: float):
+        self.services = services
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drain_timeout = drain_timeout
+        self.pending: deque = deque()
+        self.wakeup = asyncio.Event()
+        self.closing = False
+        self.task: Optional[asyncio.Task] = None
+        self.stats = {"enqueued": 0, "flushed": 0, "rejected": 0, "batches": 0, "failed_writes": 0, "flush_errors": 0}
+
+    def put(self, document: Dict[str, Any]) -> bool:
+        """Buffer a message, returning False when the queue is full"""
+        if self.closing or len(self.pending) >= self.max_size:
+            self.stats["rejected"] += 1
+            return False
+        self.pending.append(document)
+        self.stats["enqueued"] += 1
+        if len(self.pending) >= self.batch_size:
+            self.wakeup.set()
+        return True
+
+    def start(self):
+        self.closing = False
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def run(self):
+        while not self.closing:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Write everything pending; on a database error the batch is requeued for the next tick"""
+        while self.pending:
+            batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+            try:
+                await self.services.database.contact.insert_many(batch, ordered=False)
+                self.stats["flushed"] += len(batch)
+                written = batch
+            except BulkWriteError as e:
+                # Individual bad documents are dropped; the rest of the batch was written
+                self.stats["flushed"] += e.details.get("nInserted", 0)
+                self.stats["failed_writes"] += len(e.details.get("writeErrors", []))
+                failed = {error["index"] for error in e.details.get("writeErrors", [])}
+                logger.warning("Dropped %d contact messages the database rejected", len(failed))
+                written = [doc for index, doc in enumerate(batch) if index not in failed]
+            except Exception as e:
+                self.pending.extendleft(reversed(batch))
+                self.stats["flush_errors"] += 1
+                logger.warning("Contact flush failed, %d messages requeued: %s", len(self.pending), e)
+                return
+            self.stats["batches"] += 1
+            self.services.event_stream.publish("contact", "created", written)
+
+    async def stop(self):
+        """Stop accepting messages and drain the queue"""
+        self.closing = True
+        self.wakeup.set()
+        if self.task:
+            await self.task
+            self.task = None
+        await self.flush()
+        # Messages were acknowledged with 200, so keep retrying a failing database for a while
+        deadline = time.monotonic() + self.drain_timeout
+        while self.pending and time.monotonic() < deadline:
+            await asyncio.sleep(min(self.flush_interval, max(0.0, deadline - time.monotonic())))
+            await self.flush()
+        if self.pending:
+            logger.error("Shutting down with %d contact messages not written", len(self.pending))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "depth": len(self.pending), "max_size": self.max_size,
+                "batch_size": self.batch_size, "flush_interval": self.flush_interval,
+                "drain_timeout": self.drain_timeout}
@@ -0,0 +1,320 @@
+"""The database connection, awaitable collections and the indexes ensured at startup"""
+
+import asyncio
+import contextvars
+import functools
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, TEXT, MongoClient, ReadPreference
+from pymongo.collection import Collection
+
+from settings import DB_THREAD_POOL_SIZE, EVENTS_RETENTION, MONGO_COMPRESSORS, MONGO_LIST_READ_PREFERENCE, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_TLS, MONGO_WAIT_QUEUE_TIMEOUT_MS, Settings
+from metrics import command_metrics
+
+logger = logging.getLogger("portfolio")
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+def mongo_client_options(mongo_url: str) -> Dict[str, Any]:
+    """MongoClient keyword arguments built from the MONGO_* settings"""
+    options: Dict[str, Any] = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "event_listeners": [command_metrics],
+    }
+    if MONGO_WAIT_QUEUE_TIMEOUT_MS:
+        options["waitQueueTimeoutMS"] = int(MONGO_WAIT_QUEUE_TIMEOUT_MS)
+    if MONGO_COMPRESSORS:
+        options["compressors"] = MONGO_COMPRESSORS
+    if MONGO_TLS == "true" or (MONGO_TLS == "auto" and mongo_url.startswith("mongodb+srv://")):
+        import certifi  # only needed for TLS, so plain deployments do not pay for the import
+
+        options["tls"] = True
+        options["tlsCAFile"] = certifi.where()
+    return options
+
+if MONGO_LIST_READ_PREFERENCE not in READ_PREFERENCES:
+    raise ValueError(f"MONGO_LIST_READ_PREFERENCE must be one of {', '.join(READ_PREFERENCES)}")
+
+def open_database(settings: Settings):
+    """(Mongo client or None, database) for the configured backend; embedded stores mimic pymongo collections"""
+    backend = settings.storage_backend
+    if backend == "mongo":
+        mongo = MongoClient(settings.mongo_url, **mongo_client_options(settings.mongo_url))
+        return mongo, mongo[settings.mongo_db_name]
+    if backend in ("sqlite", "memory"):
+        from storage import MemoryStore, SQLiteStore
+
+        return None, SQLiteStore(settings.sqlite_path) if backend == "sqlite" else MemoryStore()
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}")
+
+class Database:
+    """One app's connection, opened on first use, with blocking calls run on its own thread pool"""
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.pool_size = DB_THREAD_POOL_SIZE
+        self.client = None
+        self.db = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.lock = threading.Lock()
+        # "<collection>.<index>" -> "pending" | "ready" | "failed: <reason>"
+        self.index_status: Dict[str, str] = {}
+        list_reads = READ_PREFERENCES[MONGO_LIST_READ_PREFERENCE]
+        self.projects = AsyncCollection(self, "projects", list_reads)
+        self.certifications = AsyncCollection(self, "certifications", list_reads)
+        self.artwork = AsyncCollection(self, "artwork", list_reads)
+        self.about = AsyncCollection(self, "about")
+        self.contact = AsyncCollection(self, "contact", list_reads)
+        # One document per content collection: {_id: name, epoch, version, modified}, shared by all workers
+        self.content_versions = AsyncCollection(self, "content_versions")
+        # Shared rate limit state (RATE_LIMIT_SHARED): {_id: "<route>|<client>", tat, expires_at} and contact fingerprints
+        self.rate_limits = AsyncCollection(self, "rate_limits")
+        # Precomputed statistics: {_id: collection, total, latest, facets: {facet: {value: count}}}
+        self.stats = AsyncCollection(self, "stats")
+        # Write events for /api/events: {seq, topic, action, data, created_at}, numbered by the {_id: "sequence"} counter
+        self.events = AsyncCollection(self, "events")
+        # Uploaded images: {id, sha256, filename, content_type, size, width, height, blurhash, created_at}
+        self.media = AsyncCollection(self, "media")
+        self.collections = {collection.name: collection for collection in (
+            self.projects, self.certifications, self.artwork, self.about, self.contact, self.content_versions,
+            self.rate_limits, self.stats, self.events, self.media)}
+
+    def connect(self):
+        """The configured database, connecting on the first call"""
+        with self.lock:
+            if self.db is None:
+                self.client, self.db = open_database(self.settings)
+            return self.db
+
+    def attach(self, db, client=None):
+        """Use an already opened database (a pymongo or mongomock database, or an embedded store)"""
+        with self.lock:
+            self.client, self.db = client, db
+        for collection in self.collections.values():
+            collection.unbind()
+
+    def close(self):
+        """Finish queued calls and close the connections; the next use reconnects"""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        with self.lock:
+            if self.client is not None:
+                self.client.close()
+            elif self.db is not None and hasattr(self.db, "close"):
+                self.db.close()
+            self.client, self.db = None, None
+        for collection in self.collections.values():
+            collection.unbind()
+
+    def ping(self):
+        database = self.connect()
+        return self.client.admin.command('ping') if self.client is not None else database.ping()
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """Run a blocking database (or file) call on the thread pool"""
+        if self.executor is None:
+            with self.lock:
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="mongo")
+        loop = asyncio.get_running_loop()
+        # Copy the context so the command listener can attribute queries to the current request
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, functools.partial(context.run, func, *args, **kwargs))
+
+    async def ensure_indexes(self):
+        """Create any missing indexes declared in INDEXES, recording the outcome of each"""
+        async def build(collection, spec):
+            key = f"{collection.name}.{spec['name']}"
+            self.index_status[key] = "pending"
+            try:
+                options = {k: v for k, v in spec.items() if k != "keys"}
+                await collection.create_index(spec["keys"], **options)
+                self.index_status[key] = "ready"
+            except Exception as e:
+                self.index_status[key] = f"failed: {e}"
+
+        await asyncio.gather(*(build(self.collections[name], spec)
+                               for name, specs in INDEXES.items() for spec in specs))
+
+class AsyncCollection:
+    """Awaitable wrapper around a pymongo collection"""
+
+    def __init__(self, database: Database, name: str, read_preference=None):
+        self.database = database
+        self.name = name
+        self.read_preference = read_preference
+        self.bound: Optional[Collection] = None
+        self.read_view: Optional[Collection] = None
+
+    @property
+    def collection(self) -> Collection:
+        # Bound to the database on first use
+        if self.bound is None:
+            self.bound = self.database.connect()[self.name]
+        return self.bound
+
+    @property
+    def reads(self) -> Collection:
+        # Uncached list and export reads may be routed to secondaries; everything else uses the primary
+        if self.read_view is None:
+            collection = self.collection
+            self.read_view = collection.with_options(read_preference=self.read_preference) if self.read_preference else collection
+        return self.read_view
+
+    def unbind(self):
+        self.bound = self.read_view = None
+
+    async def find(self, filter_query: Optional[Dict[str, Any]] = None, sort: Optional[List] = None,
+                   limit: int = 0, projection: Optional[Dict[str, Any]] = None,
+                   primary: bool = False) -> List[Dict[str, Any]]:
+        def query():
+            cursor = (self.collection if primary else self.reads).find(filter_query or {}, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            if limit:
+                cursor = cursor.limit(limit)
+            return list(cursor)
+        return await self.database.run_blocking(query)
+
+    async def iterate(self, filter_query: Optional[Dict[str, Any]] = None, sort: Optional[List] = None,
+                      batch_size: int = 500, projection: Optional[Dict[str, Any]] = None):
+        """Yield lists of documents from one cursor, fetching each batch on the DB pool"""
+        def open_cursor():
+            cursor = self.reads.find(filter_query or {}, projection, batch_size=batch_size)
+            return cursor.sort(sort) if sort else cursor
+
+        run_blocking = self.database.run_blocking
+        cursor = await run_blocking(open_cursor)
+        try:
+            while True:
+                batch = await run_blocking(lambda: list(itertools.islice(cursor, batch_size)))
+                if not batch:
+                    break
+                yield batch
+        finally:
+            await run_blocking(cursor.close)
+
+    async def find_one(self, filter_query: Optional[Dict[str, Any]] = None, *args, **kwargs):
+        return await self.database.run_blocking(self.collection.find_one, filter_query or {}, *args, **kwargs)
+
+    async def insert_one(self, document: Dict[str, Any]):
+        return await self.database.run_blocking(self.collection.insert_one, document)
+
+    async def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True):
+        return await self.database.run_blocking(self.collection.insert_many, documents, ordered=ordered)
+
+    async def find_one_and_update(self, filter_query: Dict[str, Any], update: Dict[str, Any], **kwargs):
+        return await self.database.run_blocking(self.collection.find_one_and_update, filter_query, update, **kwargs)
+
+    async def replace_one(self, filter_query: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False):
+        return await self.database.run_blocking(self.collection.replace_one, filter_query, replacement, upsert=upsert)
+
+    async def aggregate(self, pipeline: List[Dict[str, Any]], primary: bool = False) -> List[Dict[str, Any]]:
+        return await self.database.run_blocking(
+            lambda: list((self.collection if primary else self.reads).aggregate(pipeline)))
+
+    async def count_documents(self, filter_query: Optional[Dict[str, Any]] = None) -> int:
+        return await self.database.run_blocking(self.collection.count_documents, filter_query or {})
+
+    async def create_index(self, keys: List[Tuple[str, int]], **kwargs) -> str:
+        return await self.database.run_blocking(self.collection.create_index, keys, **kwargs)
+
+# Indexes ensured at startup: id lookups plus the (sort key, _id) order used by keyset pagination
+INDEXES = {
+    "projects": [
+        {"keys": [("id", ASCENDING)], "name": "id_unique", "unique": True},
+        {"keys": [("created_at", DESCENDING), ("_id", DESCENDING)], "name": "created_at"},
+        {"keys": [("featured", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], "name": "featured_created_at"},
+        {"keys": [("title", TEXT), ("description", TEXT), ("technologies", TEXT)], "name": "search",
+         "weights": {"title": 10, "technologies": 5, "description": 1}},
+    ],
+    "certifications": [
+        {"keys": [("id", ASCENDING)], "name": "id_unique", "unique": True},
+        {"keys": [("date_earned", DESCENDING), ("_id", DESCENDING)], "name": "date_earned"},
+    ],
+    "artwork": [
+        {"keys": [("id", ASCENDING)], "name": "id_unique", "unique": True},
+        {"keys": [("created_at", DESCENDING), ("_id", DESCENDING)], "name": "created_at"},
+        {"keys": [("title", TEXT), ("description", TEXT), ("medium", TEXT)], "name": "search",
+         "weights": {"title": 10, "medium": 5, "description": 1}},
+    ],
+    "about": [
+        {"keys": [("id", ASCENDING)], "name": "id_unique", "unique": True},
+    ],
+    "contact": [
+        {"keys": [("id", ASCENDING)], "name": "id_unique", "unique": True},
+        {"keys": [("created_at", DESCENDING), ("_id", DESCENDING)], "name": "created_at"},
+    ],
+    "events": [
+        {"keys": [("seq", ASCENDING)], "name": "seq"},
+        {"keys": [("created_at", ASCENDING)], "name": "created_at_ttl", "expireAfterSeconds": EVENTS_RETENTION},
+    ],
+    "media": [
+        {"keys": [("id", ASCENDING)], "name": "id_unique", "unique": True},
+    ],
+    "rate_limits": [
+        {"keys": [("expires_at", ASCENDING)], "name": "expires_at_ttl", "expireAfterSeconds": 0},
+    ],
+}
+
+# Health check
+class DatabaseHealth:
+    """Pings Mongo in the background so probes read a cached result instead of adding load"""
+
+    def __init__(self, database: Database, interval: float):
+        self.database = database
+        self.interval = interval
+        self.ok = False
+        self.error: Optional[str] = "not checked yet"
+        self.checked_at: Optional[datetime] = None
+        self.latency_ms: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    async def check(self):
+        started = time.perf_counter()
+        try:
+            await self.database.run_blocking(self.database.ping)
+            self.ok, self.error = True, None
+        except Exception as e:
+            self.ok, self.error = False, str(e)
+        self.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.checked_at = datetime.utcnow()
+
+    async def run(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def snapshot(self) -> Dict[str, Any]:
+        if self.checked_at is None:
+            # No background loop (e.g. lifespan not run): check once inline
+            await self.check()
+        return {"checked_at": self.checked_at, "latency_ms": self.latency_ms}
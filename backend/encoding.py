@@ -0,0 +1,77 @@
+"""Wire encoding of stored documents: JSON as FastAPI would send it, and NDJSON exports"""
+
+import functools
+import importlib
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from settings import EXPORT_BATCH_SIZE
+from database import AsyncCollection
+from models import AboutMe
+
+@functools.lru_cache(maxsize=None)
+def optional_import(name: str):
+    """An optional accelerator (orjson, brotli, zstandard), imported on first use; None if not installed"""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+# Helper function to convert MongoDB document to dict
+def document_to_dict(doc):
+    if doc:
+        doc['id'] = str(doc.pop('_id', ''))
+        return doc
+    return None
+
+def dumps(value: Any) -> bytes:
+    """Encode JSON exactly as FastAPI's JSONResponse does, using orjson when installed"""
+    orjson = optional_import("orjson")
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=lambda o: o.isoformat(), ensure_ascii=False,
+                      allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def wire_item(item: Dict[str, Any], model, keys: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Select a stored document's model fields in declaration order, defaulting missing ones"""
+    fields = model.model_fields
+    result = {}
+    for key in keys or fields:
+        if key in item:
+            result[key] = item[key]
+        else:
+            field = fields[key]
+            result[key] = None if field.is_required() else field.get_default(call_default_factory=True)
+    return result
+
+def encode_items(items: List[Dict[str, Any]], model, fields: Optional[List[str]] = None) -> bytes:
+    """Pre-encode stored (already validated) documents in the response_model's wire format"""
+    return dumps([wire_item(item, model, fields) for item in items])
+
+def encode_about(about) -> bytes:
+    if isinstance(about, BaseModel):
+        about = about.model_dump()
+    return dumps(wire_item(about, AboutMe))
+
+def ndjson_lines(items: List[Dict[str, Any]], model) -> bytes:
+    """Encode documents as newline delimited JSON in the response_model's wire format"""
+    return b"".join(dumps(wire_item(item, model)) + b"\n" for item in items)
+
+def export_response(collection: "AsyncCollection", model, since: Optional[datetime]) -> StreamingResponse:
+    """Stream a whole collection oldest first as NDJSON, one cursor batch per chunk"""
+    filter_query = {}
+    if since is not None:
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        filter_query["created_at"] = {"$gt": since}
+
+    async def chunks():
+        async for batch in collection.iterate(filter_query, sort=[("created_at", 1), ("_id", 1)],
+                                              batch_size=EXPORT_BATCH_SIZE):
+            yield ndjson_lines([document_to_dict(doc) for doc in batch], model)
+
+    return StreamingResponse(chunks(), media_type="application/x-ndjson")
@@ -0,0 +1,177 @@
+"""Server-Sent Events for content changes and new contact messages"""
+
+import asyncio
+import contextlib
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from database import Database
+from models import AboutMe, Artwork, Certification, ContactMessage, Project
+from encoding import dumps
+
+logger = logging.getLogger("portfolio")
+
+class EventStream:
+    """Batches write events into the events collection and fans them out to /api/events subscribers"""
+
+    TOPICS = {"projects": Project, "certifications": Certification, "artwork": Artwork,
+              "about": AboutMe, "contact": ContactMessage}
+    # Contact messages are private: subscribers only learn that one arrived, never who sent what
+    SUMMARY_FIELDS = {"contact": ["id", "created_at"]}
+    # How long a missing sequence number may hold back later events while its writer finishes
+    GAP_WAIT = 5.0
+
+    def __init__(self, database: Database, replay_size: int, keepalive: float, poll_interval: float):
+        self.collection = database.events
+        self.keepalive = keepalive
+        self.poll_interval = poll_interval
+        self.buffer: deque = deque(maxlen=replay_size)  # (seq, topic, encoded frame)
+        self.last_seq = 0
+        self.subscribers = 0
+        self.arrived: Optional[asyncio.Future] = None
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.closing = False
+        self.pending: deque = deque()  # events queued by write handlers, not yet numbered and stored
+        self.stats = {"published": 0, "received": 0, "resets": 0, "publish_errors": 0}
+
+    def publish(self, topic: str, action: str, items: List[Dict[str, Any]]):
+        """Queue one event per item for the tail task to store"""
+        if not items:
+            return
+        keys = self.SUMMARY_FIELDS.get(topic) or list(self.TOPICS[topic].model_fields)
+        self.pending.extend({"topic": topic, "action": action, "data": {key: item.get(key) for key in keys}}
+                            for item in items)
+        self.wakeup.set()
+
+    async def flush(self):
+        """Number and store queued events; a failed batch is logged and dropped, never raised into a handler"""
+        while self.pending:
+            batch = [self.pending.popleft() for _ in range(min(500, len(self.pending)))]
+            try:
+                counter = await self.collection.find_one_and_update(
+                    {"_id": "sequence"}, {"$inc": {"value": len(batch)}}, upsert=True,
+                    return_document=ReturnDocument.AFTER)
+                first = counter["value"] - len(batch) + 1
+                now = datetime.utcnow()
+                for offset, doc in enumerate(batch):
+                    doc["seq"], doc["created_at"] = first + offset, now
+                await self.collection.insert_many(batch)
+                self.stats["published"] += len(batch)
+            except Exception as e:
+                self.stats["publish_errors"] += 1
+                logger.warning("Could not publish %d events: %s", len(batch), e)
+
+    def frame(self, doc: Dict[str, Any]) -> bytes:
+        return (f"id: {doc['seq']}\nevent: {doc['topic']}.{doc['action']}\ndata: ".encode()
+                + dumps(doc["data"]) + b"\n\n")
+
+    def append(self, docs: List[Dict[str, Any]]):
+        for doc in docs:
+            self.buffer.append((doc["seq"], doc["topic"], self.frame(doc)))
+            self.last_seq = doc["seq"]
+        self.stats["received"] += len(docs)
+        # Wake every subscriber at once
+        self.arrived.set_result(None)
+        self.arrived = asyncio.get_running_loop().create_future()
+
+    def start(self):
+        self.closing = False
+        self.arrived = asyncio.get_running_loop().create_future()
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        """Let the tail finish its current step, then store whatever is still queued"""
+        # Not cancelled: a cancel landing mid-flush would lose a batch whose numbers were already taken
+        self.closing = True
+        if self.task:
+            self.wakeup.set()
+            await self.task
+            self.task = None
+        await self.flush()
+
+    async def sleep(self):
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+        self.wakeup.clear()
+
+    async def run(self):
+        while not self.closing:
+            try:
+                await self.load()
+                break
+            except Exception as e:
+                logger.warning("Could not load recent events: %s", e)
+                await self.sleep()
+        while not self.closing:
+            # Local writes wake the tail immediately; other workers' are picked up by the poll
+            await self.sleep()
+            await self.flush()
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.warning("Event poll failed: %s", e)
+
+    async def load(self):
+        """Fill the replay buffer with the most recent events, so resumes work across restarts"""
+        docs = await self.collection.find({"seq": {"$gt": 0}}, sort=[("seq", -1)], limit=self.buffer.maxlen)
+        self.buffer.clear()
+        if docs:
+            self.append(docs[::-1])
+
+    async def poll(self):
+        while True:
+            docs = await self.collection.find({"seq": {"$gt": self.last_seq}}, sort=[("seq", 1)], limit=500)
+            ready = []
+            expected = self.last_seq + 1
+            for doc in docs:
+                # Numbers are taken before the insert, so a later event can land first: wait briefly for the gap
+                if doc["seq"] != expected and datetime.utcnow() - doc["created_at"] < timedelta(seconds=self.GAP_WAIT):
+                    break
+                ready.append(doc)
+                expected = doc["seq"] + 1
+            if ready:
+                self.append(ready)
+            if len(docs) < 500 or len(ready) < len(docs):
+                return
+
+    def since(self, seq: int) -> List[Tuple[int, str, bytes]]:
+        """Buffered events after `seq`; subscribers are usually near the end, so scan backwards"""
+        missed = []
+        for entry in reversed(self.buffer):
+            if entry[0] <= seq:
+                break
+            missed.append(entry)
+        return missed[::-1]
+
+    async def subscribe(self, last_event_id: Optional[int], topics: set):
+        self.subscribers += 1
+        try:
+            yield f"retry: {int(self.poll_interval * 1000) + 1000}\n\n".encode()
+            cursor = self.last_seq if last_event_id is None else last_event_id
+            while True:
+                arrived = self.arrived
+                if cursor > self.last_seq or (self.buffer and cursor < self.buffer[0][0] - 1):
+                    # Events fell out of the buffer (or the id is unknown here): tell the client to refetch
+                    self.stats["resets"] += 1
+                    cursor = self.last_seq
+                    yield f"id: {cursor}\nevent: reset\ndata: {{}}\n\n".encode()
+                for seq, topic, frame in self.since(cursor):
+                    if topic in topics:
+                        yield frame
+                cursor = self.last_seq
+                try:
+                    await asyncio.wait_for(asyncio.shield(arrived), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            self.subscribers -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "queued": len(self.pending), "subscribers": self.subscribers, "last_id": self.last_seq,
+                "buffered": len(self.buffer), "replay_size": self.buffer.maxlen}
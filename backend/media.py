@@ -0,0 +1,138 @@
+"""
+Image processing for the /api/media endpoints.
+
+These functions run in media_library.py's process pool, so they take and return plain values
+(paths, ints, strings) and import nothing from the app: a worker process only loads this
+module and Pillow.
+
+- probe: dimensions, format and a BlurHash placeholder for an uploaded original.
+- render: a resized WebP/AVIF/JPEG/PNG derivative written atomically to its cache path.
+"""
+
+import math
+import os
+from typing import Any, Dict, List, Tuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional: /api/media answers 503 without it
+    Image = None
+    ImageOps = None
+
+FORMATS = {
+    # fmt -> (Pillow format, content type, file extension)
+    "avif": ("AVIF", "image/avif", "avif"),
+    "webp": ("WEBP", "image/webp", "webp"),
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+    "png": ("PNG", "image/png", "png"),
+}
+
+def supported_formats() -> List[str]:
+    """Output formats the installed Pillow can encode, best compression first"""
+    if Image is None:
+        return []
+    from PIL import features
+    return [fmt for fmt in FORMATS if fmt in ("jpeg", "png") or features.check(fmt)]
+
+def open_image(path: str):
+    image = Image.open(path)
+    # Phone photos store their rotation in EXIF; apply it so width/height match what browsers show
+    return ImageOps.exif_transpose(image)
+
+# BlurHash (https://blurha.sh): a DCT of a tiny thumbnail packed into ~30 base83 characters
+
+BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+def base83(value: int, length: int) -> str:
+    return "".join(BASE83[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1))
+
+def srgb_to_linear(value: int) -> float:
+    v = value / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+def linear_to_srgb(value: float) -> int:
+    v = max(0.0, min(1.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+def blurhash(image, x_components: int = 4, y_components: int = 3) -> str:
+    """Encode a BlurHash from a thumbnail of `image`; 32px is plenty for a 4x3 component hash"""
+    thumb = image.convert("RGB")
+    thumb.thumbnail((32, 32))
+    width, height = thumb.size
+    to_linear = [srgb_to_linear(v) for v in range(256)]
+    data = thumb.tobytes()
+    pixels = [(to_linear[data[k]], to_linear[data[k + 1]], to_linear[data[k + 2]]) for k in range(0, len(data), 3)]
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(x_components)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(y_components)]
+
+    factors: List[Tuple[float, float, float]] = []
+    for j in range(y_components):
+        for i in range(x_components):
+            scale = (1 if i == 0 and j == 0 else 2) / (width * height)
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                for x in range(width):
+                    basis = cos_x[i][x] * cos_y[j][y]
+                    pr, pg, pb = pixels[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        quantised = max(0, min(82, int(math.floor(max(abs(v) for f in ac for v in f) * 166 - 0.5))))
+        maximum = (quantised + 1) / 166
+        result += base83(quantised, 1)
+    else:
+        maximum = 1.0
+        result += base83(0, 1)
+    result += base83((linear_to_srgb(dc[0]) << 16) + (linear_to_srgb(dc[1]) << 8) + linear_to_srgb(dc[2]), 4)
+
+    def quantise(v: float) -> int:
+        v /= maximum
+        return max(0, min(18, int(math.floor(math.copysign(abs(v) ** 0.5, v) * 9 + 9.5))))
+
+    for r, g, b in ac:
+        result += base83(quantise(r) * 19 * 19 + quantise(g) * 19 + quantise(b), 2)
+    return result
+
+# Pool entry points
+
+def probe(path: str) -> Dict[str, Any]:
+    """Dimensions, source format and BlurHash of an original; raises ValueError if it is not an image"""
+    try:
+        with Image.open(path) as raw:
+            source_format = (raw.format or "").lower()
+            raw.verify()  # cheap structural check before decoding the whole file
+        with open_image(path) as image:
+            return {"width": image.width, "height": image.height, "format": source_format,
+                    "blurhash": blurhash(image)}
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Not a supported image: {e}") from None
+
+def render(source: str, destination: str, width: int, fmt: str, quality: int) -> int:
+    """Write `source` resized to `width` pixels wide as `fmt` to `destination`, returning its size in bytes"""
+    pillow_format = FORMATS[fmt][0]
+    with open_image(source) as image:
+        if width < image.width:
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.mode or "transparency" in image.info else "RGB")
+        if pillow_format == "JPEG" and image.mode == "RGBA":
+            image = image.convert("RGB")
+        options: Dict[str, Any] = {"optimize": True} if pillow_format in ("JPEG", "PNG") else {}
+        if pillow_format != "PNG":
+            options["quality"] = quality
+        if pillow_format == "JPEG":
+            options["progressive"] = True
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        # Write beside the target and rename, so a concurrent reader never sees a partial file
+        temporary = f"{destination}.{os.getpid()}.tmp"
+        image.save(temporary, pillow_format, **options)
+    os.replace(temporary, destination)
+    return os.path.getsize(destination)
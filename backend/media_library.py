@@ -0,0 +1,276 @@
+"""Uploaded images and their resized derivatives, rendered off the event loop in a process pool"""
+
+import asyncio
+import contextlib
+import hashlib
+import logging
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from pymongo.errors import DuplicateKeyError
+from starlette.datastructures import Headers
+
+from settings import MEDIA_MAX_UPLOAD_BYTES
+from metrics import metrics
+from database import Database
+
+logger = logging.getLogger("portfolio")
+
+class MediaLibrary:
+    """Content-addressed originals and immutable derivatives, evicted LRU past `max_bytes`"""
+
+    # Other workers render into the same directory, so its total is recounted at least this often (seconds)
+    RESCAN_INTERVAL = 30
+
+    URL_PATTERN = re.compile(r"/api/media/([0-9a-f]{24})(?:[/?#]|$)")
+    # Image fields filled from the URL field beside them: collection -> [(url field, info field)]
+    IMAGE_FIELDS = {
+        "projects": [("image_url", "image")],
+        "certifications": [("badge_url", "badge")],
+        "artwork": [("image_url", "image")],
+        "about": [("profile_image_url", "profile_image")],
+    }
+
+    def __init__(self, database: Database, directory: str, max_bytes: int, widths: List[int], quality: int,
+                 workers: int):
+        self.database = database
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.widths = sorted(widths)
+        self.quality = quality
+        self.workers = workers
+        self.pool = None  # a ProcessPoolExecutor, started by the first render
+        self.documents: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.rendering: Dict[str, asyncio.Task] = {}
+        self.derivatives: Optional["OrderedDict[str, int]"] = None  # path -> size, least recently used first
+        self.cached_bytes = 0
+        self.scanned_at = 0.0
+        self.stats = {"uploads": 0, "hits": 0, "renders": 0, "evictions": 0}
+
+    def path(self, *parts: str) -> str:
+        return os.path.join(self.directory, *parts)
+
+    async def run(self, function: str, *args):
+        """Call a function from media.py in the worker pool"""
+        import media
+        if self.pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # spawn: forking a process that runs DB threads and an event loop is not safe
+            self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return await asyncio.get_running_loop().run_in_executor(self.pool, getattr(media, function), *args)
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+
+    def formats(self) -> List[str]:
+        import media
+        return media.supported_formats()
+
+    async def document(self, media_id: str) -> Optional[Dict[str, Any]]:
+        """Media document by id; documents never change, so found ones are kept in a bounded LRU"""
+        doc = self.documents.get(media_id)
+        if doc is None:
+            doc = await self.database.media.find_one({"id": media_id})
+            if doc is None:
+                return None
+            doc.pop("_id", None)
+            self.documents[media_id] = doc
+            while len(self.documents) > 1024:
+                self.documents.popitem(last=False)
+        self.documents.move_to_end(media_id)
+        return doc
+
+    async def image_info(self, url: Optional[str]) -> Optional[Dict[str, Any]]:
+        match = self.URL_PATTERN.search(url or "")
+        doc = await self.document(match.group(1)) if match else None
+        if doc is None:
+            return None
+        return {"src": f"/api/media/{doc['id']}", "width": doc["width"], "height": doc["height"],
+                "blurhash": doc["blurhash"]}
+
+    def receive(self, source) -> Tuple[str, int, str]:
+        """Copy an upload into the originals directory, returning (sha256, size, temporary path)"""
+        directory = self.path("originals")
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        temporary = os.path.join(directory, f".{uuid.uuid4().hex}.tmp")
+        with open(temporary, "wb") as target:
+            while True:
+                chunk = source.read(1 << 20)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MEDIA_MAX_UPLOAD_BYTES:
+                    target.close()
+                    os.remove(temporary)
+                    raise HTTPException(status_code=413, detail=f"Images are limited to {MEDIA_MAX_UPLOAD_BYTES} bytes")
+                digest.update(chunk)
+                target.write(chunk)
+        return digest.hexdigest(), size, temporary
+
+    async def upload(self, upload: UploadFile) -> Dict[str, Any]:
+        sha256, size, temporary = await self.database.run_blocking(self.receive, upload.file)
+        media_id = sha256[:24]
+        existing = await self.document(media_id)
+        if existing is not None:
+            os.remove(temporary)
+            return existing
+        original = self.path("originals", sha256)
+        os.replace(temporary, original)
+        try:
+            info = await self.run("probe", original)
+        except ValueError as e:
+            os.remove(original)
+            raise HTTPException(status_code=400, detail=str(e))
+
+        doc = {"id": media_id, "sha256": sha256, "filename": upload.filename,
+               "content_type": f"image/{info['format']}" if info["format"] else upload.content_type,
+               "size": size, "width": info["width"], "height": info["height"], "blurhash": info["blurhash"],
+               "created_at": datetime.utcnow()}
+        try:
+            await self.database.media.insert_one(dict(doc))
+        except DuplicateKeyError:
+            return await self.document(media_id)  # the same image was uploaded concurrently
+        self.stats["uploads"] += 1
+        return doc
+
+    def choose_width(self, requested: Optional[int], original: int) -> int:
+        """Round up to the next configured width, never above the original's"""
+        width = self.widths[-1]
+        if requested is not None:
+            width = next((w for w in self.widths if w >= requested), width)
+        return min(width, original)
+
+    def choose_format(self, requested: Optional[str], accept: str, doc: Dict[str, Any]) -> str:
+        formats = self.formats()
+        if requested is not None:
+            if requested not in formats:
+                raise HTTPException(status_code=400, detail=f"Unsupported format, use one of: {', '.join(formats)}")
+            return requested
+        for fmt in ("avif", "webp"):
+            if fmt in formats and f"image/{fmt}" in accept:
+                return fmt
+        return "png" if doc["content_type"] in ("image/png", "image/gif") else "jpeg"
+
+    def scan(self):
+        """Index the derivatives every worker has written, least recently used (oldest mtime) first"""
+        found = []
+        for root, _, files in os.walk(self.path("derivatives")):
+            for name in files:
+                if not name.endswith(".tmp"):
+                    stat = os.stat(os.path.join(root, name))
+                    found.append((stat.st_mtime, os.path.join(root, name), stat.st_size))
+        self.derivatives = OrderedDict((path, size) for _, path, size in sorted(found))
+        self.cached_bytes = sum(self.derivatives.values())
+        self.scanned_at = time.monotonic()
+
+    def evict(self):
+        """Recount the shared directory, then remove its least recently used derivatives until under max_bytes"""
+        self.scan()
+        while self.cached_bytes > self.max_bytes and len(self.derivatives) > 1:
+            path, size = self.derivatives.popitem(last=False)
+            self.cached_bytes -= size
+            self.stats["evictions"] += 1
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+
+    def derivative_key(self, doc: Dict[str, Any], width: int, fmt: str) -> str:
+        return hashlib.sha256(f"{doc['sha256']}:{width}:{fmt}:{self.quality}".encode()).hexdigest()
+
+    def etag(self, doc: Dict[str, Any], width: int, fmt: str) -> str:
+        """A derivative's ETag, known without rendering it"""
+        return f'"{self.derivative_key(doc, width, fmt)[:32]}"'
+
+    async def derivative(self, doc: Dict[str, Any], width: int, fmt: str) -> Tuple[str, str]:
+        """(ETag, path) of a derivative, rendering it if it is not on disk yet"""
+        import media
+        key = self.derivative_key(doc, width, fmt)
+        path = self.path("derivatives", key[:2], f"{key}.{media.FORMATS[fmt][2]}")
+        if self.derivatives is None:
+            await self.database.run_blocking(self.scan)
+        if os.path.exists(path):
+            # The file may be another worker's render; its mtime is the recency every worker's eviction sees
+            with contextlib.suppress(FileNotFoundError):
+                os.utime(path)
+                if path not in self.derivatives:
+                    size = os.stat(path).st_size
+                    self.derivatives[path] = size
+                    self.cached_bytes += size
+                self.derivatives.move_to_end(path)
+            self.stats["hits"] += 1
+            metrics.inc("portfolio_media_requests_total", {"result": "hit"})
+            return f'"{key[:32]}"', path
+
+        # Concurrent requests for the same derivative share one render
+        task = self.rendering.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self.render(doc, path, width, fmt))
+            self.rendering[key] = task
+            task.add_done_callback(lambda _: self.rendering.pop(key, None))
+        await asyncio.shield(task)
+        return f'"{key[:32]}"', path
+
+    async def render(self, doc: Dict[str, Any], path: str, width: int, fmt: str):
+        started = time.perf_counter()
+        size = await self.run("render", self.path("originals", doc["sha256"]), path, width, fmt, self.quality)
+        metrics.observe("portfolio_media_render_seconds", {"format": fmt}, time.perf_counter() - started)
+        metrics.inc("portfolio_media_requests_total", {"result": "rendered"})
+        self.stats["renders"] += 1
+        self.cached_bytes += size - self.derivatives.pop(path, 0)
+        self.derivatives[path] = size
+        if self.cached_bytes > self.max_bytes or time.monotonic() - self.scanned_at > self.RESCAN_INTERVAL:
+            await self.database.run_blocking(self.evict)
+
+    async def attach_images(self, name: str, item: Dict[str, Any]):
+        """Store dimensions and a BlurHash beside each image URL that points at an uploaded image"""
+        for url_field, info_field in self.IMAGE_FIELDS[name]:
+            item[info_field] = await self.image_info(item.get(url_field))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"formats": self.formats(), "widths": self.widths, "derivatives": len(self.derivatives or ()),
+                "cached_bytes": self.cached_bytes, "max_bytes": self.max_bytes, **self.stats}
+
+def require_images(media_library: MediaLibrary):
+    if not media_library.formats():
+        raise HTTPException(status_code=503, detail="Image processing is not available (Pillow is not installed)")
+
+class UploadLimitMiddleware:
+    """413 for uploads to `path` over `max_bytes`: up front from Content-Length, else as a chunked body streams in"""
+
+    def __init__(self, app, path: str, max_bytes: int):
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != self.path:
+            return await self.app(scope, receive, send)
+        detail = f"Images are limited to {MEDIA_MAX_UPLOAD_BYTES} bytes"
+        length = Headers(scope=scope).get("content-length", "")
+        if length.isdigit() and int(length) > self.max_bytes:
+            return await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+
+        received = 0
+
+        async def capped_receive():
+            nonlocal received
+            message = await receive()
+            received += len(message.get("body", b""))
+            if received > self.max_bytes:
+                # Raised inside the form parser, so the route answers 413 before the rest is read or spooled
+                raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, capped_receive, send)
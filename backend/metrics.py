@@ -0,0 +1,218 @@
+"""Request, query and subsystem metrics, exposed in Prometheus text format on /metrics"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+from starlette.routing import Match
+
+logger = logging.getLogger("portfolio")
+
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '0'))  # 0 disables the slow request log
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# Streamed responses (event streams, exports) stay open for seconds to hours
+STREAM_BUCKETS = (0.1, 1.0, 10.0, 60.0, 300.0, 900.0, 3600.0, 14400.0)
+
+def escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Metrics:
+    """Minimal thread-safe registry of counters, gauges and histograms keyed by label tuples"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.kinds: Dict[str, Tuple[str, str]] = {}  # name -> (type, help)
+        self.buckets: Dict[str, Tuple[float, ...]] = {}
+        self.values: Dict[str, Dict[Tuple[Tuple[str, str], ...], Any]] = defaultdict(dict)
+
+    def declare(self, name: str, kind: str, help_text: str, buckets: Tuple[float, ...] = ()):
+        self.kinds[name] = (kind, help_text)
+        if buckets:
+            self.buckets[name] = buckets
+
+    def inc(self, name: str, labels: Dict[str, str], value: float = 1):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[name][key] = self.values[name].get(key, 0) + value
+
+    def set(self, name: str, labels: Dict[str, str], value: float):
+        with self.lock:
+            self.values[name][tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, labels: Dict[str, str], value: float):
+        key = tuple(sorted(labels.items()))
+        buckets = self.buckets[name]
+        with self.lock:
+            series = self.values[name].get(key)
+            if series is None:
+                series = self.values[name][key] = [[0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> str:
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{escape_label(v)}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self.lock:
+            for name, (kind, help_text) in self.kinds.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in self.values[name].items():
+                    if kind != "histogram":
+                        lines.append(f"{name}{fmt(labels)} {value}")
+                        continue
+                    counts, total, count = value
+                    for bound, bucket_count in zip(self.buckets[name], counts):
+                        lines.append(f"{name}_bucket{fmt(labels, [('le', bound)])} {bucket_count}")
+                    lines.append(f"{name}_bucket{fmt(labels, [('le', '+Inf')])} {count}")
+                    lines.append(f"{name}_sum{fmt(labels)} {total}")
+                    lines.append(f"{name}_count{fmt(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+metrics.declare("http_requests_total", "counter", "HTTP requests by route and status")
+metrics.declare("http_request_duration_seconds", "histogram", "HTTP request latency", LATENCY_BUCKETS)
+metrics.declare("http_response_size_bytes", "histogram", "HTTP response body size", SIZE_BUCKETS)
+metrics.declare("http_requests_in_flight", "gauge", "HTTP requests currently being served")
+metrics.declare("http_stream_duration_seconds", "histogram", "How long streamed responses stayed open", STREAM_BUCKETS)
+metrics.declare("http_streams_open", "gauge", "Streamed responses currently open")
+metrics.declare("mongodb_command_duration_seconds", "histogram", "MongoDB command latency", LATENCY_BUCKETS)
+metrics.declare("mongodb_command_documents_total", "counter", "Documents returned or written by MongoDB commands")
+metrics.declare("mongodb_command_failures_total", "counter", "Failed MongoDB commands")
+metrics.declare("portfolio_cache_entries", "gauge", "Entries in the response cache")
+metrics.declare("portfolio_cache_events_total", "counter", "Response cache hits, misses, evictions and invalidations")
+metrics.declare("portfolio_contact_queue_depth", "gauge", "Contact messages waiting to be flushed")
+metrics.declare("portfolio_event_subscribers", "gauge", "Open /api/events streams")
+metrics.declare("portfolio_contact_queue_events_total", "counter", "Contact queue enqueue, flush and reject counts")
+metrics.declare("portfolio_static_export_hits_total", "counter", "Requests answered from the static export")
+metrics.declare("portfolio_rate_limited_total", "counter", "Write requests rejected by the rate limiter")
+metrics.declare("portfolio_contact_duplicates_total", "counter", "Repeated contact messages dropped by deduplication")
+metrics.declare("portfolio_media_render_seconds", "histogram", "Time spent rendering image derivatives", LATENCY_BUCKETS)
+metrics.declare("portfolio_media_requests_total", "counter", "Image derivative requests by cache result")
+metrics.declare("portfolio_compression_seconds", "histogram", "Time spent compressing response bodies", LATENCY_BUCKETS)
+metrics.declare("portfolio_compression_bytes_total", "counter", "Response bytes before (in) and after (out) compression")
+
+# Query shapes of the Mongo commands issued while serving the current request, for the slow request log
+request_queries: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar("request_queries", default=None)
+
+def query_shape(value: Any) -> Any:
+    """Replace literal values in a filter with '?' so queries group by shape"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [query_shape(item) for item in value[:3]]
+    return "?"
+
+class CommandMetrics(monitoring.CommandListener):
+    """pymongo command listener recording per-collection/per-command timings and document counts"""
+
+    COMMANDS = {"find", "getMore", "insert", "update", "delete", "aggregate", "count", "findAndModify", "createIndexes"}
+
+    def __init__(self):
+        self.pending: Dict[Tuple[int, int], Tuple[str, str]] = {}
+
+    def started(self, event):
+        if event.command_name not in self.COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        self.pending[(event.request_id, event.operation_id)] = (str(collection), event.command_name)
+        queries = request_queries.get()
+        if queries is not None:
+            shape = query_shape(event.command.get("filter") or event.command.get("pipeline") or {})
+            sort = event.command.get("sort")
+            queries.append(f"{event.command_name} {collection} {json.dumps(shape, default=str)}"
+                           + (f" sort={dict(sort)}" if sort else ""))
+
+    def succeeded(self, event):
+        labels = self._labels(event)
+        if labels is None:
+            return
+        metrics.observe("mongodb_command_duration_seconds", labels, event.duration_micros / 1e6)
+        reply = event.reply or {}
+        cursor = reply.get("cursor") or {}
+        documents = len(cursor.get("firstBatch", cursor.get("nextBatch", []))) if cursor else reply.get("n", 0)
+        metrics.inc("mongodb_command_documents_total", labels, documents)
+
+    def failed(self, event):
+        labels = self._labels(event)
+        if labels is None:
+            return
+        metrics.observe("mongodb_command_duration_seconds", labels, event.duration_micros / 1e6)
+        metrics.inc("mongodb_command_failures_total", labels)
+
+    def _labels(self, event) -> Optional[Dict[str, str]]:
+        found = self.pending.pop((event.request_id, event.operation_id), None)
+        if found is None:
+            return None
+        return {"collection": found[0], "command": found[1]}
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by route template; streaming routes are timed apart"""
+
+    def __init__(self, app, streaming_routes: Tuple[str, ...] = ()):
+        self.app = app
+        self.streaming_routes = streaming_routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        labels = {"method": scope["method"], "route": route_template(scope)}
+        # A stream's duration is how long the client listened, so it would swamp the latency histogram
+        streaming = labels["route"] in self.streaming_routes
+        gauge = "http_streams_open" if streaming else "http_requests_in_flight"
+        queries: List[str] = []
+        token = request_queries.set(queries)
+        metrics.inc(gauge, {})
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.inc(gauge, {}, -1)
+            request_queries.reset(token)
+            metrics.inc("http_requests_total", {**labels, "status": str(status)})
+            metrics.observe("http_stream_duration_seconds" if streaming else "http_request_duration_seconds",
+                            labels, elapsed)
+            metrics.observe("http_response_size_bytes", labels, size)
+            if not streaming and SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+                logger.warning("Slow request %s %s: %.1fms status=%s queries=%s",
+                               scope["method"], scope["path"], elapsed * 1000, status, queries)
+
+def route_template(scope) -> str:
+    """The matched route's path template, so path parameters do not explode label cardinality"""
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", scope["path"])
+    return "unmatched"
+
+command_metrics = CommandMetrics()
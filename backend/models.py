@@ -0,0 +1,91 @@
+"""Pydantic models for the stored content"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+class ImageInfo(BaseModel):
+    """Filled in on write when an image URL points at /api/media, so clients can size and placeholder it"""
+    src: str  # "/api/media/{id}"; add ?w= for a resized derivative
+    width: int
+    height: int
+    blurhash: str
+
+class Project(BaseModel):
+    id: Optional[str] = None
+    title: str
+    description: str
+    technologies: List[str]
+    github_url: Optional[str] = None
+    demo_url: Optional[str] = None
+    image_url: Optional[str] = None
+    image: Optional[ImageInfo] = None
+    category: str  # "AI/ML", "Web", "Mobile", etc.
+    featured: bool = False
+    created_at: Optional[datetime] = None
+
+class Certification(BaseModel):
+    id: Optional[str] = None
+    title: str
+    issuer: str
+    date_earned: str
+    credential_id: Optional[str] = None
+    credential_url: Optional[str] = None
+    badge_url: Optional[str] = None
+    badge: Optional[ImageInfo] = None
+    created_at: Optional[datetime] = None
+
+class Artwork(BaseModel):
+    id: Optional[str] = None
+    title: str
+    description: Optional[str] = None
+    image_url: str
+    image: Optional[ImageInfo] = None
+    category: str  # "Digital", "Traditional", "3D", etc.
+    medium: Optional[str] = None
+    year_created: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+class AboutMe(BaseModel):
+    id: Optional[str] = None
+    bio: str
+    profile_image_url: Optional[str] = None
+    profile_image: Optional[ImageInfo] = None
+    skills: List[str]
+    social_links: Dict[str, str]  # {"github": "url", "linkedin": "url", etc.}
+    resume_url: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class ContactMessage(BaseModel):
+    id: Optional[str] = None
+    name: str
+    email: str
+    subject: Optional[str] = None
+    message: str
+    created_at: Optional[datetime] = None
+
+class MediaItem(BaseModel):
+    id: str
+    url: str
+    filename: Optional[str] = None
+    content_type: str
+    size: int
+    width: int
+    height: int
+    blurhash: str
+    created_at: Optional[datetime] = None
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: str  # "created", "failed" or "skipped"
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkCreateResult(BaseModel):
+    ordered: bool
+    inserted: int
+    failed: int
+    stopped_at: Optional[int] = None  # ordered mode: index of the first failure
+    results: List[BulkItemResult]
@@ -0,0 +1,71 @@
+"""Keyset pagination: cursors encode the (sort key, _id) of the last item on a page"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException, Query, Response
+
+from settings import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from database import AsyncCollection
+from encoding import document_to_dict, encode_items
+
+def encode_cursor(doc: Dict[str, Any], sort_field: str) -> str:
+    value = doc.get(sort_field)
+    payload = {"v": value.isoformat() if isinstance(value, datetime) else value,
+               "dt": isinstance(value, datetime),
+               "id": str(doc["_id"])}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value = datetime.fromisoformat(payload["v"]) if payload["dt"] else payload["v"]
+        return value, ObjectId(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+def parse_fields(fields: Optional[str], model) -> Optional[List[str]]:
+    """Validate a comma separated `fields=` projection against a model"""
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in model.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+async def find_page(collection: "AsyncCollection", model, filter_query: Dict[str, Any], sort_field: str,
+                    limit: int, after: Optional[str], fields: Optional[List[str]],
+                    primary: bool = False) -> Tuple[bytes, Optional[str]]:
+    """Fetch one page sorted newest first, returning (encoded body, next cursor); cached pages pass primary"""
+    query = dict(filter_query)
+    if after:
+        value, last_id = decode_cursor(after)
+        query["$or"] = [{sort_field: {"$lt": value}}, {sort_field: value, "_id": {"$lt": last_id}}]
+
+    projection = None
+    if fields:
+        projection = {field: 1 for field in fields if field != "id"}
+        projection[sort_field] = 1
+
+    docs = await collection.find(query, sort=[(sort_field, -1), ("_id", -1)], limit=limit + 1, projection=projection,
+                                 primary=primary)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort_field)
+
+    return encode_items([document_to_dict(doc) for doc in docs], model, fields), next_cursor
+
+def page_response(response: Response, body: bytes, next_cursor: Optional[str]) -> Response:
+    """Send a pre-encoded page, bypassing response_model re-validation"""
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return Response(content=body, media_type="application/json", headers=dict(response.headers))
+
+def page_limit():
+    """A fresh Query per parameter: FastAPI records the alias on the FieldInfo, so it cannot be shared"""
+    return Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
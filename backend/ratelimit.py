@@ -0,0 +1,144 @@
+"""Token bucket rate limiting for the write routes, and contact message deduplication"""
+
+import hashlib
+import ipaddress
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Tuple
+
+from fastapi import Request
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from metrics import metrics
+from database import Database
+
+logger = logging.getLogger("portfolio")
+
+class RateLimiter:
+    """Token buckets per (route, client) and recent contact fingerprints, in memory or shared via the database"""
+
+    def __init__(self, database: Database, per_minute: float, burst: int, max_entries: int, dedup_window: float,
+                 shared: bool, trusted_proxies: str = ""):
+        self.collection = database.rate_limits
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.max_entries = max_entries
+        self.dedup_window = dedup_window
+        self.shared = shared
+        self.trusted_proxies = [ipaddress.ip_network(proxy.strip(), strict=False)
+                                for proxy in trusted_proxies.split(",") if proxy.strip()]
+        self.buckets: "OrderedDict[Tuple[str, str], Tuple[float, float]]" = OrderedDict()  # -> (tokens, updated)
+        self.fingerprints: "OrderedDict[str, float]" = OrderedDict()  # -> expiry
+        self.stats: Dict[str, int] = defaultdict(int)
+
+    def is_trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def client_address(self, request: Request) -> str:
+        """The socket peer, or when that is a trusted proxy the nearest untrusted X-Forwarded-For hop"""
+        peer = request.client.host if request.client else "unknown"
+        if not self.is_trusted(peer):
+            return peer
+        hops = [hop.strip() for value in request.headers.getlist("x-forwarded-for") for hop in value.split(",")]
+        hops = [hop for hop in hops if hop]
+        for hop in reversed(hops):
+            if not self.is_trusted(hop):
+                return hop
+        return hops[0] if hops else peer
+
+    async def acquire(self, route: str, client: str) -> float:
+        """Take a token, returning 0 if the request may proceed, else the seconds until it could"""
+        if self.rate <= 0:
+            return 0.0
+        wait = await self.acquire_shared(route, client) if self.shared else self.acquire_local(route, client)
+        if wait:
+            self.stats[f"rejected:{route}"] += 1
+            metrics.inc("portfolio_rate_limited_total", {"route": route})
+        return wait
+
+    def acquire_local(self, route: str, client: str) -> float:
+        now = time.monotonic()
+        tokens, updated = self.buckets.pop((route, client), (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self.buckets[(route, client)] = (tokens, now)
+        while len(self.buckets) > self.max_entries:
+            self.buckets.popitem(last=False)
+        return wait
+
+    async def acquire_shared(self, route: str, client: str) -> float:
+        interval = 1 / self.rate
+        key = f"{route}|{client}"
+        for _ in range(5):
+            now = time.time()
+            doc = await self.collection.find_one({"_id": key})
+            stored = doc["tat"] if doc else None
+            # Theoretical arrival time: when the bucket would be full again if this request is let through
+            tat = max(stored or now, now) + interval
+            if tat - now > self.burst * interval:
+                return tat - now - self.burst * interval
+            update = {"$set": {"tat": tat, "expires_at": datetime.utcfromtimestamp(tat)}}
+            try:
+                if doc is None:
+                    await self.collection.insert_one({"_id": key, **update["$set"]})
+                    return 0.0
+                if await self.collection.find_one_and_update({"_id": key, "tat": stored}, update):
+                    return 0.0
+            except DuplicateKeyError:
+                pass  # another worker created the bucket first; retry against its value
+        return interval  # persistent contention: treat as limited rather than unlimited
+
+    @staticmethod
+    def fingerprint(message: Dict[str, Any]) -> str:
+        normalized = [" ".join(str(message.get(key) or "").lower().split()) for key in ("name", "email", "subject", "message")]
+        return hashlib.sha256("\x00".join(normalized).encode()).hexdigest()
+
+    async def is_duplicate(self, message: Dict[str, Any]) -> bool:
+        """True if the same sender sent the same message within the dedup window; records it otherwise"""
+        if self.dedup_window <= 0:
+            return False
+        fingerprint = self.fingerprint(message)
+        if self.shared:
+            previous = await self.collection.find_one_and_update(
+                {"_id": f"contact|{fingerprint}"},
+                {"$set": {"expires_at": datetime.utcnow() + timedelta(seconds=self.dedup_window)}},
+                upsert=True, return_document=ReturnDocument.BEFORE)
+            duplicate = previous is not None and previous["expires_at"] > datetime.utcnow()
+        else:
+            now = time.monotonic()
+            duplicate = self.fingerprints.pop(fingerprint, 0) > now
+            self.fingerprints[fingerprint] = now + self.dedup_window
+            while len(self.fingerprints) > self.max_entries:
+                self.fingerprints.popitem(last=False)
+        if duplicate:
+            self.stats["duplicates"] += 1
+            metrics.inc("portfolio_contact_duplicates_total", {})
+        return duplicate
+
+    async def forget(self, message: Dict[str, Any]):
+        """Drop a message's fingerprint when it was not stored, so the client's retry is accepted"""
+        if self.dedup_window <= 0:
+            return
+        fingerprint = self.fingerprint(message)
+        if self.shared:
+            await self.collection.find_one_and_update(
+                {"_id": f"contact|{fingerprint}"}, {"$set": {"expires_at": datetime.utcnow()}})
+        else:
+            self.fingerprints.pop(fingerprint, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"per_minute": self.rate * 60, "burst": self.burst, "shared": self.shared,
+                "trusted_proxies": [str(network) for network in self.trusted_proxies],
+                "tracked_buckets": len(self.buckets), "tracked_fingerprints": len(self.fingerprints),
+                **self.stats}
@@ -1,224 +1,762 @@
-from fastapi import FastAPI, HTTPException, Depends
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+import asyncio
+import contextlib
+import json
+import logging
 import os
+import sys
+import threading
 import uuid
 from datetime import datetime
-from pymongo import MongoClient
-from pymongo.collection import Collection
-import certifi
-
-app = FastAPI(title="Portfolio API", version="1.0.0")
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# MongoDB connection
-MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
-client = MongoClient(MONGO_URL)
-db = client.portfolio_db
-
-# Collections
-projects_collection = db.projects
-certifications_collection = db.certifications
-artwork_collection = db.artwork
-about_collection = db.about
-contact_collection = db.contact
-
-# Pydantic models
-class Project(BaseModel):
-    id: Optional[str] = None
-    title: str
-    description: str
-    technologies: List[str]
-    github_url: Optional[str] = None
-    demo_url: Optional[str] = None
-    image_url: Optional[str] = None
-    category: str  # "AI/ML", "Web", "Mobile", etc.
-    featured: bool = False
-    created_at: Optional[datetime] = None
-
-class Certification(BaseModel):
-    id: Optional[str] = None
-    title: str
-    issuer: str
-    date_earned: str
-    credential_id: Optional[str] = None
-    credential_url: Optional[str] = None
-    badge_url: Optional[str] = None
-    created_at: Optional[datetime] = None
-
-class Artwork(BaseModel):
-    id: Optional[str] = None
-    title: str
-    description: Optional[str] = None
-    image_url: str
-    category: str  # "Digital", "Traditional", "3D", etc.
-    medium: Optional[str] = None
-    year_created: Optional[str] = None
-    created_at: Optional[datetime] = None
-
-class AboutMe(BaseModel):
-    id: Optional[str] = None
-    bio: str
-    profile_image_url: Optional[str] = None
-    skills: List[str]
-    social_links: Dict[str, str]  # {"github": "url", "linkedin": "url", etc.}
-    resume_url: Optional[str] = None
-    created_at: Optional[datetime] = None
-    updated_at: Optional[datetime] = None
-
-class ContactMessage(BaseModel):
-    id: Optional[str] = None
-    name: str
-    email: str
-    subject: Optional[str] = None
-    message: str
-    created_at: Optional[datetime] = None
-
-# Helper function to convert MongoDB document to dict
-def document_to_dict(doc):
-    if doc:
-        doc['id'] = str(doc.pop('_id', ''))
-        return doc
-    return None
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, FastAPI, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from pydantic import BaseModel, ValidationError
+from pymongo.errors import BulkWriteError
+
+from settings import BULK_BATCH_SIZE, MAX_PAGE_SIZE, MEDIA_MAX_UPLOAD_BYTES, MEDIA_UPLOAD_OVERHEAD, Settings
+from metrics import MetricsMiddleware, metrics
+from models import AboutMe, Artwork, BulkCreateResult, BulkItemResult, Certification, ContactMessage, MediaItem, Project
+from encoding import document_to_dict, dumps, encode_about, export_response, wire_item
+from pagination import find_page, page_limit, page_response, parse_fields
+from caching import conditional_get
+from services import Services, get_services
+from media_library import UploadLimitMiddleware, require_images
+from events import EventStream
+from stats import STAT_FACETS
+from static_export import STATIC_EXPORT_PREFIX, StaticExport, StaticExportMiddleware
+from compression import CompressionMiddleware, available_encodings
+
+logger = logging.getLogger("portfolio")
+
+# Routes are collected here and attached to an app by create_app()
+router = APIRouter()
+
+def rate_limited(route: str):
+    """Route dependency answering 429 with Retry-After once the client's bucket for `route` is empty"""
+    async def check(request: Request, services: Services = Depends(get_services)):
+        rate_limiter = services.rate_limiter
+        wait = await rate_limiter.acquire(route, rate_limiter.client_address(request))
+        if wait:
+            raise HTTPException(status_code=429, detail="Too many requests, please retry later",
+                                headers={"Retry-After": str(max(1, int(wait + 0.999)))})
+    return Depends(check)
+
+# Bulk create: accepts a JSON array or a streamed NDJSON body and inserts in batches
+def parse_ndjson_line(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return ValueError(f"Invalid JSON: {e}")
+
+async def read_bulk_items(request: Request):
+    """Yield raw items from the request body, one at a time for NDJSON"""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield parse_ndjson_line(line)
+        if buffer.strip():
+            yield parse_ndjson_line(buffer)
+        return
+
+    try:
+        items = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array or NDJSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array or NDJSON")
+    for item in items:
+        yield item
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc']) or 'item'}: {e['msg']}" for e in error.errors())
+
+async def bulk_create(request: Request, services: Services, model, name: str, ordered: bool) -> BulkCreateResult:
+    """Validate and insert_many every item, reporting a result per item"""
+    collection = services.page_source(name)[0]
+    results: List[BulkItemResult] = []
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    stopped_at: Optional[int] = None
+
+    async def flush() -> Optional[int]:
+        """Insert the pending batch, returning the index of the first failed item"""
+        write_errors: Dict[int, str] = {}
+        created = []
+        try:
+            await collection.insert_many([doc for _, doc in batch], ordered=ordered)
+        except BulkWriteError as e:
+            write_errors = {err["index"]: err.get("errmsg", "Write failed") for err in e.details.get("writeErrors", [])}
+        first_error = min(write_errors) if write_errors else None
+        for position, (index, doc) in enumerate(batch):
+            if position in write_errors:
+                results.append(BulkItemResult(index=index, status="failed", error=write_errors[position]))
+            elif ordered and first_error is not None and position > first_error:
+                results.append(BulkItemResult(index=index, status="skipped"))
+            else:
+                results.append(BulkItemResult(index=index, status="created", id=doc["id"]))
+                created.append(doc)
+        await services.stats.count_created(name, created)
+        if created:
+            # Per batch, so subscribers hear about each item as soon as a refetch would return it
+            await services.content_changed(name)
+            services.event_stream.publish(name, "created", created)
+        failed_index = batch[first_error][0] if first_error is not None else None
+        batch.clear()
+        return failed_index
+
+    index = -1
+    async for raw in read_bulk_items(request):
+        index += 1
+        error = str(raw) if isinstance(raw, ValueError) else None
+        if error is None:
+            try:
+                item = model.model_validate(raw).dict()
+            except ValidationError as e:
+                error = validation_message(e)
+        if error is not None:
+            results.append(BulkItemResult(index=index, status="failed", error=error))
+            if ordered:
+                stopped_at = index
+                break
+            continue
+
+        item['id'] = str(uuid.uuid4())
+        item['created_at'] = datetime.utcnow()
+        await services.media_library.attach_images(name, item)
+        batch.append((index, item))
+        if len(batch) >= BULK_BATCH_SIZE:
+            failed_index = await flush()
+            if ordered and failed_index is not None:
+                stopped_at = failed_index
+                break
+
+    if batch:
+        # Items validated before an ordered-mode failure are still written, as Mongo would
+        failed_index = await flush()
+        if ordered and failed_index is not None:
+            if stopped_at is not None:
+                # The invalid item sits after the write failure, so it was never attempted
+                results[:] = [r for r in results if r.index != stopped_at]
+                results.append(BulkItemResult(index=stopped_at, status="skipped"))
+            stopped_at = failed_index
+
+    results.sort(key=lambda result: result.index)
+    inserted = sum(1 for result in results if result.status == "created")
+    return BulkCreateResult(
+        ordered=ordered,
+        inserted=inserted,
+        failed=sum(1 for result in results if result.status == "failed"),
+        stopped_at=stopped_at,
+        results=results,
+    )
 
 # Projects endpoints
-@app.get("/api/projects", response_model=List[Project])
-async def get_projects(featured_only: bool = False):
+@router.post("/api/projects/bulk", response_model=BulkCreateResult, dependencies=[rate_limited("projects")])
+async def create_projects_bulk(request: Request, ordered: bool = True, services: Services = Depends(get_services)):
+    """Create many projects from a JSON array or NDJSON body"""
+    return await bulk_create(request, services, Project, "projects", ordered)
+
+@router.get("/api/projects", response_model=List[Project])
+async def get_projects(request: Request, response: Response, featured_only: bool = False, limit: int = page_limit(),
+                       after: Optional[str] = None, fields: Optional[str] = None,
+                       services: Services = Depends(get_services)):
     """Get all projects or only featured ones"""
-    filter_query = {"featured": True} if featured_only else {}
-    projects = list(projects_collection.find(filter_query).sort("created_at", -1))
-    return [document_to_dict(project) for project in projects]
+    not_modified = conditional_get(request, response, "projects")
+    if not_modified:
+        return not_modified
+    projects, next_cursor = await services.load_page("projects", featured_only, limit, after, fields)
+    return page_response(response, projects, next_cursor)
 
-@app.post("/api/projects", response_model=Project)
-async def create_project(project: Project):
+@router.post("/api/projects", response_model=Project, dependencies=[rate_limited("projects")])
+async def create_project(project: Project, services: Services = Depends(get_services)):
     """Create a new project"""
     project_dict = project.dict()
     project_dict['id'] = str(uuid.uuid4())
     project_dict['created_at'] = datetime.utcnow()
+    await services.media_library.attach_images("projects", project_dict)
     
-    result = projects_collection.insert_one(project_dict)
+    result = await services.database.projects.insert_one(project_dict)
     if result.inserted_id:
+        await services.stats.count_created("projects", [project_dict])
+        await services.content_changed("projects")
+        services.event_stream.publish("projects", "created", [project_dict])
         return project_dict
     raise HTTPException(status_code=400, detail="Failed to create project")
 
-@app.get("/api/projects/{project_id}", response_model=Project)
-async def get_project(project_id: str):
+@router.get("/api/projects/{project_id}", response_model=Project)
+async def get_project(project_id: str, request: Request, response: Response,
+                      services: Services = Depends(get_services)):
     """Get a specific project by ID"""
-    project = projects_collection.find_one({"id": project_id})
+    not_modified = conditional_get(request, response, "projects")
+    if not_modified:
+        return not_modified
+    project = await services.database.projects.find_one({"id": project_id})
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     return document_to_dict(project)
 
 # Certifications endpoints
-@app.get("/api/certifications", response_model=List[Certification])
-async def get_certifications():
+@router.post("/api/certifications/bulk", response_model=BulkCreateResult, dependencies=[rate_limited("certifications")])
+async def create_certifications_bulk(request: Request, ordered: bool = True, services: Services = Depends(get_services)):
+    """Create many certifications from a JSON array or NDJSON body"""
+    return await bulk_create(request, services, Certification, "certifications", ordered)
+
+@router.get("/api/certifications", response_model=List[Certification])
+async def get_certifications(request: Request, response: Response, limit: int = page_limit(),
+                             after: Optional[str] = None, fields: Optional[str] = None,
+                             services: Services = Depends(get_services)):
     """Get all certifications"""
-    certifications = list(certifications_collection.find().sort("date_earned", -1))
-    return [document_to_dict(cert) for cert in certifications]
+    not_modified = conditional_get(request, response, "certifications")
+    if not_modified:
+        return not_modified
+    certifications, next_cursor = await services.load_page("certifications", False, limit, after, fields)
+    return page_response(response, certifications, next_cursor)
 
-@app.post("/api/certifications", response_model=Certification)
-async def create_certification(certification: Certification):
+@router.post("/api/certifications", response_model=Certification, dependencies=[rate_limited("certifications")])
+async def create_certification(certification: Certification, services: Services = Depends(get_services)):
     """Create a new certification"""
     cert_dict = certification.dict()
     cert_dict['id'] = str(uuid.uuid4())
     cert_dict['created_at'] = datetime.utcnow()
+    await services.media_library.attach_images("certifications", cert_dict)
     
-    result = certifications_collection.insert_one(cert_dict)
+    result = await services.database.certifications.insert_one(cert_dict)
     if result.inserted_id:
+        await services.stats.count_created("certifications", [cert_dict])
+        await services.content_changed("certifications")
+        services.event_stream.publish("certifications", "created", [cert_dict])
         return cert_dict
     raise HTTPException(status_code=400, detail="Failed to create certification")
 
 # Artwork endpoints
-@app.get("/api/artwork", response_model=List[Artwork])
-async def get_artwork():
+@router.post("/api/artwork/bulk", response_model=BulkCreateResult, dependencies=[rate_limited("artwork")])
+async def create_artwork_bulk(request: Request, ordered: bool = True, services: Services = Depends(get_services)):
+    """Create many artwork pieces from a JSON array or NDJSON body"""
+    return await bulk_create(request, services, Artwork, "artwork", ordered)
+
+@router.get("/api/artwork", response_model=List[Artwork])
+async def get_artwork(request: Request, response: Response, limit: int = page_limit(),
+                      after: Optional[str] = None, fields: Optional[str] = None,
+                      services: Services = Depends(get_services)):
     """Get all artwork pieces"""
-    artwork = list(artwork_collection.find().sort("created_at", -1))
-    return [document_to_dict(art) for art in artwork]
+    not_modified = conditional_get(request, response, "artwork")
+    if not_modified:
+        return not_modified
+    artwork, next_cursor = await services.load_page("artwork", False, limit, after, fields)
+    return page_response(response, artwork, next_cursor)
 
-@app.post("/api/artwork", response_model=Artwork)
-async def create_artwork(artwork: Artwork):
+@router.post("/api/artwork", response_model=Artwork, dependencies=[rate_limited("artwork")])
+async def create_artwork(artwork: Artwork, services: Services = Depends(get_services)):
     """Create a new artwork piece"""
     art_dict = artwork.dict()
     art_dict['id'] = str(uuid.uuid4())
     art_dict['created_at'] = datetime.utcnow()
+    await services.media_library.attach_images("artwork", art_dict)
     
-    result = artwork_collection.insert_one(art_dict)
+    result = await services.database.artwork.insert_one(art_dict)
     if result.inserted_id:
+        await services.stats.count_created("artwork", [art_dict])
+        await services.content_changed("artwork")
+        services.event_stream.publish("artwork", "created", [art_dict])
         return art_dict
     raise HTTPException(status_code=400, detail="Failed to create artwork")
 
 # About Me endpoints
-@app.get("/api/about", response_model=AboutMe)
-async def get_about():
+@router.get("/api/about", response_model=AboutMe)
+async def get_about(request: Request, response: Response, services: Services = Depends(get_services)):
     """Get about me information"""
-    about = about_collection.find_one()
-    if not about:
-        # Return default about info if none exists
-        return AboutMe(
-            id="default",
-            bio="AI Developer & Creative Technologist passionate about building intelligent systems and creating digital art.",
-            skills=["Python", "Machine Learning", "Deep Learning", "React", "FastAPI", "Digital Art"],
-            social_links={"github": "", "linkedin": "", "twitter": ""}
-        )
-    return document_to_dict(about)
+    not_modified = conditional_get(request, response, "about")
+    if not_modified:
+        return not_modified
+    about = services.content_snapshot.about()
+    if about is not None:
+        return Response(content=about, media_type="application/json", headers=dict(response.headers))
+    return await services.response_cache.get_or_load("about", None, services.load_about)
+
+# Homepage endpoint
+class Portfolio(BaseModel):
+    about: AboutMe
+    projects: List[Project]
+    certifications: List[Certification]
+    artwork: List[Artwork]
+    # Next-page cursor per list section (null when complete), for the section endpoints' `after=`
+    cursors: Dict[str, Optional[str]]
+
+@router.get("/api/portfolio", response_model=Portfolio)
+async def get_portfolio(request: Request, response: Response, featured_only: bool = False,
+                        projects_limit: int = page_limit(), certifications_limit: int = page_limit(),
+                        artwork_limit: int = page_limit(), services: Services = Depends(get_services)):
+    """Get every homepage section in one response"""
+    not_modified = conditional_get(request, response, "about", "projects", "certifications", "artwork")
+    if not_modified:
+        return not_modified
+
+    async def about_body():
+        about = services.content_snapshot.about()
+        if about is None:
+            about = encode_about(await services.response_cache.get_or_load("about", None, services.load_about))
+        return about
+
+    # Same sources as the section endpoints, so both paths share snapshot slices and cache entries
+    about, (projects, projects_next), (certifications, certifications_next), (artwork, artwork_next) = await asyncio.gather(
+        about_body(),
+        services.load_page("projects", featured_only, projects_limit, None, None),
+        services.load_page("certifications", False, certifications_limit, None, None),
+        services.load_page("artwork", False, artwork_limit, None, None),
+    )
+    cursors = {"projects": projects_next, "certifications": certifications_next, "artwork": artwork_next}
+    body = b"".join([
+        b'{"about":', about,
+        b',"projects":', projects,
+        b',"certifications":', certifications,
+        b',"artwork":', artwork,
+        b',"cursors":', dumps(cursors),
+        b"}",
+    ])
+    return Response(content=body, media_type="application/json", headers=dict(response.headers))
 
-@app.put("/api/about", response_model=AboutMe)
-async def update_about(about: AboutMe):
+@router.put("/api/about", response_model=AboutMe)
+async def update_about(about: AboutMe, services: Services = Depends(get_services)):
     """Update about me information"""
     about_dict = about.dict()
     about_dict['updated_at'] = datetime.utcnow()
+    await services.media_library.attach_images("about", about_dict)
     
-    existing = about_collection.find_one()
+    about_collection = services.database.about
+    existing = await about_collection.find_one()
     if existing:
         about_dict['id'] = existing.get('id', str(uuid.uuid4()))
-        about_collection.replace_one({"_id": existing["_id"]}, about_dict)
+        await about_collection.replace_one({"_id": existing["_id"]}, about_dict)
     else:
         about_dict['id'] = str(uuid.uuid4())
         about_dict['created_at'] = datetime.utcnow()
-        about_collection.insert_one(about_dict)
+        await about_collection.insert_one(about_dict)
     
+    await services.content_changed("about")
+    services.event_stream.publish("about", "updated", [about_dict])
     return about_dict
 
 # Contact endpoints
-@app.post("/api/contact", response_model=ContactMessage)
-async def submit_contact(message: ContactMessage):
+@router.post("/api/contact", response_model=ContactMessage, dependencies=[rate_limited("contact")])
+async def submit_contact(message: ContactMessage, services: Services = Depends(get_services)):
     """Submit a contact message"""
     message_dict = message.dict()
     message_dict['id'] = str(uuid.uuid4())
     message_dict['created_at'] = datetime.utcnow()
     
-    result = contact_collection.insert_one(message_dict)
-    if result.inserted_id:
+    if await services.rate_limiter.is_duplicate(message_dict):
+        return message_dict  # already received: acknowledge without storing it again
+
+    # insert_many adds _id to the documents it writes, so queue a copy
+    if services.contact_queue.put(dict(message_dict)):
         return message_dict
-    raise HTTPException(status_code=400, detail="Failed to submit contact message")
+    await services.rate_limiter.forget(message_dict)
+    raise HTTPException(status_code=503, detail="Contact queue is full, please retry shortly",
+                        headers={"Retry-After": str(max(1, int(services.contact_queue.flush_interval)))})
+
+@router.get("/api/contact/queue")
+async def get_contact_queue_stats(services: Services = Depends(get_services)):
+    """Contact ingestion queue depth and flush counters"""
+    return services.contact_queue.snapshot()
 
-@app.get("/api/contact", response_model=List[ContactMessage])
-async def get_contact_messages():
+@router.get("/api/rate-limits")
+async def get_rate_limit_stats(services: Services = Depends(get_services)):
+    """Rate limiter settings, tracked state and rejection/duplicate counters"""
+    return services.rate_limiter.snapshot()
+
+@router.get("/api/contact", response_model=List[ContactMessage])
+async def get_contact_messages(response: Response, limit: int = page_limit(),
+                               after: Optional[str] = None, fields: Optional[str] = None,
+                               output: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+                               since: Optional[datetime] = None, services: Services = Depends(get_services)):
     """Get all contact messages (admin only)"""
-    messages = list(contact_collection.find().sort("created_at", -1))
-    return [document_to_dict(msg) for msg in messages]
+    contact_collection = services.database.contact
+    if output == "ndjson":
+        return export_response(contact_collection, ContactMessage, since)
+    field_list = parse_fields(fields, ContactMessage)
+    messages, next_cursor = await find_page(contact_collection, ContactMessage, {}, "created_at", limit, after, field_list)
+    return page_response(response, messages, next_cursor)
+
+# Media endpoints
+@router.post("/api/media", response_model=MediaItem, dependencies=[rate_limited("media")])
+async def upload_media(file: UploadFile = File(...), services: Services = Depends(get_services)):
+    """Upload an image; reference it from image_url fields as the returned url"""
+    media_library = services.media_library
+    require_images(media_library)
+    doc = await media_library.upload(file)
+    return {**doc, "url": f"/api/media/{doc['id']}"}
+
+@router.get("/api/media/{media_id}")
+async def get_media(media_id: str, request: Request, w: Optional[int] = Query(None, ge=1),
+                    fmt: Optional[str] = None, services: Services = Depends(get_services)):
+    """A derivative of an uploaded image: `w` is rounded up to a configured width, `fmt` defaults to the best the client accepts"""
+    media_library = services.media_library
+    require_images(media_library)
+    doc = await media_library.document(media_id)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    width = media_library.choose_width(w, doc["width"])
+    image_format = media_library.choose_format(fmt, request.headers.get("accept", ""), doc)
+    etag = media_library.etag(doc, width, image_format)
+
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if fmt is None:
+        headers["Vary"] = "Accept"
+    # The tag comes from the derivative's key, so a revalidation never renders an evicted derivative
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        metrics.inc("portfolio_media_requests_total", {"result": "not_modified"})
+        return Response(status_code=304, headers=headers)
+    _, path = await media_library.derivative(doc, width, image_format)
+    return FileResponse(path, media_type=f"image/{image_format}", headers=headers)
+
+# Events endpoints
+@router.get("/api/events")
+async def get_events(request: Request, topics: Optional[str] = None, last_event_id: Optional[int] = None,
+                     services: Services = Depends(get_services)):
+    """Stream content and contact events; reconnect with Last-Event-ID to receive what was missed"""
+    selected = set(EventStream.TOPICS)
+    if topics:
+        selected = {topic.strip() for topic in topics.split(",") if topic.strip()}
+        unknown = selected - set(EventStream.TOPICS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown topics: {', '.join(sorted(unknown))}")
+    header = request.headers.get("last-event-id")
+    if header is not None:
+        try:
+            last_event_id = int(header)
+        except ValueError:
+            last_event_id = None
+    return StreamingResponse(services.event_stream.subscribe(last_event_id, selected), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/api/events/stats")
+async def get_event_stats(services: Services = Depends(get_services)):
+    """Subscriber count, replay buffer state and publish counters"""
+    return services.event_stream.snapshot()
+
+# Search endpoint: one $text + $facet aggregation returns ranked results and facet counts
+SEARCH_TYPES = {
+    # type -> field holding "technologies" style tags, and the expression used for the year facet
+    "projects": {"tag_field": "technologies", "year": {"$toString": {"$year": "$created_at"}}},
+    "artwork": {"tag_field": "medium", "year": "$year_created"},
+}
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class SearchResponse(BaseModel):
+    type: str
+    query: Optional[str] = None
+    total: int
+    offset: int
+    limit: int
+    results: List[Dict[str, Any]]
+    facets: Dict[str, List[FacetCount]]
+
+def search_pipeline(search_type: str, q: Optional[str], category: Optional[str], technology: Optional[str],
+                    year: Optional[str], offset: int, limit: int) -> List[Dict[str, Any]]:
+    config = SEARCH_TYPES[search_type]
+    match: Dict[str, Any] = {}
+    if q:
+        match["$text"] = {"$search": q}
+    if category:
+        match["category"] = category
+    if technology:
+        match[config["tag_field"]] = technology
+    if year:
+        match["$expr"] = {"$eq": [config["year"], year]}
+
+    sort = {"score": -1, "created_at": -1, "_id": -1} if q else {"created_at": -1, "_id": -1}
+    facet_group = lambda key: [{"$group": {"_id": key, "count": {"$sum": 1}}}, {"$match": {"_id": {"$ne": None}}},
+                               {"$sort": {"count": -1, "_id": 1}}]
+    pipeline: List[Dict[str, Any]] = [{"$match": match}]
+    if q:
+        pipeline.append({"$addFields": {"score": {"$meta": "textScore"}}})
+    pipeline.append({"$facet": {
+        "results": [{"$sort": sort}, {"$skip": offset}, {"$limit": limit}],
+        "total": [{"$count": "count"}],
+        "category": facet_group("$category"),
+        "technology": [{"$unwind": f"${config['tag_field']}"}] + facet_group(f"${config['tag_field']}"),
+        "year": facet_group(config["year"]),
+    }})
+    return pipeline
+
+@router.get("/api/search", response_model=SearchResponse)
+async def search(q: Optional[str] = None,
+                 search_type: str = Query("projects", alias="type", pattern="^(projects|artwork)$"),
+                 category: Optional[str] = None, technology: Optional[str] = None, year: Optional[str] = None,
+                 offset: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+                 services: Services = Depends(get_services)):
+    """Ranked full-text search over projects or artwork with category/technology/year facets"""
+    collection, model = services.page_source(search_type)[:2]
+
+    async def run_search():
+        pipeline = search_pipeline(search_type, q, category, technology, year, offset, limit)
+        facets = (await collection.aggregate(pipeline, primary=True))[0]
+        results = []
+        for doc in facets["results"]:
+            item = document_to_dict(doc)
+            result = wire_item(item, model)
+            if "score" in item:
+                result["score"] = item["score"]
+            results.append(result)
+        return SearchResponse(
+            type=search_type,
+            query=q,
+            total=facets["total"][0]["count"] if facets["total"] else 0,
+            offset=offset,
+            limit=limit,
+            results=results,
+            facets={name: [FacetCount(value=str(f["_id"]), count=f["count"]) for f in facets[name]]
+                    for name in ("category", "technology", "year")},
+        )
+
+    return await services.response_cache.get_or_load(search_type, ("search", q, category, technology, year, offset, limit), run_search)
+
+# Statistics and exports
+class CollectionStats(BaseModel):
+    total: int = 0
+    latest: Optional[datetime] = None
+    facets: Dict[str, List[FacetCount]] = {}
+
+class PortfolioStats(BaseModel):
+    projects: CollectionStats
+    certifications: CollectionStats
+    artwork: CollectionStats
+
+@router.get("/api/stats", response_model=PortfolioStats)
+async def get_stats(request: Request, response: Response, services: Services = Depends(get_services)):
+    """Totals, latest timestamps and facet counts per collection, read from precomputed counters"""
+    # Writes to the collections change the counters; "stats" itself only moves when they are rebuilt
+    not_modified = conditional_get(request, response, *STAT_FACETS, "stats")
+    if not_modified:
+        return not_modified
+    return await services.response_cache.get_or_load("stats", None, services.stats.load)
+
+@router.get("/api/export/{collection_name}")
+async def export_collection(collection_name: str, since: Optional[datetime] = None,
+                            services: Services = Depends(get_services)):
+    """Stream a full collection as NDJSON, optionally only documents created after `since`"""
+    exports = {
+        "projects": (services.database.projects, Project),
+        "certifications": (services.database.certifications, Certification),
+        "artwork": (services.database.artwork, Artwork),
+        "contact": (services.database.contact, ContactMessage),
+    }
+    if collection_name not in exports:
+        raise HTTPException(status_code=404, detail="Unknown collection")
+    return export_response(*exports[collection_name], since)
+
+@router.get("/api/cache/stats")
+async def get_cache_stats(services: Services = Depends(get_services)):
+    """Response cache hit/miss/eviction counters and snapshot state"""
+    return {**services.response_cache.snapshot(), "snapshot": services.content_snapshot.snapshot(),
+            "compressed": services.compressed_cache.snapshot(), "media": services.media_library.snapshot()}
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(services: Services = Depends(get_services)):
+    """Prometheus scrape endpoint"""
+    response_cache, contact_queue = services.response_cache, services.contact_queue
+    metrics.set("portfolio_cache_entries", {}, len(response_cache.entries))
+    for name, value in response_cache.stats.items():
+        metrics.set("portfolio_cache_events_total", {"event": name}, value)
+    metrics.set("portfolio_contact_queue_depth", {}, len(contact_queue.pending))
+    metrics.set("portfolio_event_subscribers", {}, services.event_stream.subscribers)
+    for name, value in contact_queue.stats.items():
+        metrics.set("portfolio_contact_queue_events_total", {"event": name}, value)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 # Health check
-@app.get("/api/health")
-async def health_check():
+@router.get("/api/health")
+async def health_check(services: Services = Depends(get_services)):
     """Health check endpoint"""
+    database_health, index_status = services.database_health, services.database.index_status
+    ping = await database_health.snapshot()
+    if database_health.ok:
+        return {"status": "healthy", "database": "connected", "indexes": index_status, "ping": ping,
+                "invalidation": services.invalidation_channel.mode}
+    return {"status": "unhealthy", "error": database_health.error, "indexes": index_status, "ping": ping}
+
+@router.get("/api/health/live")
+async def liveness_check():
+    """Liveness probe: the process is serving requests, no database round trip"""
+    return {"status": "alive"}
+
+@router.get("/api/health/ready")
+async def readiness_check(response: Response, services: Services = Depends(get_services)):
+    """Readiness probe: answered from the last background ping, and 503 while warm-up is running"""
+    database_health, warm_up = services.database_health, services.warm_up
+    ping = await database_health.snapshot()
+    if not database_health.ok:
+        response.status_code = 503
+        return {"status": "not ready", "error": database_health.error, "ping": ping, "warm_up": warm_up}
+    if warm_up["status"] == "pending":
+        response.status_code = 503
+        return {"status": "warming up", "ping": ping, "warm_up": warm_up}
+    return {"status": "ready", "ping": ping, "warm_up": warm_up}
+
+# App
+# Responses that stay open while data trickles out; metrics times them apart from ordinary requests
+STREAMING_ROUTES = ("/api/events", "/api/export/{collection_name}")
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background services and warm-up; on exit drain queued writes and close the connection pools"""
+    services: Services = app.state.services
+    services.start()
     try:
-        # Test database connection
-        client.admin.command('ping')
-        return {"status": "healthy", "database": "connected"}
-    except Exception as e:
-        return {"status": "unhealthy", "error": str(e)}
+        yield
+    finally:
+        await services.stop()
 
-if __name__ == "__main__":
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """Build the API with its own services; nothing connects to the database until it is used"""
+    settings = settings or Settings()
+    services = Services(settings)
+
+    app = FastAPI(title="Portfolio API", version="1.0.0", lifespan=lifespan)
+    app.state.settings = settings
+    app.state.services = services
+    app.include_router(router)
+    # Middleware added last runs first: metrics, compression, CORS, the static export, then the upload limit,
+    # so exported responses get the same CORS headers as the live path and static hits and compression are timed
+    app.add_middleware(UploadLimitMiddleware, path="/api/media", max_bytes=MEDIA_MAX_UPLOAD_BYTES + MEDIA_UPLOAD_OVERHEAD)
+    if services.static_export:
+        app.add_middleware(StaticExportMiddleware, export=services.static_export)
+        # Hashed file names never change content, so a CDN can pull and cache them indefinitely
+        app.mount(STATIC_EXPORT_PREFIX, StaticFiles(directory=settings.static_export_dir, check_dir=False),
+                  name="static-export")
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
+    )
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_size,
+                       encodings=available_encodings(settings.compression_encodings), cache=services.compressed_cache)
+    app.add_middleware(MetricsMiddleware, streaming_routes=STREAMING_ROUTES)
+    return app
+
+app = create_app()
+
+def serve_workers(config) -> None:
+    """Run config.workers uvicorn processes on one shared socket; SIGHUP replaces them all (a graceful reload)"""
+    import signal
+    import uvicorn
+    from uvicorn.supervisors import Multiprocess
+
+    def retire(processes):
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join((config.timeout_graceful_shutdown or 0) + 5)
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+    class Supervisor(Multiprocess):
+        def run(self):
+            reload_requested = threading.Event()
+            self.startup()
+            signal.signal(signal.SIGHUP, lambda *_: reload_requested.set())
+            logger.info("Supervisor %d running %d workers; send SIGHUP to reload them", self.pid, config.workers)
+            while not self.should_exit.wait(0.5):
+                if reload_requested.is_set():
+                    reload_requested.clear()
+                    logger.info("Reloading: starting %d new workers, then stopping the old ones", config.workers)
+                    # The socket stays open throughout, so connections queue for the new workers
+                    previous, self.processes = self.processes, []
+                    self.startup()
+                    retire(previous)
+            retire(self.processes)
+
+    sockets = [config.bind_socket()]
+    try:
+        Supervisor(config, target=uvicorn.Server(config).run, sockets=sockets).run()
+    finally:
+        for sock in sockets:
+            sock.close()
+
+def main():
+    """Serve the API, optionally with several worker processes sharing the port"""
+    import argparse
+    import importlib.util
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+
+    parser = argparse.ArgumentParser(description="Portfolio API server")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8001")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", "1")),
+                        help="worker processes; with more than one, SIGHUP reloads them gracefully")
+    parser.add_argument("--reload", action="store_true", help="restart on code changes (development, single worker)")
+    parser.add_argument("--graceful-timeout", type=int, default=30,
+                        help="seconds to let in-flight requests and queued writes finish on shutdown")
+    parser.add_argument("--export-static", metavar="DIR",
+                        help="write the public GET responses to DIR as precompressed static files and exit")
+    parser.add_argument("--rebuild-stats", action="store_true",
+                        help="recount the /api/stats counters from the collections to repair drift, and exit")
+    args = parser.parse_args()
+
+    if app.state.settings.storage_backend == "memory" and args.workers > 1:
+        parser.error("STORAGE_BACKEND=memory keeps data per process; use a single worker")
+
+    if args.export_static:
+        os.makedirs(args.export_static, exist_ok=True)
+        exporter = StaticExport(app.state.services, args.export_static)
+        exporter.reload()
+        try:
+            manifest = asyncio.run(exporter.export(app))
+        finally:
+            app.state.services.database.close()
+        print(f"Exported {len(manifest['routes'])} responses to {args.export_static}")
+        return
+
+    if args.rebuild_stats:
+        if app.state.settings.storage_backend == "memory":
+            parser.error("STORAGE_BACKEND=memory has nothing to rebuild outside the serving process")
+        services = app.state.services
+
+        async def rebuild_stats():
+            totals = await services.stats.rebuild()
+            # Only the counters changed: bumping the content versions would invalidate every ETag and the snapshot
+            await services.content_changed("stats")
+            return totals
+        try:
+            totals = asyncio.run(rebuild_stats())
+        finally:
+            services.database.close()
+        print("Rebuilt stats: " + ", ".join(f"{name} {total}" for name, total in totals.items()))
+        return
+
+    options = dict(
+        host=args.host,
+        port=args.port,
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "auto",
+        http="httptools" if importlib.util.find_spec("httptools") else "auto",
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
+    # Workers and reload need an import string so each process builds its own app and Mongo client;
+    # a single worker serves this module's app directly instead of importing the module a second time
+    if args.workers > 1 and not args.reload:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        serve_workers(uvicorn.Config("server:app", workers=args.workers, **options))
+        return
+    uvicorn.run(
+        "server:app" if args.reload else app,
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        reload=args.reload,
+        **options,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""The caches, queues and background services one app owns"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request
+
+from settings import HEALTH_PING_INTERVAL, Settings
+from database import Database, DatabaseHealth
+from models import AboutMe, Artwork, Certification, Project
+from encoding import document_to_dict
+from pagination import find_page, parse_fields
+from caching import ContentVersions, InvalidationChannel, ResponseCache
+from snapshot import ContentSnapshot
+from ratelimit import RateLimiter
+from contact_queue import ContactIngestQueue
+from media_library import MediaLibrary
+from events import EventStream
+from stats import STAT_FACETS, StatsCounters
+from static_export import StaticExport
+
+logger = logging.getLogger("portfolio")
+
+class Services:
+    """Everything one app owns: its database connection, caches, queues and background tasks"""
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.database = Database(settings)
+        self.content_versions = ContentVersions()
+        self.response_cache = ResponseCache(settings.cache_max_entries, settings.cache_ttl_seconds)
+        # Keyed by URI and ETag, so an entry can never outlive the content it was compressed from
+        self.compressed_cache = ResponseCache(settings.compression_cache_entries, settings.cache_ttl_seconds)
+        self.invalidation_channel = InvalidationChannel(self, settings.invalidation_poll_interval)
+        self.content_snapshot = ContentSnapshot(self, settings.snapshot_dir, settings.snapshot_debounce)
+        self.rate_limiter = RateLimiter(self.database, settings.rate_limit_per_minute, settings.rate_limit_burst,
+                                        settings.rate_limit_max_clients, settings.contact_dedup_window,
+                                        settings.rate_limit_shared, settings.trusted_proxies)
+        self.event_stream = EventStream(self.database, settings.events_replay_size, settings.events_keepalive,
+                                        settings.invalidation_poll_interval)
+        self.contact_queue = ContactIngestQueue(self, settings.contact_queue_max_size, settings.contact_flush_batch_size,
+                                                settings.contact_flush_interval, settings.contact_drain_timeout)
+        self.media_library = MediaLibrary(self.database, settings.media_dir, settings.media_cache_max_bytes,
+                                          settings.media_widths, settings.media_quality, settings.media_workers)
+        self.stats = StatsCounters(self.database)
+        self.database_health = DatabaseHealth(self.database, HEALTH_PING_INTERVAL)
+        self.static_export = StaticExport(self, settings.static_export_dir) if settings.static_export_dir else None
+        self.warm_up: Dict[str, Any] = {"status": "not started"}  # readiness answers 503 while "pending"
+        self.warm_up_task: Optional[asyncio.Task] = None
+
+    def page_source(self, name: str):
+        """(collection, model, sort field) behind each public list endpoint"""
+        return {
+            "projects": (self.database.projects, Project, "created_at"),
+            "certifications": (self.database.certifications, Certification, "date_earned"),
+            "artwork": (self.database.artwork, Artwork, "created_at"),
+        }[name]
+
+    async def load_about(self):
+        about = await self.database.about.find_one()
+        if not about:
+            # Return default about info if none exists
+            return AboutMe(
+                id="default",
+                bio="AI Developer & Creative Technologist passionate about building intelligent systems and creating digital art.",
+                skills=["Python", "Machine Learning", "Deep Learning", "React", "FastAPI", "Digital Art"],
+                social_links={"github": "", "linkedin": "", "twitter": ""}
+            )
+        return document_to_dict(about)
+
+    def drop_cached(self, name: str):
+        """Forget every in-process copy of a collection's content"""
+        self.response_cache.invalidate(name)
+        if name in STAT_FACETS:
+            self.response_cache.invalidate("stats")
+        self.content_snapshot.mark_stale(name)
+
+    async def content_changed(self, name: str):
+        """Called by every write handler: drop cached reads here, then publish the change to other workers"""
+        self.drop_cached(name)
+        await self.invalidation_channel.publish(name)
+
+    async def load_page(self, name: str, featured_only: bool, limit: int, after: Optional[str],
+                        fields: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """A pre-encoded list page: from the snapshot, else the response cache, else Mongo"""
+        if not fields:
+            page = self.content_snapshot.page(name, featured_only, limit, after)
+            if page is not None:
+                return page
+        collection, model, sort_field = self.page_source(name)
+        field_list = parse_fields(fields, model)
+        filter_query = {"featured": True} if featured_only else {}
+        return await self.response_cache.get_or_load(
+            name, (featured_only, limit, after, fields),
+            lambda: find_page(collection, model, filter_query, sort_field, limit, after, field_list, primary=True))
+
+    def start(self):
+        """Start the background tasks and warm-up"""
+        self.warm_up = {"status": "pending"}
+        self.contact_queue.start()
+        self.database_health.start()
+        self.event_stream.start()
+        self.warm_up_task = asyncio.get_running_loop().create_task(self.run_warm_up())
+
+    async def run_warm_up(self):
+        """Build indexes, the snapshot and any missing stats concurrently; readiness reports 503 until this finishes"""
+        started = time.perf_counter()
+        try:
+            # Adopt the shared content versions first so the snapshot warm start can be validated
+            await self.invalidation_channel.ensure((*ContentSnapshot.SECTIONS, "stats"))
+            await self.invalidation_channel.sync()
+        except Exception as e:
+            logger.warning("Could not load shared content versions: %s", e)
+        self.invalidation_channel.start()
+        error = None
+        try:
+            await asyncio.gather(self.database.ensure_indexes(), self.content_snapshot.start(),
+                                 self.database_health.check(), self.ensure_stats())
+            if self.static_export:
+                self.static_export.reload()
+        except Exception as e:
+            # Everything warmed here also has a slower live path, so a failure must not keep the app unready
+            logger.warning("Warm-up failed: %s", e)
+            error = str(e)
+        self.warm_up = {"status": "done", "seconds": round(time.perf_counter() - started, 3), "error": error}
+
+    async def ensure_stats(self):
+        if await self.stats.ensure():
+            self.response_cache.invalidate("stats")
+
+    async def stop(self):
+        """Stop the background tasks, drain queued writes and close the connection pools"""
+        if self.warm_up_task:
+            self.warm_up_task.cancel()
+            try:
+                await self.warm_up_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self.warm_up_task = None
+        await self.database_health.stop()
+        await self.invalidation_channel.stop()
+        await self.content_snapshot.stop()
+        await self.contact_queue.stop()
+        await self.event_stream.stop()
+        self.media_library.shutdown()
+        self.database.close()
+
+def get_services(request: Request) -> Services:
+    """Route dependency: the services of the app serving the request"""
+    return request.app.state.services
@@ -0,0 +1,108 @@
+"""Deployment settings, read from the environment"""
+
+import os
+from typing import List
+
+from pydantic import BaseModel
+
+# MongoDB connection
+# "mongo", "sqlite" (a local file, for edge/preview instances) or "memory" (per process, lost on exit)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'mongo').lower()
+SQLITE_PATH = os.environ.get('SQLITE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'portfolio.sqlite3'))
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
+MONGO_DB_NAME = os.environ.get('MONGO_DB_NAME', 'portfolio_db')
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+# Unset means the pymongo default; set to fail fast instead of queueing behind a saturated pool
+MONGO_WAIT_QUEUE_TIMEOUT_MS = os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS')
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '30000'))
+MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', '')  # e.g. "zstd,snappy,zlib"
+# Read preference for uncached list and export reads. Reads that fill the response cache or the snapshot,
+# id lookups and read-modify-write stay on the primary: a lagging secondary would cache old content under
+# the new content version
+MONGO_LIST_READ_PREFERENCE = os.environ.get('MONGO_LIST_READ_PREFERENCE', 'primary')
+# "auto" enables TLS with certifi's CA bundle for mongodb+srv:// (Atlas) URLs
+MONGO_TLS = os.environ.get('MONGO_TLS', 'auto').lower()
+INVALIDATION_POLL_INTERVAL = float(os.environ.get('INVALIDATION_POLL_INTERVAL', '1.0'))
+# Materialized snapshot of the public content, rebuilt after writes and kept on disk for warm starts
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.snapshot'))
+SNAPSHOT_DEBOUNCE = float(os.environ.get('SNAPSHOT_DEBOUNCE', '0.5'))
+# Directory written by `server.py --export-static`; when set, exported GETs are served from it
+STATIC_EXPORT_DIR = os.environ.get('STATIC_EXPORT_DIR', '')
+# Responses smaller than this are sent uncompressed; encodings are tried in this order of preference
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_ENCODINGS = os.environ.get('COMPRESSION_ENCODINGS', 'br,zstd,gzip')
+COMPRESSION_CACHE_ENTRIES = int(os.environ.get('COMPRESSION_CACHE_ENTRIES', '256'))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '5'))
+ZSTD_LEVEL = int(os.environ.get('ZSTD_LEVEL', '3'))
+# Uploaded originals and their resized derivatives (/api/media); derivatives are evicted LRU once the directory,
+# shared by all workers, holds more than MEDIA_CACHE_MAX_BYTES of them
+MEDIA_DIR = os.environ.get('MEDIA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads'))
+MEDIA_MAX_UPLOAD_BYTES = int(os.environ.get('MEDIA_MAX_UPLOAD_BYTES', str(20 * 1024 * 1024)))
+MEDIA_UPLOAD_OVERHEAD = 64 * 1024  # multipart boundaries and part headers allowed on top of the image
+MEDIA_CACHE_MAX_BYTES = int(os.environ.get('MEDIA_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+# Requested widths are rounded up to one of these, so the cache holds a bounded set of sizes per image
+MEDIA_WIDTHS = [int(w) for w in os.environ.get('MEDIA_WIDTHS', '160,320,480,640,960,1280,1920').split(',')]
+MEDIA_QUALITY = int(os.environ.get('MEDIA_QUALITY', '75'))
+MEDIA_WORKERS = int(os.environ.get('MEDIA_WORKERS', str(min(4, os.cpu_count() or 1))))  # processes per API worker
+# Server-Sent Events (/api/events): events kept per worker for Last-Event-ID resume, and idle keepalive interval
+EVENTS_REPLAY_SIZE = int(os.environ.get('EVENTS_REPLAY_SIZE', '1000'))
+EVENTS_KEEPALIVE = float(os.environ.get('EVENTS_KEEPALIVE', '15'))
+EVENTS_RETENTION = int(os.environ.get('EVENTS_RETENTION', '86400'))  # seconds an event stays in the database
+HEALTH_PING_INTERVAL = float(os.environ.get('HEALTH_PING_INTERVAL', '5'))
+# pymongo is blocking, so every database call runs on this bounded pool instead of the event loop
+DB_THREAD_POOL_SIZE = int(os.environ.get('DB_THREAD_POOL_SIZE', '32'))
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', '100'))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '500'))
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '500'))
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', '500'))
+CONTACT_QUEUE_MAX_SIZE = int(os.environ.get('CONTACT_QUEUE_MAX_SIZE', '10000'))
+CONTACT_FLUSH_BATCH_SIZE = int(os.environ.get('CONTACT_FLUSH_BATCH_SIZE', '100'))
+CONTACT_FLUSH_INTERVAL = float(os.environ.get('CONTACT_FLUSH_INTERVAL', '1.0'))
+CONTACT_DRAIN_TIMEOUT = float(os.environ.get('CONTACT_DRAIN_TIMEOUT', '10'))  # seconds shutdown retries a failing flush
+# Token buckets per client IP and write route: RATE_LIMIT_BURST requests at once, refilled at RATE_LIMIT_PER_MINUTE
+RATE_LIMIT_PER_MINUTE = float(os.environ.get('RATE_LIMIT_PER_MINUTE', '20'))  # 0 disables rate limiting
+RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', '10'))
+RATE_LIMIT_MAX_CLIENTS = int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', '10000'))
+# Keep buckets and contact fingerprints in the database so every worker enforces the same limits
+RATE_LIMIT_SHARED = os.environ.get('RATE_LIMIT_SHARED', 'false').lower() in ('1', 'true', 'yes')
+# Reverse proxies (addresses or networks) whose X-Forwarded-For names the client; unset keys buckets on the
+# socket peer, which behind nginx is the proxy itself, so every visitor would share one bucket
+TRUSTED_PROXIES = os.environ.get('TRUSTED_PROXIES', '')  # e.g. "127.0.0.1,10.0.0.0/8"
+CONTACT_DEDUP_WINDOW = float(os.environ.get('CONTACT_DEDUP_WINDOW', '600'))  # seconds; 0 disables
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '256'))
+CACHE_TTL_SECONDS = float(os.environ.get('CACHE_TTL_SECONDS', '300'))
+
+class Settings(BaseModel):
+    """Deployment settings accepted by create_app(); defaults come from the environment variables above"""
+    storage_backend: str = STORAGE_BACKEND
+    mongo_url: str = MONGO_URL
+    mongo_db_name: str = MONGO_DB_NAME
+    sqlite_path: str = SQLITE_PATH
+    static_export_dir: str = STATIC_EXPORT_DIR
+    media_dir: str = MEDIA_DIR
+    compression_min_size: int = COMPRESSION_MIN_SIZE
+    compression_encodings: str = COMPRESSION_ENCODINGS
+    compression_cache_entries: int = COMPRESSION_CACHE_ENTRIES
+    snapshot_dir: str = SNAPSHOT_DIR
+    snapshot_debounce: float = SNAPSHOT_DEBOUNCE
+    cache_max_entries: int = CACHE_MAX_ENTRIES
+    cache_ttl_seconds: float = CACHE_TTL_SECONDS
+    invalidation_poll_interval: float = INVALIDATION_POLL_INTERVAL
+    rate_limit_per_minute: float = RATE_LIMIT_PER_MINUTE
+    rate_limit_burst: int = RATE_LIMIT_BURST
+    rate_limit_max_clients: int = RATE_LIMIT_MAX_CLIENTS
+    rate_limit_shared: bool = RATE_LIMIT_SHARED
+    trusted_proxies: str = TRUSTED_PROXIES
+    contact_dedup_window: float = CONTACT_DEDUP_WINDOW
+    contact_queue_max_size: int = CONTACT_QUEUE_MAX_SIZE
+    contact_flush_batch_size: int = CONTACT_FLUSH_BATCH_SIZE
+    contact_flush_interval: float = CONTACT_FLUSH_INTERVAL
+    contact_drain_timeout: float = CONTACT_DRAIN_TIMEOUT
+    media_cache_max_bytes: int = MEDIA_CACHE_MAX_BYTES
+    media_widths: List[int] = MEDIA_WIDTHS
+    media_quality: int = MEDIA_QUALITY
+    media_workers: int = MEDIA_WORKERS
+    events_replay_size: int = EVENTS_REPLAY_SIZE
+    events_keepalive: float = EVENTS_KEEPALIVE
@@ -0,0 +1,176 @@
+"""Materialized snapshot of the public content, rebuilt after writes and kept on disk for warm starts"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from bson import ObjectId
+
+from encoding import document_to_dict, dumps, encode_about, wire_item
+from pagination import decode_cursor, encode_cursor
+
+if TYPE_CHECKING:
+    from services import Services
+
+logger = logging.getLogger("portfolio")
+
+class ContentSnapshot:
+    """Pre-sorted, pre-encoded public sections, rebuilt after writes and persisted for warm starts"""
+
+    SECTIONS = ("projects", "certifications", "artwork", "about")
+
+    def __init__(self, services: "Services", directory: str, debounce: float):
+        self.services = services
+        self.directory = directory
+        self.debounce = debounce
+        self.sections: Dict[str, Dict[str, Any]] = {}
+        self.rebuilds: Dict[str, asyncio.Task] = {}
+        self.stats = {"builds": 0, "warm_starts": 0, "served": 0, "fallbacks": 0}
+
+    def mark_stale(self, name: str):
+        if name not in self.SECTIONS:
+            return
+        self.sections.pop(name, None)
+        pending = self.rebuilds.pop(name, None)
+        if pending:
+            pending.cancel()
+        self.rebuilds[name] = asyncio.get_running_loop().create_task(self.rebuild_later(name))
+
+    async def rebuild_later(self, name: str):
+        await asyncio.sleep(self.debounce)
+        try:
+            await self.build(name)
+        except Exception as e:
+            logger.warning("Snapshot rebuild of %s failed: %s", name, e)
+        finally:
+            if self.rebuilds.get(name) is asyncio.current_task():
+                del self.rebuilds[name]
+
+    async def build(self, name: str):
+        content_versions = self.services.content_versions
+        version = content_versions.versions.get(name)
+        if name == "about":
+            section = {"about": encode_about(await self.services.load_about())}
+        else:
+            collection, model, sort_field = self.services.page_source(name)
+            docs = await collection.find({}, sort=[(sort_field, -1), ("_id", -1)], primary=True)
+            keys = [(doc.get(sort_field), doc["_id"]) for doc in docs]
+            featured = [bool(doc.get("featured")) for doc in docs]
+            items = [dumps(wire_item(item, model)) for item in map(document_to_dict, docs)]
+            section = {"sort_field": sort_field, "views": {False: (keys, items)}}
+            if name == "projects":
+                section["views"][True] = ([k for k, f in zip(keys, featured) if f],
+                                          [i for i, f in zip(items, featured) if f])
+        if content_versions.versions.get(name) != version:
+            return  # written to while building; the newer rebuild will replace it
+        section["version"] = version
+        self.sections[name] = section
+        self.stats["builds"] += 1
+        await self.services.database.run_blocking(self.save, name, section)
+
+    def page(self, name: str, featured_only: bool, limit: int, after: Optional[str]) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Slice a pre-encoded page out of the snapshot, or None if the section is not built"""
+        section = self.sections.get(name)
+        view = section["views"].get(featured_only) if section else None
+        if view is None:
+            self.stats["fallbacks"] += 1
+            return None
+        keys, items = view
+        start = 0
+        if after:
+            cursor_key = decode_cursor(after)
+            # keys are in descending order; find the first key that sorts below the cursor
+            low, high = 0, len(keys)
+            try:
+                while low < high:
+                    middle = (low + high) // 2
+                    if keys[middle] < cursor_key:
+                        high = middle
+                    else:
+                        low = middle + 1
+            except TypeError:
+                self.stats["fallbacks"] += 1
+                return None
+            start = low
+        end = start + limit
+        next_cursor = None
+        if end < len(items):
+            value, last_id = keys[end - 1]
+            next_cursor = encode_cursor({section["sort_field"]: value, "_id": last_id}, section["sort_field"])
+        self.stats["served"] += 1
+        return b"[" + b",".join(items[start:end]) + b"]", next_cursor
+
+    def about(self) -> Optional[bytes]:
+        section = self.sections.get("about")
+        return section["about"] if section else None
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.json")
+
+    def save(self, name: str, section: Dict[str, Any]):
+        """Write a section atomically: items are embedded as already-encoded JSON"""
+        os.makedirs(self.directory, exist_ok=True)
+        header = {"version": section["version"]}
+        if name == "about":
+            body = b'{"header":' + dumps(header) + b',"about":' + section["about"] + b"}"
+        else:
+            keys, items = section["views"][False]
+            header["sort_field"] = section["sort_field"]
+            header["keys"] = [[value, str(last_id)] for value, last_id in keys]
+            header["datetime_keys"] = any(isinstance(value, datetime) for value, _ in keys)
+            body = b'{"header":' + dumps(header) + b',"items":[' + b",".join(items) + b"]}"
+        # Builds of one section can overlap (warm-up and a write's rebuild), each saving on its own pool thread
+        temporary = f"{self.path(name)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(body)
+        os.replace(temporary, self.path(name))
+
+    def load(self, name: str) -> bool:
+        """Warm-start a section from disk if it was built from the current content version"""
+        try:
+            with open(self.path(name), "rb") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return False
+        header = stored["header"]
+        version = tuple(header["version"]) if header["version"] else None
+        if version is None or version != self.services.content_versions.versions.get(name):
+            return False
+        if name == "about":
+            section = {"about": dumps(stored["about"])}
+        else:
+            parse = datetime.fromisoformat if header["datetime_keys"] else (lambda value: value)
+            keys = [(parse(value) if value is not None else None, ObjectId(last_id)) for value, last_id in header["keys"]]
+            items = [dumps(item) for item in stored["items"]]
+            section = {"sort_field": header["sort_field"], "views": {False: (keys, items)}}
+            if name == "projects":
+                featured = [item.get("featured", False) for item in stored["items"]]
+                section["views"][True] = ([k for k, f in zip(keys, featured) if f],
+                                          [i for i, f in zip(items, featured) if f])
+        section["version"] = version
+        self.sections[name] = section
+        self.stats["warm_starts"] += 1
+        return True
+
+    async def start(self):
+        """Load current sections from disk and build the rest, so the first requests are served from memory"""
+        missing = [name for name in self.SECTIONS if not await self.services.database.run_blocking(self.load, name)]
+        results = await asyncio.gather(*(self.build(name) for name in missing), return_exceptions=True)
+        for name, result in zip(missing, results):
+            if isinstance(result, Exception):
+                logger.warning("Snapshot build of %s failed, retrying later: %s", name, result)
+                self.mark_stale(name)
+
+    async def stop(self):
+        for task in list(self.rebuilds.values()):
+            task.cancel()
+        self.rebuilds.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "sections": {name: list(section["version"]) if section["version"] else None
+                                           for name, section in self.sections.items()},
+                "rebuilding": sorted(self.rebuilds)}
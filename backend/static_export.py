@@ -0,0 +1,196 @@
+"""Pre-rendered API responses written as content-hashed, precompressed files"""
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+
+from metrics import metrics
+from encoding import dumps, optional_import
+from snapshot import ContentSnapshot
+
+STATIC_EXPORT_PREFIX = "/api/static"
+
+class StaticExport:
+    """Public GET responses exported as content-hashed, precompressed files with a manifest and nginx maps"""
+
+    ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+    def __init__(self, services: "Services", directory: str):
+        self.services = services
+        self.directory = directory
+        self.manifest: Dict[str, Any] = {"routes": {}, "versions": {}}
+        self.mtime: Optional[float] = None
+        self.checked = 0.0
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, "manifest.json")
+
+    def reload(self):
+        """Pick up a new manifest if the export has been re-run since the last load"""
+        self.checked = time.monotonic()
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime
+            if mtime != self.mtime:
+                with open(self.manifest_path, "rb") as f:
+                    self.manifest = json.load(f)
+                self.mtime = mtime
+        except (OSError, ValueError):
+            self.manifest, self.mtime = {"routes": {}, "versions": {}}, None
+
+    def lookup(self, uri: str) -> Optional[Dict[str, Any]]:
+        """The exported entry for a request URI, unless its content has changed since the export"""
+        if time.monotonic() - self.checked > 1:
+            self.reload()
+        entry = self.manifest["routes"].get(uri)
+        if entry is None:
+            return None
+        for name in entry["namespaces"]:
+            exported = self.manifest["versions"].get(name)
+            current = self.services.content_versions.versions.get(name)
+            if (tuple(exported) if exported else None) != current:
+                return None
+        return entry
+
+    async def export(self, app) -> Dict[str, Any]:
+        # --export-static runs without the app's startup, so create the shared versions it would
+        services = self.services
+        await services.invalidation_channel.ensure(ContentSnapshot.SECTIONS)
+        await services.invalidation_channel.sync()
+        versions = {name: list(version) for name, version in services.content_versions.versions.items()}
+        uris = [("/api/about", ("about",)),
+                ("/api/portfolio", ("about", "projects", "certifications", "artwork"))]
+        for path, query in (("/api/projects", ""), ("/api/projects", "featured_only=true"),
+                            ("/api/certifications", ""), ("/api/artwork", "")):
+            uris.append(((path, query), (path.rsplit("/", 1)[1],)))
+        ids = [doc["id"] for doc in await services.database.projects.find({}, projection={"id": 1, "_id": 0})]
+        uris.extend((f"/api/projects/{project_id}", ("projects",)) for project_id in ids)
+
+        previous = self.manifest if self.mtime is not None else {"routes": {}}
+        routes: Dict[str, Any] = {}
+        while uris:
+            target, namespaces = uris.pop(0)
+            path, query = target if isinstance(target, tuple) else (target, "")
+            status, headers, body = await render(app, path, query)
+            if status != 200:
+                raise RuntimeError(f"GET {path}?{query} returned {status}")
+            cursor = headers.get("x-next-cursor")
+            if cursor:
+                # Follow pagination so every page a client can reach without parameters is exported
+                follow = f"{query}&after={cursor}" if query else f"after={cursor}"
+                uris.insert(0, ((path, follow), namespaces))
+            name = path.strip("/").replace("/", "-") + (f"-{hashlib.sha1(query.encode()).hexdigest()[:8]}" if query else "")
+            filename = f"{name}.{hashlib.sha256(body).hexdigest()[:16]}.json"
+            await services.database.run_blocking(self.write_file, filename, body)
+            routes[f"{path}?{query}" if query else path] = {
+                "file": filename,
+                "namespaces": list(namespaces),
+                "headers": {"x-next-cursor": cursor} if cursor else {},
+            }
+
+        manifest = {"generated_at": datetime.utcnow().isoformat(), "versions": versions, "routes": routes}
+        await services.database.run_blocking(self.write_manifest, manifest, previous)
+        return manifest
+
+    def write_file(self, filename: str, body: bytes):
+        path = os.path.join(self.directory, filename)
+        if os.path.exists(path):
+            return  # content-hashed, so an existing file already has these bytes
+        variants = [("", body), (".gz", gzip.compress(body, 9))]
+        brotli = optional_import("brotli")
+        if brotli is not None:
+            variants.append((".br", brotli.compress(body, quality=11)))
+        for suffix, data in variants:
+            with open(f"{path}{suffix}.tmp", "wb") as f:
+                f.write(data)
+            os.replace(f"{path}{suffix}.tmp", f"{path}{suffix}")
+
+    def write_manifest(self, manifest: Dict[str, Any], previous: Dict[str, Any]):
+        """Swap the manifest in atomically and drop files neither it nor its predecessor uses"""
+        with open(os.path.join(self.directory, "nginx.conf.tmp"), "w") as f:
+            f.write("# include in the http block; serve with try_files $static_export_file @api\n")
+            for variable, field in (("static_export_file", "file"), ("static_export_cursor", "headers")):
+                f.write(f"map $request_uri ${variable} {{\n    default \"\";\n")
+                for uri, entry in manifest["routes"].items():
+                    value = f"{STATIC_EXPORT_PREFIX}/{entry['file']}" if field == "file" else entry["headers"].get("x-next-cursor")
+                    if value:
+                        f.write(f"    \"{uri}\" \"{value}\";\n")
+                f.write("}\n")
+        os.replace(os.path.join(self.directory, "nginx.conf.tmp"), os.path.join(self.directory, "nginx.conf"))
+        with open(self.manifest_path + ".tmp", "wb") as f:
+            f.write(dumps(manifest))
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+
+        keep = {entry["file"] for entry in list(manifest["routes"].values()) + list(previous["routes"].values())}
+        for filename in os.listdir(self.directory):
+            base = filename[:-3] if filename.endswith((".gz", ".br")) else filename
+            if base.endswith(".json") and base != "manifest.json" and base not in keep:
+                os.remove(os.path.join(self.directory, filename))
+
+async def render(app, path: str, query: str = "") -> Tuple[int, Dict[str, str], bytes]:
+    """Run one GET through the ASGI app in-process and collect the response"""
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+             "query_string": query.encode(), "headers": [(b"host", b"localhost")],
+             "client": ("127.0.0.1", 0), "server": ("localhost", 80), "portfolio.static_export": True}
+    status, headers, body = 500, {}, []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status, headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            headers = {key.decode().lower(): value.decode() for key, value in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, headers, b"".join(body)
+
+class StaticExportMiddleware:
+    """Answer exported GETs from the export directory unless their content has changed since"""
+
+    def __init__(self, app, export: StaticExport):
+        self.app = app
+        self.export = export
+        self.files = StaticFiles(directory=export.directory, check_dir=False)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or scope.get("portfolio.static_export"):
+            return await self.app(scope, receive, send)
+        query = scope.get("query_string", b"").decode("latin-1")
+        entry = self.export.lookup(f"{scope['path']}?{query}" if query else scope["path"])
+        if entry is None:
+            return await self.app(scope, receive, send)
+
+        accepted = {token.split(";")[0].strip() for value in Headers(scope=scope).getlist("accept-encoding")
+                    for token in value.split(",")}
+        encoding, filename = None, entry["file"]
+        for candidate, suffix in StaticExport.ENCODINGS:
+            if candidate in accepted and os.path.exists(os.path.join(self.export.directory, filename + suffix)):
+                encoding, filename = candidate, filename + suffix
+                break
+        extra = [(b"vary", b"Accept-Encoding"), (b"x-static-export", b"hit")]
+        extra += [(key.encode(), value.encode()) for key, value in entry["headers"].items()]
+        if encoding:
+            extra.append((b"content-encoding", encoding.encode()))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] in (200, 304):
+                message = {**message, "headers": [*message.get("headers", []), *extra]}
+            await send(message)
+
+        metrics.inc("portfolio_static_export_hits_total", {"encoding": encoding or "identity"})
+        await self.files(dict(scope, path=f"/{filename}"), receive, send_wrapper)
+
+if TYPE_CHECKING:
+    from services import Services
@@ -0,0 +1,144 @@
+"""Statistics counters folded in by every create, so /api/stats never scans the content"""
+
+import asyncio
+import logging
+import re
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote
+
+from pymongo.errors import DuplicateKeyError
+
+from settings import EXPORT_BATCH_SIZE
+from database import Database
+
+logger = logging.getLogger("portfolio")
+
+# Facets and years follow the search endpoint's definitions.
+def created_year(item: Dict[str, Any]) -> List[str]:
+    return [str(item["created_at"].year)] if item.get("created_at") else []
+
+STAT_FACETS = {
+    # collection -> facet -> the values one item contributes
+    "projects": {
+        "category": lambda item: [item.get("category")],
+        "technology": lambda item: item.get("technologies") or [],
+        "year": created_year,
+        "featured": lambda item: [str(bool(item.get("featured"))).lower()],
+    },
+    "certifications": {
+        "issuer": lambda item: [item.get("issuer")],
+        "year": lambda item: [item["date_earned"][:4]] if re.match(r"\d{4}", item.get("date_earned") or "") else [],
+    },
+    "artwork": {
+        "category": lambda item: [item.get("category")],
+        "medium": lambda item: [item.get("medium")],
+        "year": lambda item: [item.get("year_created")],
+    },
+}
+
+def stat_key(value: Any) -> str:
+    # Counters live at "facets.<facet>.<value>", so dots and dollars in values are escaped
+    return str(value).replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+def stat_update(name: str, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One $inc/$max update adding `items` to a collection's counters"""
+    increments: Dict[str, int] = defaultdict(int)
+    increments["total"] = len(items)
+    increments["writes"] = 1  # lets a rebuild notice creates that landed while it was counting
+    for item in items:
+        for facet, values in STAT_FACETS[name].items():
+            for value in set(values(item)):
+                if value not in (None, ""):
+                    increments[f"facets.{facet}.{stat_key(value)}"] += 1
+    update: Dict[str, Any] = {"$inc": dict(increments)}
+    latest = [item["created_at"] for item in items if item.get("created_at")]
+    if latest:
+        update["$max"] = {"latest": max(latest)}
+    return update
+
+class StatsCounters:
+    """The stats collection: one counter document per content collection"""
+
+    # Seconds a rebuild waits before and after its scan, so in-flight creates finish their insert and $inc
+    REBUILD_SETTLE = 1.0
+    REBUILD_ATTEMPTS = 5
+
+    def __init__(self, database: Database):
+        self.database = database
+        self.collection = database.stats
+
+    async def count_created(self, name: str, items: List[Dict[str, Any]]):
+        """Add newly inserted items to the stats; a failure only leaves drift for rebuild to repair"""
+        if not items:
+            return
+        try:
+            await self.collection.find_one_and_update({"_id": name}, stat_update(name, items), upsert=True)
+        except Exception as e:
+            logger.warning("Could not update %s stats: %s", name, e)
+
+    async def recount(self, name: str) -> Dict[str, Any]:
+        """Counters for a collection computed by scanning it"""
+        doc: Dict[str, Any] = {"total": 0, "facets": {}}
+        async for batch in self.database.collections[name].iterate({}, batch_size=EXPORT_BATCH_SIZE):
+            update = stat_update(name, batch)
+            for path, amount in update["$inc"].items():
+                if path == "writes":
+                    continue
+                *parents, key = path.split(".")
+                counters = doc
+                for part in parents:
+                    counters = counters.setdefault(part, {})
+                counters[key] = counters.get(key, 0) + amount
+            if "$max" in update:
+                doc["latest"] = max(doc.get("latest") or update["$max"]["latest"], update["$max"]["latest"])
+        return doc
+
+    async def rebuild_one(self, name: str) -> int:
+        """Recount one collection and swap the counters in only if no create touched them meanwhile"""
+        for _ in range(self.REBUILD_ATTEMPTS):
+            current = await self.collection.find_one({"_id": name})
+            writes = (current or {}).get("writes")
+            await asyncio.sleep(self.REBUILD_SETTLE)
+            doc = await self.recount(name)
+            await asyncio.sleep(self.REBUILD_SETTLE)
+            doc.update(writes=writes or 0, rebuilt_at=datetime.utcnow())
+            if current is None:
+                try:
+                    await self.collection.insert_one({"_id": name, **doc})
+                    return doc["total"]
+                except DuplicateKeyError:
+                    continue  # a create's upsert got there first
+            result = await self.collection.replace_one({"_id": name, "writes": writes}, doc)
+            if result.matched_count:
+                return doc["total"]
+        raise RuntimeError(f"{name} kept being written to; stats were not rebuilt")
+
+    async def rebuild(self, names: Optional[List[str]] = None) -> Dict[str, int]:
+        """Recount collections from scratch, replacing their counters"""
+        names = names or list(STAT_FACETS)
+        totals = await asyncio.gather(*(self.rebuild_one(name) for name in names))
+        return dict(zip(names, totals))
+
+    async def ensure(self) -> bool:
+        """Build counters for collections that have none yet, e.g. on the first start after an upgrade"""
+        existing = {doc["_id"] for doc in await self.collection.find({"_id": {"$in": list(STAT_FACETS)}})}
+        missing = [name for name in STAT_FACETS if name not in existing]
+        if missing:
+            await self.rebuild(missing)
+        return bool(missing)
+
+    async def load(self) -> Dict[str, Any]:
+        docs = {doc["_id"]: doc for doc in await self.collection.find({"_id": {"$in": list(STAT_FACETS)}})}
+        result = {}
+        for name in STAT_FACETS:
+            doc = docs.get(name, {})
+            facets = {}
+            for facet in STAT_FACETS[name]:
+                counts = (doc.get("facets") or {}).get(facet) or {}
+                ranked = sorted(((unquote(key), count) for key, count in counts.items() if count > 0),
+                                key=lambda pair: (-pair[1], pair[0]))
+                facets[facet] = [{"value": value, "count": count} for value, count in ranked]
+            result[name] = {"total": doc.get("total", 0), "latest": doc.get("latest"), "facets": facets}
+        return result
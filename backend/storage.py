@@ -0,0 +1,771 @@
+"""
+Embedded storage engines exposing the subset of the pymongo Collection API that the app uses.
+
+The app talks to every store through database.AsyncCollection, so a backend only has to provide
+collections with pymongo's synchronous surface: find (with sort/limit), find_one, insert_one,
+insert_many, replace_one, find_one_and_update, count_documents, aggregate and create_index.
+Filters, sorts and the search pipeline keep their Mongo syntax and semantics.
+
+TTL indexes (expireAfterSeconds) are honoured the way mongod's TTL monitor does it: documents whose
+indexed date has expired are removed at most once a minute, here on the collection's next write.
+
+- MemoryStore: dictionaries in process memory, for tests and throwaway previews.
+- SQLiteStore: one table per collection with a JSON payload per document, WAL journaling
+  and expression indexes for the INDEXES declared in database.py.
+"""
+
+import bisect
+import contextlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import InsertManyResult, InsertOneResult, UpdateResult
+
+MISSING = object()
+
+# Query matching
+
+def get_path(doc: Dict[str, Any], path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+def type_rank(value: Any) -> int:
+    """Mongo's cross-type sort order: null < numbers < strings < objects < arrays < ObjectId < bool < dates"""
+    if value is None or value is MISSING:
+        return 0
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 1
+    if isinstance(value, str):
+        return 2
+    if isinstance(value, dict):
+        return 3
+    if isinstance(value, list):
+        return 4
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+def sort_key(value: Any) -> Tuple[int, Any]:
+    rank = type_rank(value)
+    if rank == 0:
+        return (0, 0)
+    if rank in (3, 4):
+        return (rank, json.dumps(value, sort_keys=True, default=str))
+    return (rank, value)
+
+def compare(value: Any, operand: Any, op: str) -> bool:
+    # Like Mongo, range operators only match values of the same type bracket
+    if type_rank(value) != type_rank(operand) or value is None or value is MISSING:
+        return op in ("$lte", "$gte") and type_rank(value) == type_rank(operand) == 0
+    return {"$lt": value < operand, "$lte": value <= operand,
+            "$gt": value > operand, "$gte": value >= operand}[op]
+
+def values_at(doc: Dict[str, Any], path: str) -> List[Any]:
+    """The field value plus, for arrays, each element: equality matches any of them"""
+    value = get_path(doc, path)
+    if isinstance(value, list):
+        return [value, *value]
+    return [value]
+
+def match_condition(doc: Dict[str, Any], path: str, condition: Any) -> bool:
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        candidates = values_at(doc, path)
+        for op, operand in condition.items():
+            if op == "$eq":
+                ok = any(equals(value, operand) for value in candidates)
+            elif op == "$ne":
+                ok = not any(equals(value, operand) for value in candidates)
+            elif op == "$in":
+                ok = any(equals(value, item) for value in candidates for item in operand)
+            elif op == "$nin":
+                ok = not any(equals(value, item) for value in candidates for item in operand)
+            elif op == "$exists":
+                ok = (get_path(doc, path) is not MISSING) == bool(operand)
+            elif op in ("$lt", "$lte", "$gt", "$gte"):
+                ok = any(compare(value, operand, op) for value in candidates)
+            else:
+                raise ValueError(f"Unsupported query operator {op}")
+            if not ok:
+                return False
+        return True
+    return any(equals(value, condition) for value in values_at(doc, path))
+
+def equals(value: Any, operand: Any) -> bool:
+    if operand is None:
+        return value is None or value is MISSING
+    return value is not MISSING and type_rank(value) == type_rank(operand) and value == operand
+
+TOKEN = re.compile(r"\w+")
+
+def text_score(doc: Dict[str, Any], terms: List[str], weights: Dict[str, int]) -> float:
+    score = 0.0
+    for field, weight in weights.items():
+        value = get_path(doc, field)
+        values = value if isinstance(value, list) else [value]
+        tokens = [token for item in values if isinstance(item, str) for token in TOKEN.findall(item.lower())]
+        if tokens:
+            hits = sum(tokens.count(term) for term in terms)
+            score += weight * hits / len(tokens) * (1 + hits) / 2
+    return score
+
+def matches(doc: Dict[str, Any], query: Dict[str, Any], text_weights: Optional[Dict[str, int]] = None) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, clause, text_weights) for clause in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, clause, text_weights) for clause in condition):
+                return False
+        elif key == "$text":
+            terms = TOKEN.findall(condition["$search"].lower())
+            if not terms or text_score(doc, terms, text_weights or text_fields(doc)) <= 0:
+                return False
+        elif key == "$expr":
+            if not evaluate(doc, condition):
+                return False
+        elif not match_condition(doc, key, condition):
+            return False
+    return True
+
+def text_fields(doc: Dict[str, Any]) -> Dict[str, int]:
+    """Without a text index every string field is searchable with equal weight"""
+    return {key: 1 for key, value in doc.items() if isinstance(value, (str, list))}
+
+def evaluate(doc: Dict[str, Any], expression: Any) -> Any:
+    """Aggregation expressions used by the app's pipelines"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = get_path(doc, expression[1:])
+        return None if value is MISSING else value
+    if isinstance(expression, dict) and len(expression) == 1:
+        op, argument = next(iter(expression.items()))
+        if op == "$eq":
+            left, right = (evaluate(doc, item) for item in argument)
+            return left == right
+        if op == "$toString":
+            value = evaluate(doc, argument)
+            return None if value is None else str(value)
+        if op == "$year":
+            value = evaluate(doc, argument)
+            return value.year if isinstance(value, datetime) else None
+        if op == "$meta":
+            return doc.get("__score__", 0.0)
+        if op.startswith("$"):
+            raise ValueError(f"Unsupported expression operator {op}")
+    return expression
+
+def apply_sort(docs: List[Dict[str, Any]], sort: Iterable[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    docs = list(docs)
+    for field, direction in reversed(list(sort)):
+        docs.sort(key=lambda doc: sort_key(get_path(doc, field)), reverse=direction < 0)
+    return docs
+
+def project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return dict(doc)
+    include = {key for key, value in projection.items() if value and key != "_id"}
+    if include:
+        result = {key: doc[key] for key in include if key in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    return {key: value for key, value in doc.items() if key not in projection}
+
+def unwind_values(value: Any) -> List[Any]:
+    # Like Mongo: missing, null and [] drop the document; any other non-array counts as a one-item array
+    if isinstance(value, list):
+        return value
+    return [] if value is None or value is MISSING else [value]
+
+def run_pipeline(docs: List[Dict[str, Any]], pipeline: List[Dict[str, Any]],
+                 text_weights: Optional[Dict[str, int]]) -> List[Dict[str, Any]]:
+    """Evaluate the aggregation stages the app uses ($match, $addFields, $facet and friends)"""
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            if "$text" in spec:
+                terms = TOKEN.findall(spec["$text"]["$search"].lower())
+                docs = [{**doc, "__score__": text_score(doc, terms, text_weights or text_fields(doc))} for doc in docs]
+            docs = [doc for doc in docs if matches(doc, spec, text_weights)]
+        elif name == "$addFields":
+            docs = [{**doc, **{key: evaluate(doc, value) for key, value in spec.items()}} for doc in docs]
+        elif name == "$sort":
+            docs = apply_sort(docs, spec.items())
+        elif name == "$skip":
+            docs = docs[spec:]
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$count":
+            docs = [{spec: len(docs)}] if docs else []
+        elif name == "$unwind":
+            path = spec[1:]
+            docs = [{**doc, path: item} for doc in docs for item in unwind_values(get_path(doc, path))]
+        elif name == "$group":
+            groups: Dict[Any, Dict[str, Any]] = {}
+            for doc in docs:
+                key = evaluate(doc, spec["_id"])
+                group = groups.setdefault(json.dumps(key, default=str), {"_id": key})
+                for field, accumulator in spec.items():
+                    if field != "_id":
+                        group[field] = group.get(field, 0) + evaluate(doc, accumulator["$sum"])
+            docs = list(groups.values())
+        elif name == "$facet":
+            docs = [{key: run_pipeline(docs, stages, text_weights) for key, stages in spec.items()}]
+        else:
+            raise ValueError(f"Unsupported pipeline stage {name}")
+    return [{key: value for key, value in doc.items() if key != "__score__"} for doc in docs]
+
+def set_path(doc: Dict[str, Any], path: str, value: Any):
+    """Set a dotted path, copying the nested documents on the way so the stored original is untouched"""
+    *parents, last = path.split(".")
+    for part in parents:
+        child = doc.get(part)
+        doc[part] = dict(child) if isinstance(child, dict) else {}
+        doc = doc[part]
+    doc[last] = value
+
+def apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool) -> Dict[str, Any]:
+    doc = dict(doc)
+    for op, fields in update.items():
+        if op == "$set" or (op == "$setOnInsert" and inserting):
+            for field, value in fields.items():
+                set_path(doc, field, value)
+        elif op == "$inc":
+            for field, amount in fields.items():
+                current = get_path(doc, field)
+                set_path(doc, field, (0 if current is MISSING else current) + amount)
+        elif op == "$max":
+            for field, value in fields.items():
+                current = get_path(doc, field)
+                if current is MISSING or sort_key(value) > sort_key(current):
+                    set_path(doc, field, value)
+        elif op != "$setOnInsert":
+            raise ValueError(f"Unsupported update operator {op}")
+    return doc
+
+class ListCursor:
+    """Enough of pymongo's Cursor for AsyncCollection: sort, limit, iteration and close"""
+
+    def __init__(self, load: Callable[[Optional[List], int], List[Dict[str, Any]]]):
+        self.load = load
+        self.sort_spec: Optional[List] = None
+        self.limit_count = 0
+        self.iterator = None
+
+    def sort(self, spec):
+        self.sort_spec = list(spec)
+        return self
+
+    def limit(self, count: int):
+        self.limit_count = count
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.iterator is None:
+            self.iterator = iter(self.load(self.sort_spec, self.limit_count))
+        return next(self.iterator)
+
+    def close(self):
+        self.iterator = iter(())
+
+class BaseCollection:
+    """Shared pymongo-style behaviour; subclasses store and fetch whole documents"""
+
+    TTL_INTERVAL = 60.0  # seconds between expiry passes, as for mongod's TTL monitor
+
+    def __init__(self, name: str):
+        self.name = name
+        self.lock = threading.RLock()
+        self.unique_fields: List[str] = []
+        self.text_weights: Optional[Dict[str, int]] = None
+        self.ttl_fields: Dict[str, int] = {}  # field: expireAfterSeconds
+        self.expired_at = 0.0
+
+    # Storage primitives
+    def transaction(self):
+        """Held around every read-modify-write so checks and updates are atomic"""
+        return self.lock
+
+    def candidates(self, query: Dict[str, Any], sort: Optional[List], limit: int) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def store(self, doc: Dict[str, Any]):
+        raise NotImplementedError
+
+    def store_many(self, docs: List[Dict[str, Any]]):
+        for doc in docs:
+            self.store(doc)
+
+    def exists(self, field: str, value: Any, exclude_id: Any = None) -> bool:
+        return any(doc["_id"] != exclude_id for doc in self.candidates({field: value}, None, 0))
+
+    def remove_older(self, field: str, cutoff: datetime) -> int:
+        """Delete documents whose date in `field` is before `cutoff`; other values never expire"""
+        raise NotImplementedError
+
+    # TTL
+    def expire(self) -> int:
+        """Remove every document past its TTL index's expiry, returning how many went"""
+        now = datetime.utcnow()
+        with self.transaction():
+            removed = sum(self.remove_older(field, now - timedelta(seconds=seconds))
+                          for field, seconds in self.ttl_fields.items())
+        self.expired_at = time.monotonic()
+        return removed
+
+    def expire_due(self):
+        if self.ttl_fields and time.monotonic() - self.expired_at >= self.TTL_INTERVAL:
+            self.expire()
+
+    # pymongo API
+    def with_options(self, **kwargs):
+        return self  # one copy of the data, so read preferences do not apply
+
+    def find(self, filter_query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None,
+             batch_size: int = 0):
+        def load(sort, limit):
+            return [project(doc, projection) for doc in self.candidates(filter_query or {}, sort, limit)]
+        return ListCursor(load)
+
+    def find_one(self, filter_query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None):
+        docs = self.candidates(filter_query or {}, None, 1)
+        return project(docs[0], projection) if docs else None
+
+    def count_documents(self, filter_query: Optional[Dict[str, Any]] = None) -> int:
+        return len(self.candidates(filter_query or {}, None, 0))
+
+    def check_unique(self, doc: Dict[str, Any], pending: List[Dict[str, Any]] = ()):
+        for field in ["_id", *self.unique_fields]:
+            value = doc.get(field)
+            if value is None:
+                continue
+            if self.exists(field, value, exclude_id=None if field == "_id" else doc["_id"]) or \
+                    any(other.get(field) == value for other in pending):
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {field} "
+                                        f"dup key: {{ {field}: {value!r} }}")
+
+    def insert_one(self, document: Dict[str, Any]) -> InsertOneResult:
+        document.setdefault("_id", ObjectId())
+        self.expire_due()
+        with self.transaction():
+            self.check_unique(document)
+            self.store(dict(document))
+        return InsertOneResult(document["_id"], True)
+
+    def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True) -> InsertManyResult:
+        self.expire_due()
+        accepted: List[Dict[str, Any]] = []
+        errors = []
+        with self.transaction():
+            for index, document in enumerate(documents):
+                document.setdefault("_id", ObjectId())
+                try:
+                    self.check_unique(document, accepted)
+                except DuplicateKeyError as e:
+                    errors.append({"index": index, "code": 11000, "errmsg": str(e), "op": document})
+                    if ordered:
+                        break
+                    continue
+                accepted.append(dict(document))
+            self.store_many(accepted)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(accepted), "writeConcernErrors": [],
+                                  "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []})
+        return InsertManyResult([doc["_id"] for doc in documents], True)
+
+    def replace_one(self, filter_query: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        self.expire_due()
+        with self.transaction():
+            existing = self.find_one(filter_query)
+            if existing is None and not upsert:
+                return UpdateResult({"n": 0, "nModified": 0}, True)
+            doc = {**replacement, "_id": existing["_id"] if existing else replacement.get("_id", ObjectId())}
+            if existing is None:
+                self.check_unique(doc)
+            self.store(doc)
+        return UpdateResult({"n": 1, "nModified": 1 if existing else 0}, True)
+
+    def find_one_and_update(self, filter_query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False,
+                            return_document: bool = ReturnDocument.BEFORE, **kwargs):
+        self.expire_due()
+        with self.transaction():
+            existing = self.find_one(filter_query)
+            if existing is None and not upsert:
+                return None
+            base = existing or {key: value for key, value in filter_query.items() if not key.startswith("$")}
+            doc = apply_update(base, update, inserting=existing is None)
+            doc.setdefault("_id", ObjectId())
+            self.store(doc)
+        return doc if return_document == ReturnDocument.AFTER else existing
+
+    def drop(self):
+        raise NotImplementedError
+
+    def aggregate(self, pipeline: List[Dict[str, Any]]):
+        return iter(run_pipeline(self.candidates({}, None, 0), pipeline, self.text_weights))
+
+    def create_index(self, keys: List[Tuple[str, Any]], name: Optional[str] = None, unique: bool = False,
+                     weights: Optional[Dict[str, int]] = None, **kwargs) -> str:
+        if any(direction == "text" for _, direction in keys):
+            self.text_weights = {field: (weights or {}).get(field, 1) for field, _ in keys}
+        elif unique and len(keys) == 1 and keys[0][0] not in self.unique_fields:
+            self.unique_fields.append(keys[0][0])
+        if kwargs.get("expireAfterSeconds") is not None and len(keys) == 1:
+            self.ttl_fields[keys[0][0]] = int(kwargs["expireAfterSeconds"])
+        return name or "_".join(f"{field}_{direction}" for field, direction in keys)
+
+class MemoryCollection(BaseCollection):
+    """Documents in a dict, with hash lookups for unique fields and cached sort orders"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.documents: Dict[Any, Dict[str, Any]] = {}
+        self.version = 0
+        self.orders: Dict[Tuple, Tuple[int, List[Dict[str, Any]]]] = {}
+        self.lookups: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+
+    def ordered(self, sort: Optional[List]) -> List[Dict[str, Any]]:
+        key = tuple(tuple(item) for item in sort or ())
+        with self.lock:
+            cached = self.orders.get(key)
+            if cached is None or cached[0] != self.version:
+                docs = list(self.documents.values())
+                cached = self.orders[key] = (self.version, apply_sort(docs, sort) if sort else docs)
+            return cached[1]
+
+    def lookup(self, field: str, value: Any) -> Optional[List[Dict[str, Any]]]:
+        """Documents for an equality filter on _id or a unique field, or None if not indexed"""
+        if field != "_id" and field not in self.unique_fields or not isinstance(value, (str, ObjectId)):
+            return None  # operator conditions ({"$in": ...}) and other types are matched by a scan
+        with self.lock:
+            index = self.lookups.get(field)
+            if index is None:
+                index = self.lookups[field] = {doc[field]: doc for doc in self.documents.values()
+                                               if isinstance(doc.get(field), (str, ObjectId))}
+            doc = index.get(value)
+        return [doc] if doc is not None else []
+
+    def range_start(self, docs: List[Dict[str, Any]], query: Dict[str, Any], sort: Optional[List]) -> int:
+        """First position a lower bound on the leading ascending sort field can match, e.g. a {"seq": {"$gt": n}} tail"""
+        if not sort or len(query) != 1 or sort[0][1] < 0:
+            return 0
+        (field, condition), = query.items()
+        if field != sort[0][0] or not isinstance(condition, dict):
+            return 0
+        for op, search in (("$gt", bisect.bisect_right), ("$gte", bisect.bisect_left)):
+            if op in condition:
+                return search(docs, sort_key(condition[op]), key=lambda doc: sort_key(get_path(doc, field)))
+        return 0
+
+    def candidates(self, query, sort, limit):
+        docs = None
+        start = 0
+        if len(query) == 1:
+            (field, value), = query.items()
+            if not field.startswith("$"):
+                docs = self.lookup(field, value)
+        if docs is None:
+            docs = self.ordered(sort)
+            start = self.range_start(docs, query, sort)
+        results = []
+        for position in range(start, len(docs)):
+            doc = docs[position]
+            if matches(doc, query, self.text_weights):
+                results.append(dict(doc))
+                if limit and len(results) >= limit:
+                    break
+        return results
+
+    def store(self, doc):
+        with self.lock:
+            previous = self.documents.get(doc["_id"])
+            self.documents[doc["_id"]] = doc
+            self.version += 1
+            # Unique-field lookups are kept up to date; sorted orders are rebuilt on the next read
+            for field, index in self.lookups.items():
+                if previous is not None and index.get(previous.get(field)) is previous:
+                    del index[previous[field]]
+                if isinstance(doc.get(field), (str, ObjectId)):
+                    index[doc[field]] = doc
+
+    def remove_older(self, field, cutoff):
+        with self.lock:
+            expired = [doc for doc in self.documents.values()
+                       if isinstance(get_path(doc, field), datetime) and get_path(doc, field) < cutoff]
+            for doc in expired:
+                del self.documents[doc["_id"]]
+                for indexed, index in self.lookups.items():
+                    if index.get(doc.get(indexed)) is doc:
+                        del index[doc[indexed]]
+            if expired:
+                self.version += 1
+        return len(expired)
+
+    def drop(self):
+        with self.lock:
+            self.documents.clear()
+            self.lookups.clear()
+            self.version += 1
+
+class MemoryStore:
+    """Collections held in process memory; every worker process has its own copy"""
+
+    def __init__(self):
+        self.collections: Dict[str, MemoryCollection] = {}
+        self.lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        with self.lock:
+            if name not in self.collections:
+                self.collections[name] = MemoryCollection(name)
+            return self.collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def ping(self):
+        return {"ok": 1}
+
+    def close(self):
+        pass
+
+# SQLite
+
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+def encode_value(value: Any) -> Any:
+    """Scalars as stored in the JSON payload; dates use a fixed-width format so text order is time order"""
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_FORMAT)
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+def column(field: str) -> str:
+    if field == "_id":
+        return "_id"
+    if not re.fullmatch(r"[A-Za-z0-9_.]+", field):
+        raise ValueError(f"Unsupported field name {field!r}")
+    return f"json_extract(data, '$.{field}')"
+
+class SQLiteCollection(BaseCollection):
+    """Documents as JSON in a (_id, data, dates) table; filters that map onto SQL run there"""
+
+    def __init__(self, store: "SQLiteStore", name: str):
+        super().__init__(name)
+        self.store_ = store
+        self.table = f'"{name}"'
+        with store.write() as connection:
+            connection.execute(f"CREATE TABLE IF NOT EXISTS {self.table} "
+                               "(_id TEXT PRIMARY KEY, data TEXT NOT NULL, dates TEXT NOT NULL DEFAULT '[]')")
+
+    def translate(self, query: Dict[str, Any]) -> Optional[Tuple[str, List[Any]]]:
+        """SQL for a filter, or None when part of it needs Mongo semantics SQL cannot express here"""
+        clauses: List[str] = []
+        params: List[Any] = []
+        for key, condition in query.items():
+            if key in ("$or", "$and"):
+                parts = [self.translate(clause) for clause in condition]
+                if any(part is None for part in parts):
+                    return None
+                joiner = " OR " if key == "$or" else " AND "
+                clauses.append("(" + joiner.join(f"({sql})" for sql, _ in parts) + ")")
+                params.extend(param for _, part_params in parts for param in part_params)
+                continue
+            if key.startswith("$"):
+                return None
+            conditions = condition if isinstance(condition, dict) and condition and \
+                all(op.startswith("$") for op in condition) else {"$eq": condition}
+            for op, operand in conditions.items():
+                # Arrays, nested documents and nulls follow Mongo rules the SQL below does not
+                values = operand if op == "$in" else [operand]
+                if any(value is None or isinstance(value, (list, dict)) for value in values):
+                    return None
+                sql_op = {"$eq": "=", "$lt": "<", "$lte": "<=", "$gt": ">", "$gte": ">="}.get(op)
+                if op == "$in":
+                    clauses.append(f"{column(key)} IN ({','.join('?' * len(values))})")
+                    params.extend(encode_value(value) for value in values)
+                elif sql_op and key not in self.store_.array_fields:
+                    clauses.append(f"{column(key)} {sql_op} ?")
+                    params.append(encode_value(operand))
+                else:
+                    return None
+        return " AND ".join(clauses) or "1", params
+
+    def decode(self, row) -> Dict[str, Any]:
+        doc = json.loads(row[1])
+        doc["_id"] = ObjectId(row[0]) if ObjectId.is_valid(row[0]) else row[0]
+        for field in json.loads(row[2]):
+            if isinstance(doc.get(field), str):
+                doc[field] = datetime.fromisoformat(doc[field])
+        return doc
+
+    def candidates(self, query, sort, limit):
+        translated = self.translate(query)
+        where, params = translated if translated is not None else ("1", [])
+        sql = f"SELECT _id, data, dates FROM {self.table} WHERE {where}"
+        if sort and translated is not None:
+            sql += " ORDER BY " + ", ".join(f"{column(field)} {'DESC' if direction < 0 else 'ASC'}"
+                                             for field, direction in sort)
+            if limit:
+                sql += f" LIMIT {int(limit)}"
+        docs = [self.decode(row) for row in self.store_.read().execute(sql, params)]
+        if translated is None:
+            # Untranslatable filter: evaluate it, and the sort/limit, with the shared Mongo semantics
+            docs = [doc for doc in docs if matches(doc, query, self.text_weights)]
+            if sort:
+                docs = apply_sort(docs, sort)
+            return docs[:limit] if limit else docs
+        return docs
+
+    def transaction(self):
+        return self.store_.write()
+
+    def row(self, doc: Dict[str, Any]) -> Tuple[str, str, str]:
+        payload = {key: value for key, value in doc.items() if key != "_id"}
+        dates = [key for key, value in payload.items() if isinstance(value, datetime)]
+        data = json.dumps(payload, default=encode_value, ensure_ascii=False)
+        return str(doc["_id"]), data, json.dumps(dates)
+
+    def store(self, doc):
+        self.store_many([doc])
+
+    def store_many(self, docs):
+        try:
+            with self.store_.write() as connection:
+                connection.executemany(f"INSERT OR REPLACE INTO {self.table} (_id, data, dates) VALUES (?, ?, ?)",
+                                       [self.row(doc) for doc in docs])
+        except sqlite3.IntegrityError as e:
+            # A unique index caught a duplicate inserted concurrently by another process
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name}: {e}")
+
+    def drop(self):
+        with self.store_.write() as connection:
+            connection.execute(f"DELETE FROM {self.table}")
+
+    def remove_older(self, field, cutoff):
+        # Dates are stored fixed-width, so the TTL field's expression index serves the range
+        with self.store_.write() as connection:
+            return connection.execute(f"DELETE FROM {self.table} WHERE {column(field)} < ? AND "
+                                      "EXISTS (SELECT 1 FROM json_each(dates) WHERE value = ?)",
+                                      [encode_value(cutoff), field]).rowcount
+
+    def exists(self, field, value, exclude_id=None):
+        sql = f"SELECT 1 FROM {self.table} WHERE {column(field)} = ?"
+        params = [encode_value(value)]
+        if exclude_id is not None:
+            sql += " AND _id != ?"
+            params.append(str(exclude_id))
+        return self.store_.read().execute(sql + " LIMIT 1", params).fetchone() is not None
+
+    def count_documents(self, filter_query=None):
+        translated = self.translate(filter_query or {})
+        if translated is None:
+            return super().count_documents(filter_query)
+        where, params = translated
+        return self.store_.read().execute(f"SELECT COUNT(*) FROM {self.table} WHERE {where}", params).fetchone()[0]
+
+    def create_index(self, keys, name=None, unique=False, weights=None, **kwargs):
+        name = super().create_index(keys, name=name, unique=unique, weights=weights, **kwargs)
+        if all(direction != "text" for _, direction in keys):
+            columns = ", ".join(f"{column(field)} {'DESC' if direction < 0 else 'ASC'}" for field, direction in keys)
+            with self.store_.write() as connection:
+                connection.execute(f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS '
+                                   f'"{self.name}_{name}" ON {self.table} ({columns})')
+        return name
+
+class SQLiteStore:
+    """A SQLite file in WAL mode: readers on per-thread connections never block the single writer"""
+
+    # List-valued fields: equality means "contains", so those filters are evaluated in Python
+    array_fields = {"technologies", "skills"}
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.local = threading.local()
+        self.write_lock = threading.RLock()
+        self.connections: List[sqlite3.Connection] = []
+        self.collections: Dict[str, SQLiteCollection] = {}
+        self.read().execute("PRAGMA journal_mode=WAL")
+
+    def read(self) -> sqlite3.Connection:
+        """This thread's connection (autocommit, so each read sees the latest committed data)"""
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=30)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+            self.local.depth = 0
+            with self.write_lock:
+                self.connections.append(connection)
+        return connection
+
+    @contextlib.contextmanager
+    def write(self):
+        """An immediate (write-locked) transaction; nested calls join the outer one"""
+        with self.write_lock:
+            connection = self.read()
+            if self.local.depth:
+                self.local.depth += 1
+                try:
+                    yield connection
+                finally:
+                    self.local.depth -= 1
+                return
+            connection.execute("BEGIN IMMEDIATE")
+            self.local.depth = 1
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            else:
+                connection.execute("COMMIT")
+            finally:
+                self.local.depth = 0
+
+    def __getitem__(self, name: str) -> SQLiteCollection:
+        with self.write_lock:
+            if name not in self.collections:
+                self.collections[name] = SQLiteCollection(self, name)
+            return self.collections[name]
+
+    def __getattr__(self, name: str) -> SQLiteCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def ping(self):
+        self.read().execute("SELECT 1").fetchone()
+        return {"ok": 1}
+
+    def close(self):
+        with self.write_lock:
+            for connection in self.connections:
+                connection.close()
+            self.connections.clear()
+        self.local = threading.local()
@@ -0,0 +1,641 @@
+#!/usr/bin/env python3
+"""
+Portfolio Backend Benchmarks
+Drives the FastAPI app in-process against mongomock, or a real uvicorn worker against a local mongod
+
+Usage: python backend_benchmark.py concurrency [--requests N] [--latency-ms MS]
+       python backend_benchmark.py indexes [--documents N] [--mongo-url URL]   (needs a live mongod)
+       python backend_benchmark.py serialization [--sizes N ...]
+       python backend_benchmark.py compression [--sizes N ...] [--rounds N]
+       python backend_benchmark.py load [--target asgi|uvicorn] [--sizes N ...] [--endpoints NAME ...]
+                                        [--output results.json] [--compare baseline.json]
+       python backend_benchmark.py storage [--sizes N ...] [--endpoints NAME ...]   (mongo only if --mongo-url answers)
+       python backend_benchmark.py coldstart [--rounds N]   (mongo only if --mongo-url answers)
+       python backend_benchmark.py workers [--worker-counts N ...] [--clients N]   (needs a live mongod)
+
+`load` seeds projects/artwork at each size and reports req/s and p50/p95/p99 per endpoint.
+--target asgi runs in-process on mongomock; --target uvicorn starts a real worker against
+--mongo-url using a throwaway database that is dropped afterwards.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+# The write scenarios would otherwise spend most of their requests on 429s; also inherited by uvicorn workers
+os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+import httpx
+import mongomock
+
+import server
+from database import INDEXES
+from encoding import encode_items, optional_import
+from models import Artwork, Project
+
+
+class SlowCollection:
+    """Proxy that adds a fixed blocking delay to every call, standing in for a remote query"""
+
+    def __init__(self, collection, latency: float):
+        self._collection = collection
+        self._latency = latency
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        def slow(*args, **kwargs):
+            time.sleep(self._latency)
+            return attr(*args, **kwargs)
+        return slow
+
+
+class SlowStore:
+    """A database whose collections are all SlowCollections"""
+
+    def __init__(self, database, latency: float):
+        self._database = database
+        self._latency = latency
+
+    def __getitem__(self, name):
+        return SlowCollection(self._database[name], self._latency)
+
+
+def bench_app(store, client=None, latency: float = 0.0, pool_size: int = 0, **settings):
+    """An app serving from an already opened database (mongomock, pymongo or an embedded store)"""
+    app = server.create_app(server.Settings(static_export_dir="", **settings))
+    database = app.state.services.database
+    database.attach(SlowStore(store, latency) if latency else store, client)
+    if pool_size:
+        database.pool_size = pool_size
+    return app
+
+
+def mock_database() -> Tuple[mongomock.MongoClient, mongomock.Database]:
+    client = mongomock.MongoClient()
+    return client, client.portfolio_db
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def drive(http: httpx.AsyncClient, make_request, total: int, concurrency: int) -> Dict[str, Any]:
+    """Send `total` requests built by `make_request(http)` with at most `concurrency` in flight"""
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await make_request(http)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "req_per_s": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+@contextlib.asynccontextmanager
+async def running_app(app):
+    """Run the app's lifespan and wait for warm-up, as a deployment would before sending traffic"""
+    async with app.router.lifespan_context(app):
+        while app.state.services.warm_up["status"] != "done":
+            await asyncio.sleep(0.01)
+        yield
+
+
+def asgi_client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+
+def bench_concurrency(args) -> List[Dict[str, Any]]:
+    """Throughput of GET /api/projects as the DB thread pool grows"""
+    results = []
+    for pool_size in args.pool_sizes:
+        client, store = mock_database()
+        # Measure the database path, not the response cache
+        app = bench_app(store, client, latency=args.latency_ms / 1000, pool_size=pool_size, cache_max_entries=0)
+        async def run():
+            async with asgi_client(app) as http:
+                return await drive(http, lambda h: h.get("/api/projects"), args.requests, args.concurrency)
+
+        result = asyncio.run(run())
+        app.state.services.database.close()
+        result["db_thread_pool_size"] = pool_size
+        results.append(result)
+    return results
+
+
+def sample_project(index: int) -> Dict[str, Any]:
+    return {
+        "id": str(uuid.uuid4()),
+        "title": f"Project {index}",
+        "description": "Benchmark project " * 10,
+        "technologies": random.sample(["Python", "React", "FastAPI", "PyTorch", "Docker", "MongoDB"], 3),
+        "category": random.choice(["AI/ML", "Web", "Mobile"]),
+        "featured": index % 20 == 0,
+        "created_at": datetime(2020, 1, 1) + timedelta(minutes=index),
+    }
+
+
+def bench_indexes(args) -> List[Dict[str, Any]]:
+    """Collection scan vs index for the queries behind get_project and get_projects"""
+    from pymongo import MongoClient
+
+    mongo = MongoClient(args.mongo_url)
+    collection = mongo.portfolio_bench.projects
+    collection.drop()
+    for start in range(0, args.documents, 10_000):
+        collection.insert_many([sample_project(i) for i in range(start, min(start + 10_000, args.documents))])
+    ids = [doc["id"] for doc in collection.aggregate([{"$sample": {"size": args.lookups}}])]
+
+    queries = {
+        "get_project": lambda project_id: collection.find({"id": project_id}),
+        "get_projects_featured": lambda _: collection.find({"featured": True}).sort(
+            [("created_at", -1), ("_id", -1)]).limit(100),
+    }
+
+    def measure(mode: str) -> List[Dict[str, Any]]:
+        rows = []
+        for name, query in queries.items():
+            started = time.perf_counter()
+            for project_id in ids:
+                list(query(project_id))
+            elapsed = time.perf_counter() - started
+            stats = query(ids[0]).explain()["executionStats"]
+            rows.append({
+                "query": name,
+                "mode": mode,
+                "documents": args.documents,
+                "avg_ms": round(elapsed / len(ids) * 1000, 3),
+                "docs_examined": stats["totalDocsExamined"],
+            })
+        return rows
+
+    results = measure("scan")
+    for spec in INDEXES["projects"]:
+        options = {k: v for k, v in spec.items() if k != "keys"}
+        collection.create_index(spec["keys"], **options)
+    results += measure("index")
+    mongo.drop_database("portfolio_bench")
+    return results
+
+
+def sample_artwork(index: int) -> Dict[str, Any]:
+    return {
+        "id": str(uuid.uuid4()),
+        "title": f"Artwork {index}",
+        "description": "Benchmark artwork " * 10,
+        "image_url": f"https://images.example.com/{index}.jpg",
+        "category": random.choice(["Digital", "Traditional", "3D"]),
+        "medium": "Digital Art",
+        "year_created": str(2015 + index % 10),
+        "created_at": datetime(2020, 1, 1) + timedelta(minutes=index),
+    }
+
+
+def bench_serialization(args) -> List[Dict[str, Any]]:
+    """response_model validation + JSONResponse vs the pre-encoded fast path"""
+    from pydantic import TypeAdapter
+
+    results = []
+    for model, factory in ((Project, sample_project), (Artwork, sample_artwork)):
+        adapter = TypeAdapter(List[model])
+        for size in args.sizes:
+            items = [factory(i) for i in range(size)]
+
+            def current() -> bytes:
+                # What FastAPI does for response_model=List[...]: validate, dump, json.dumps
+                content = adapter.dump_python(adapter.validate_python(items), mode="json")
+                return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+            def fast() -> bytes:
+                return encode_items(items, model)
+
+            assert current() == fast(), "fast path changed the wire format"
+            for path, encode in (("current", current), ("fast", fast)):
+                started = time.perf_counter()
+                for _ in range(args.rounds):
+                    encode()
+                elapsed = (time.perf_counter() - started) / args.rounds
+                results.append({"model": model.__name__, "items": size, "path": path,
+                                "ms_per_response": round(elapsed * 1000, 3)})
+    return results
+
+
+WORDS = ("model", "training", "pipeline", "dataset", "inference", "latency", "interactive", "dashboard",
+         "generative", "texture", "palette", "render", "pytorch", "react", "deployment", "accuracy",
+         "segmentation", "portrait", "lighting", "the", "a", "with", "for", "and", "using", "of", "in")
+
+
+def realistic_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def realistic_payload(model, size: int) -> bytes:
+    """A list page as the API encodes it, with varied prose rather than repeated filler"""
+    rng = random.Random(size)
+    items = []
+    for index in range(size):
+        if model is Project:
+            item = {**sample_project(index), "description": realistic_text(rng, rng.randint(40, 120)),
+                    "github_url": f"https://github.com/example/project-{index}",
+                    "image_url": f"https://images.example.com/projects/{uuid.uuid4().hex}.png"}
+        else:
+            item = {**sample_artwork(index), "description": realistic_text(rng, rng.randint(20, 80))}
+        items.append(model(**item).model_dump())
+    return encode_items(items, model)
+
+
+def bench_compression(args) -> List[Dict[str, Any]]:
+    """Ratio and CPU cost per encoding/level, then served throughput with and without the compressed cache"""
+    import gzip
+
+    codecs = [("gzip", level, lambda body, level=level: gzip.compress(body, level, mtime=0), gzip.decompress)
+              for level in (1, 6, 9)]
+    brotli, zstandard = optional_import("brotli"), optional_import("zstandard")
+    if brotli is not None:
+        codecs += [("br", quality, lambda body, quality=quality: brotli.compress(body, quality=quality),
+                    brotli.decompress) for quality in (1, 5, 11)]
+    if zstandard is not None:
+        codecs += [("zstd", level, lambda body, level=level: zstandard.ZstdCompressor(level=level).compress(body),
+                    zstandard.ZstdDecompressor().decompress) for level in (1, 3, 10)]
+
+    results = []
+    for model in (Project, Artwork):
+        for size in args.sizes:
+            body = realistic_payload(model, size)
+            for encoding, level, encode, decode in codecs:
+                compressed = encode(body)
+                assert decode(compressed) == body
+                started = time.process_time()
+                for _ in range(args.rounds):
+                    encode(body)
+                compress_ms = (time.process_time() - started) / args.rounds * 1000
+                started = time.process_time()
+                for _ in range(args.rounds):
+                    decode(compressed)
+                decompress_ms = (time.process_time() - started) / args.rounds * 1000
+                results.append({"model": model.__name__, "items": size, "encoding": encoding, "level": level,
+                                "bytes": len(body), "compressed_bytes": len(compressed),
+                                "ratio": round(len(body) / len(compressed), 2),
+                                "compress_cpu_ms": round(compress_ms, 3), "decompress_cpu_ms": round(decompress_ms, 3),
+                                "compress_mb_per_s": round(len(body) / 1e6 / (compress_ms / 1000), 1) if compress_ms else None})
+
+    client, database = mock_database()
+    database.projects.insert_many([{**sample_project(i), "description": realistic_text(random.Random(i), 80)}
+                                   for i in range(max(args.sizes))])
+    for label, accept, cache_entries in (("identity", "identity", 0), ("br", "br", 0), ("br cached", "br", 256)):
+        app = bench_app(database, client, compression_cache_entries=cache_entries)
+
+        async def run():
+            async with asgi_client(app) as http:
+                request = lambda h: h.get("/api/projects", params={"limit": max(args.sizes)},
+                                          headers={"accept-encoding": accept})
+                await request(http)
+                return await drive(http, request, args.requests, args.concurrency)
+
+        results.append({"served": label, "items": max(args.sizes), **asyncio.run(run())})
+        app.state.services.database.close()
+    return results
+
+
+def seed(database, documents: int):
+    """Fill projects and artwork with `documents` items each"""
+    for name, factory in (("projects", sample_project), ("artwork", sample_artwork)):
+        database[name].drop()
+        for start in range(0, documents, 10_000):
+            database[name].insert_many([factory(i) for i in range(start, min(start + 10_000, documents))])
+
+
+def load_scenarios(project_ids: List[str]) -> Dict[str, Any]:
+    """Endpoint name -> function issuing one request"""
+    project = {"title": "Load test", "description": "Created by the load benchmark",
+               "technologies": ["Python"], "category": "Web"}
+    contact = {"name": "Load Test", "email": "load@example.com", "message": "Benchmark message"}
+    return {
+        "list_projects": lambda http: http.get("/api/projects", params={"limit": 100}),
+        "list_artwork": lambda http: http.get("/api/artwork", params={"limit": 100}),
+        "get_project": lambda http: http.get(f"/api/projects/{random.choice(project_ids)}"),
+        "create_project": lambda http: http.post("/api/projects", json=project),
+        "submit_contact": lambda http: http.post("/api/contact", json=contact),
+        "health": lambda http: http.get("/api/health"),
+    }
+
+
+async def run_load(http: httpx.AsyncClient, database, target: str, documents: int, args) -> List[Dict[str, Any]]:
+    project_ids = [doc["id"] for doc in database.projects.find({}, {"id": 1}).limit(1000)]
+    scenarios = load_scenarios(project_ids)
+    results = []
+    for endpoint in args.endpoints or list(scenarios):
+        # Warm up once so one-off costs (index builds, first cache fill) are not measured
+        await scenarios[endpoint](http)
+        result = await drive(http, scenarios[endpoint], args.requests, args.concurrency)
+        results.append({"target": target, "endpoint": endpoint, "documents": documents, **result})
+    return results
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_uvicorn(database_name: str, mongo_url: str, workers: int = 1) -> Tuple[subprocess.Popen, str]:
+    """Serve backend/server.py through its own CLI, as deployed, and wait until it answers"""
+    port = free_port()
+    env = {**os.environ, "MONGO_URL": mongo_url, "MONGO_DB_NAME": database_name}
+    process = subprocess.Popen(
+        [sys.executable, "server.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        cwd=os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"),
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/api/health", timeout=1)
+            return process, base_url
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn did not start within 30s")
+
+
+def bench_load(args) -> List[Dict[str, Any]]:
+    """Per-endpoint throughput and latency percentiles at each seeded size"""
+    results = []
+    for documents in args.sizes:
+        if args.target == "asgi":
+            client, database = mock_database()
+            seed(database, documents)
+            app = bench_app(database, client)
+
+            async def run():
+                async with running_app(app), asgi_client(app) as http:
+                    return await run_load(http, database, "asgi", documents, args)
+
+            results += asyncio.run(run())
+        else:
+            from pymongo import MongoClient
+
+            database_name = f"portfolio_bench_{uuid.uuid4().hex[:8]}"
+            mongo = MongoClient(args.mongo_url)
+            seed(mongo[database_name], documents)
+            process, base_url = start_uvicorn(database_name, args.mongo_url)
+            try:
+                async def run():
+                    limits = httpx.Limits(max_connections=args.concurrency)
+                    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as http:
+                        return await run_load(http, mongo[database_name], "uvicorn", documents, args)
+
+                results += asyncio.run(run())
+            finally:
+                process.terminate()
+                process.wait()
+                mongo.drop_database(database_name)
+    return results
+
+
+def bench_storage(args) -> List[Dict[str, Any]]:
+    """Per-endpoint latency on each STORAGE_BACKEND, with the response cache and snapshot off"""
+    import tempfile
+    from pymongo import MongoClient
+    from storage import MemoryStore, SQLiteStore
+
+    backends = {"memory": MemoryStore, "sqlite": lambda: SQLiteStore(os.path.join(tempfile.mkdtemp(), "bench.sqlite3"))}
+    mongo = MongoClient(args.mongo_url, serverSelectionTimeoutMS=2000)
+    try:
+        mongo.admin.command("ping")
+        database_name = f"portfolio_bench_{uuid.uuid4().hex[:8]}"
+        backends["mongo"] = lambda: mongo[database_name]
+    except Exception as e:
+        print(f"Skipping mongo: {e}", file=sys.stderr)
+        mongo = None
+
+    results = []
+    for backend, open_store in backends.items():
+        for documents in args.sizes:
+            store = open_store()
+            seed(store, documents)
+            # The app closes its client on shutdown, so give it one of its own
+            app = bench_app(store, MongoClient(args.mongo_url) if backend == "mongo" else None,
+                            cache_max_entries=0, compression_cache_entries=0)
+
+            async def run():
+                async with running_app(app):
+                    # Measure the storage engine, not the in-memory snapshot
+                    content_snapshot = app.state.services.content_snapshot
+                    await content_snapshot.stop()
+                    content_snapshot.sections.clear()
+                    content_snapshot.SECTIONS = ()
+                    async with asgi_client(app) as http:
+                        return await run_load(http, store, backend, documents, args)
+
+            for result in asyncio.run(run()):
+                results.append({"backend": backend, **result})
+            if backend == "mongo":
+                mongo.drop_database(database_name)
+    return results
+
+
+def bench_coldstart(args) -> List[Dict[str, Any]]:
+    """Import time of server.py and time from process start to the first successful requests"""
+    import statistics
+    import tempfile
+    from pymongo import MongoClient
+
+    backend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+    backends = {"memory": {}, "sqlite": {"SQLITE_PATH": os.path.join(tempfile.mkdtemp(), "coldstart.sqlite3")}}
+    try:
+        MongoClient(args.mongo_url, serverSelectionTimeoutMS=2000).admin.command("ping")
+        backends["mongo"] = {"MONGO_URL": args.mongo_url, "MONGO_DB_NAME": f"portfolio_bench_{uuid.uuid4().hex[:8]}"}
+    except Exception as e:
+        print(f"Skipping mongo: {e}", file=sys.stderr)
+
+    imports = []
+    for _ in range(args.rounds):
+        output = subprocess.run([sys.executable, "-c", "import time; started = time.perf_counter(); import server; "
+                                 "print(time.perf_counter() - started)"],
+                                cwd=backend_dir, capture_output=True, text=True, check=True).stdout
+        imports.append(float(output) * 1000)
+    results = [{"measure": "import", "median_ms": round(statistics.median(imports), 1), "max_ms": round(max(imports), 1)}]
+
+    for backend, extra_env in backends.items():
+        timings: Dict[str, List[float]] = {"live": [], "ready": [], "first_list": []}
+        for _ in range(args.rounds):
+            port = free_port()
+            env = {**os.environ, **extra_env, "STORAGE_BACKEND": backend, "SNAPSHOT_DIR": tempfile.mkdtemp()}
+            started = time.perf_counter()
+            process = subprocess.Popen([sys.executable, "server.py", "--port", str(port)], cwd=backend_dir, env=env,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                pending = {"live": "/api/health/live", "ready": "/api/health/ready", "first_list": "/api/projects"}
+                deadline = time.monotonic() + 60
+                with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as http:
+                    while pending and time.monotonic() < deadline:
+                        for name, path in list(pending.items()):
+                            try:
+                                if http.get(path).status_code == 200:
+                                    timings[name].append((time.perf_counter() - started) * 1000)
+                                    del pending[name]
+                            except httpx.TransportError:
+                                break
+                        time.sleep(0.005)
+                if pending:
+                    raise RuntimeError(f"{backend}: no successful response from {', '.join(pending)} within 60s")
+            finally:
+                process.terminate()
+                process.wait()
+        for name, samples in timings.items():
+            results.append({"measure": f"time_to_{name}", "backend": backend,
+                            "median_ms": round(statistics.median(samples), 1), "max_ms": round(max(samples), 1)})
+    return results
+
+
+def client_process(base_url: str, path: str, total: int, concurrency: int) -> Dict[str, Any]:
+    """One load generator process, so the client side is not the bottleneck"""
+    async def run():
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as http:
+            return await drive(http, lambda h: h.get(path), total, concurrency)
+    return asyncio.run(run())
+
+
+def bench_workers(args) -> List[Dict[str, Any]]:
+    """req/s of GET /api/projects as uvicorn worker processes are added"""
+    import multiprocessing
+    from pymongo import MongoClient
+
+    database_name = f"portfolio_bench_{uuid.uuid4().hex[:8]}"
+    mongo = MongoClient(args.mongo_url)
+    seed(mongo[database_name], args.sizes[0])
+    path = "/api/projects?limit=100"
+    results = []
+    try:
+        for workers in args.worker_counts:
+            process, base_url = start_uvicorn(database_name, args.mongo_url, workers=workers)
+            try:
+                httpx.get(base_url + path)
+                with multiprocessing.Pool(args.clients) as pool:
+                    started = time.perf_counter()
+                    runs = pool.starmap(client_process, [(base_url, path, args.requests, args.concurrency)] * args.clients)
+                    elapsed = time.perf_counter() - started
+            finally:
+                process.terminate()
+                process.wait()
+            results.append({
+                "workers": workers,
+                "requests": args.requests * args.clients,
+                "errors": sum(run["errors"] for run in runs),
+                "req_per_s": round(args.requests * args.clients / elapsed, 1),
+                "p99_ms": max(run["p99_ms"] for run in runs),
+            })
+    finally:
+        mongo.drop_database(database_name)
+
+    baseline = results[0]["req_per_s"] / results[0]["workers"]
+    for result in results:
+        result["scaling_efficiency"] = round(result["req_per_s"] / (baseline * result["workers"]), 2)
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> List[Dict[str, Any]]:
+    """Percent change in req/s and p99 against a previous --output file"""
+    with open(baseline_path) as f:
+        baseline = {(r.get("target"), r.get("endpoint"), r.get("documents")): r for r in json.load(f)["results"]}
+    changes = []
+    for result in results:
+        before = baseline.get((result.get("target"), result.get("endpoint"), result.get("documents")))
+        if not before:
+            continue
+        changes.append({
+            "target": result["target"],
+            "endpoint": result["endpoint"],
+            "documents": result["documents"],
+            "req_per_s_change_pct": round((result["req_per_s"] / before["req_per_s"] - 1) * 100, 1),
+            "p99_change_pct": round((result["p99_ms"] / before["p99_ms"] - 1) * 100, 1),
+        })
+    return changes
+
+
+BENCHMARKS = {
+    "concurrency": bench_concurrency,
+    "indexes": bench_indexes,
+    "serialization": bench_serialization,
+    "compression": bench_compression,
+    "load": bench_load,
+    "workers": bench_workers,
+    "storage": bench_storage,
+    "coldstart": bench_coldstart,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated per-query database latency")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--documents", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--sizes", type=int, nargs="+", default=None,
+                        help="items per collection (serialization: 1000 10000, compression: 20 100, load: 1000 100000)")
+    parser.add_argument("--target", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--endpoints", nargs="+", default=None)
+    parser.add_argument("--worker-counts", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=4, help="load generator processes (workers benchmark)")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--compare", help="previous --output file to diff against")
+    parser.add_argument("--rounds", type=int, default=None, help="repetitions (coldstart: 5, otherwise 20)")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017/"))
+    args = parser.parse_args()
+
+    if args.rounds is None:
+        args.rounds = 5 if args.benchmark == "coldstart" else 20
+    if args.sizes is None:
+        args.sizes = {"load": [1_000, 100_000], "compression": [20, 100], "storage": [1_000, 10_000]}.get(args.benchmark, [1_000, 10_000])
+
+    results = BENCHMARKS[args.benchmark](args)
+    report = {"benchmark": args.benchmark, "results": results}
+    if args.compare:
+        report["compare"] = compare(results, args.compare)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,83 @@
 """
 Portfolio Backend API Test Suite
 Tests all FastAPI endpoints for the portfolio website
+
+Usage: python backend_test.py                      (sequentially, against the server at BACKEND_URL)
+       python backend_test.py --isolated [--backend memory|sqlite|mongo] [--mongo-url URL]
+
+--isolated runs every check concurrently against the app in-process (httpx ASGI transport),
+backed by a throwaway database: the in-memory store, a temporary SQLite file, or a
+portfolio_test_<random> Mongo database. The database and temporary directories are
+removed afterwards, so nothing the tests create is left behind. Checks that need the app's
+internals, or an app started with different settings, only run with --isolated.
 """
 
-import requests
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import gzip
+import io
 import json
+import os
+import shutil
 import sys
-from datetime import datetime
-from typing import Dict, Any
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+import httpx
 
 # Backend URL from environment
 BACKEND_URL = "http://localhost:8001"
 API_BASE = f"{BACKEND_URL}/api"
 
+# The client address each test presents through X-Forwarded-For, so every test has its own rate limit buckets
+CLIENT_ADDRESS: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("client_address", default=None)
+
 class PortfolioAPITester:
-    def __init__(self):
+    TESTS = [
+        "test_health_check",
+        "test_projects_get",
+        "test_projects_post",
+        "test_certifications_get",
+        "test_certifications_post",
+        "test_artwork_get",
+        "test_artwork_post",
+        "test_about_get",
+        "test_about_put",
+        "test_contact_post",
+        "test_contact_get",
+        "test_error_handling",
+        "test_pagination",
+        "test_conditional_get",
+        "test_bulk_create",
+        "test_contact_dedup",
+        "test_search",
+        "test_stats",
+        "test_rate_limit",
+        "test_event_retention",
+        "test_contact_queue_full",
+        "test_export",
+        "test_metrics",
+        "test_health_probes",
+        "test_portfolio",
+        "test_snapshot",
+        "test_static_export",
+        "test_compression",
+        "test_media",
+        "test_events",
+    ]
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None, app: Any = None):
+        self.client = client
+        self.app = app  # the in-process app under --isolated, for checks that need its internals
+        if client is not None:
+            client.event_hooks["request"].append(self.identify)
         self.test_results = []
+        self.timings: Dict[str, float] = {}
         self.created_ids = {
             'projects': [],
             'certifications': [],
@@ -24,6 +86,12 @@ class PortfolioAPITester:
             'contact': []
         }
     
+    async def identify(self, request: httpx.Request):
+        """Present the current test's client address; only servers that trust this hop as a proxy use it"""
+        address = CLIENT_ADDRESS.get()
+        if address and "x-forwarded-for" not in request.headers:
+            request.headers["X-Forwarded-For"] = address
+    
     def log_test(self, test_name: str, success: bool, message: str, response_data: Any = None):
         """Log test results"""
         status = "✅ PASS" if success else "❌ FAIL"
@@ -36,10 +104,10 @@ class PortfolioAPITester:
             'response_data': response_data
         })
     
-    def test_health_check(self):
+    async def test_health_check(self):
         """Test health check endpoint"""
         try:
-            response = requests.get(f"{API_BASE}/health", timeout=10)
+            response = await self.client.get("/api/health")
             
             if response.status_code == 200:
                 data = response.json()
@@ -53,18 +121,18 @@ class PortfolioAPITester:
         except Exception as e:
             self.log_test("Health Check", False, f"Connection error: {str(e)}")
     
-    def test_projects_get(self):
+    async def test_projects_get(self):
         """Test GET /api/projects"""
         try:
             # Test getting all projects
-            response = requests.get(f"{API_BASE}/projects", timeout=10)
+            response = await self.client.get("/api/projects")
             
             if response.status_code == 200:
                 projects = response.json()
                 self.log_test("GET Projects", True, f"Retrieved {len(projects)} projects")
                 
                 # Test featured projects filter
-                response_featured = requests.get(f"{API_BASE}/projects?featured_only=true", timeout=10)
+                response_featured = await self.client.get("/api/projects?featured_only=true")
                 if response_featured.status_code == 200:
                     featured_projects = response_featured.json()
                     self.log_test("GET Featured Projects", True, f"Retrieved {len(featured_projects)} featured projects")
@@ -76,7 +144,7 @@ class PortfolioAPITester:
         except Exception as e:
             self.log_test("GET Projects", False, f"Error: {str(e)}")
     
-    def test_projects_post(self):
+    async def test_projects_post(self):
         """Test POST /api/projects"""
         try:
             project_data = {
@@ -90,7 +158,7 @@ class PortfolioAPITester:
                 "featured": True
             }
             
-            response = requests.post(f"{API_BASE}/projects", json=project_data, timeout=10)
+            response = await self.client.post("/api/projects", json=project_data)
             
             if response.status_code == 200:
                 created_project = response.json()
@@ -100,7 +168,7 @@ class PortfolioAPITester:
                     self.log_test("POST Project", True, f"Created project with ID: {project_id}")
                     
                     # Test getting the specific project
-                    get_response = requests.get(f"{API_BASE}/projects/{project_id}", timeout=10)
+                    get_response = await self.client.get(f"/api/projects/{project_id}")
                     if get_response.status_code == 200:
                         self.log_test("GET Project by ID", True, f"Retrieved project: {created_project.get('title')}")
                     else:
@@ -113,10 +181,10 @@ class PortfolioAPITester:
         except Exception as e:
             self.log_test("POST Project", False, f"Error: {str(e)}")
     
-    def test_certifications_get(self):
+    async def test_certifications_get(self):
         """Test GET /api/certifications"""
         try:
-            response = requests.get(f"{API_BASE}/certifications", timeout=10)
+            response = await self.client.get("/api/certifications")
             
             if response.status_code == 200:
                 certifications = response.json()
@@ -127,7 +195,7 @@ class PortfolioAPITester:
         except Exception as e:
             self.log_test("GET Certifications", False, f"Error: {str(e)}")
     
-    def test_certifications_post(self):
+    async def test_certifications_post(self):
         """Test POST /api/certifications"""
         try:
             cert_data = {
@@ -139,7 +207,7 @@ class PortfolioAPITester:
                 "badge_url": "https://images.credly.com/size/340x340/images/ml-badge.png"
             }
             
-            response = requests.post(f"{API_BASE}/certifications", json=cert_data, timeout=10)
+            response = await self.client.post("/api/certifications", json=cert_data)
             
             if response.status_code == 200:
                 created_cert = response.json()
@@ -155,10 +223,10 @@ class PortfolioAPITester:
         except Exception as e:
             self.log_test("POST Certification", False, f"Error: {str(e)}")
     
-    def test_artwork_get(self):
+    async def test_artwork_get(self):
         """Test GET /api/artwork"""
         try:
-            response = requests.get(f"{API_BASE}/artwork", timeout=10)
+            response = await self.client.get("/api/artwork")
             
             if response.status_code == 200:
                 artwork = response.json()
@@ -169,7 +237,7 @@ class PortfolioAPITester:
         except Exception as e:
             self.log_test("GET Artwork", False, f"Error: {str(e)}")
     
-    def test_artwork_post(self):
+    async def test_artwork_post(self):
         """Test POST /api/artwork"""
         try:
             artwork_data = {
@@ -181,7 +249,7 @@ class PortfolioAPITester:
                 "year_created": "2024"
             }
             
-            response = requests.post(f"{API_BASE}/artwork", json=artwork_data, timeout=10)
+            response = await self.client.post("/api/artwork", json=artwork_data)
             
             if response.status_code == 200:
                 created_artwork = response.json()
@@ -197,10 +265,10 @@ class PortfolioAPITester:
         except Exception as e:
             self.log_test("POST Artwork", False, f"Error: {str(e)}")
     
-    def test_about_get(self):
+    async def test_about_get(self):
         """Test GET /api/about"""
         try:
-            response = requests.get(f"{API_BASE}/about", timeout=10)
+            response = await self.client.get("/api/about")
             
             if response.status_code == 200:
                 about = response.json()
@@ -211,7 +279,7 @@ class PortfolioAPITester:
         except Exception as e:
             self.log_test("GET About", False, f"Error: {str(e)}")
     
-    def test_about_put(self):
+    async def test_about_put(self):
         """Test PUT /api/about"""
         try:
             about_data = {
@@ -231,7 +299,7 @@ class PortfolioAPITester:
                 "resume_url": "https://johnyohannan.dev/resume.pdf"
             }
             
-            response = requests.put(f"{API_BASE}/about", json=about_data, timeout=10)
+            response = await self.client.put("/api/about", json=about_data)
             
             if response.status_code == 200:
                 updated_about = response.json()
@@ -242,7 +310,7 @@ class PortfolioAPITester:
         except Exception as e:
             self.log_test("PUT About", False, f"Error: {str(e)}")
     
-    def test_contact_post(self):
+    async def test_contact_post(self):
         """Test POST /api/contact"""
         try:
             contact_data = {
@@ -252,7 +320,7 @@ class PortfolioAPITester:
                 "message": "Hi John, I came across your portfolio and I'm impressed with your AI projects. We have an exciting machine learning project at TechCorp and would love to discuss a potential collaboration. Could we schedule a call this week?"
             }
             
-            response = requests.post(f"{API_BASE}/contact", json=contact_data, timeout=10)
+            response = await self.client.post("/api/contact", json=contact_data)
             
             if response.status_code == 200:
                 created_message = response.json()
@@ -268,10 +336,10 @@ class PortfolioAPITester:
         except Exception as e:
             self.log_test("POST Contact", False, f"Error: {str(e)}")
     
-    def test_contact_get(self):
+    async def test_contact_get(self):
         """Test GET /api/contact"""
         try:
-            response = requests.get(f"{API_BASE}/contact", timeout=10)
+            response = await self.client.get("/api/contact")
             
             if response.status_code == 200:
                 messages = response.json()
@@ -282,11 +350,11 @@ class PortfolioAPITester:
         except Exception as e:
             self.log_test("GET Contact Messages", False, f"Error: {str(e)}")
     
-    def test_error_handling(self):
+    async def test_error_handling(self):
         """Test error handling for invalid requests"""
         try:
             # Test invalid project ID
-            response = requests.get(f"{API_BASE}/projects/invalid-id", timeout=10)
+            response = await self.client.get("/api/projects/invalid-id")
             if response.status_code == 404:
                 self.log_test("Error Handling - Invalid Project ID", True, "Correctly returned 404 for invalid project ID")
             else:
@@ -294,7 +362,7 @@ class PortfolioAPITester:
             
             # Test invalid POST data
             invalid_project = {"title": ""}  # Missing required fields
-            response = requests.post(f"{API_BASE}/projects", json=invalid_project, timeout=10)
+            response = await self.client.post("/api/projects", json=invalid_project)
             if response.status_code in [400, 422]:
                 self.log_test("Error Handling - Invalid POST Data", True, f"Correctly returned {response.status_code} for invalid data")
             else:
@@ -303,25 +371,750 @@ class PortfolioAPITester:
         except Exception as e:
             self.log_test("Error Handling", False, f"Error: {str(e)}")
     
-    def run_all_tests(self):
-        """Run all API tests"""
+    def sample_project(self, marker: str, **fields) -> Dict[str, Any]:
+        """A valid project tagged with a unique marker, so concurrent tests can find their own items"""
+        return {"title": f"Test project {marker}", "description": f"Created by backend_test.py ({marker})",
+                "technologies": ["Python"], "category": f"test-{marker}", **fields}
+    
+    async def test_pagination(self):
+        """Test keyset pagination with X-Next-Cursor and fields= projection"""
+        try:
+            marker = uuid.uuid4().hex[:8]
+            response = await self.client.post("/api/projects/bulk?ordered=false",
+                                              json=[self.sample_project(marker) for _ in range(3)])
+            if response.status_code != 200:
+                self.log_test("Pagination", False, f"Bulk setup failed: HTTP {response.status_code}: {response.text}")
+                return
+            created = [result['id'] for result in response.json()['results'] if result['status'] == 'created']
+            self.created_ids['projects'].extend(created)
+            title = self.sample_project(marker)['title']
+            
+            seen, pages, cursor = [], 0, None
+            while True:
+                params = {"limit": 2, "fields": "id,title"}
+                if cursor:
+                    params["after"] = cursor
+                page = await self.client.get("/api/projects", params=params)
+                if page.status_code != 200:
+                    self.log_test("Pagination", False, f"HTTP {page.status_code} on page {pages + 1}: {page.text}")
+                    return
+                items = page.json()
+                pages += 1
+                if any(set(item) - {"id", "title"} for item in items):
+                    self.log_test("Pagination - Field Projection", False, f"Unexpected fields: {items[0]}")
+                    return
+                seen.extend((item['id'], item['title']) for item in items)
+                cursor = page.headers.get("x-next-cursor")
+                if not cursor:
+                    break
+            
+            if len(seen) != len(set(seen)):
+                self.log_test("Pagination", False, "A project appeared on more than one page")
+            elif sum(1 for _, seen_title in seen if seen_title == title) != len(created):
+                self.log_test("Pagination", False, f"Did not see all {len(created)} created projects over {pages} pages")
+            else:
+                self.log_test("Pagination", True, f"Walked {len(seen)} projects over {pages} pages with fields=id,title")
+                
+        except Exception as e:
+            self.log_test("Pagination", False, f"Error: {str(e)}")
+    
+    async def test_conditional_get(self):
+        """Test ETag revalidation: an unchanged list answers 304"""
+        try:
+            # Concurrent tests write certifications too, so a changed ETag in between is retried
+            for _ in range(5):
+                response = await self.client.get("/api/certifications")
+                etag = response.headers.get("etag")
+                if response.status_code != 200 or not etag:
+                    self.log_test("Conditional GET", False, f"HTTP {response.status_code}, ETag {etag!r}")
+                    return
+                revalidated = await self.client.get("/api/certifications", headers={"If-None-Match": etag})
+                if revalidated.status_code == 304:
+                    self.log_test("Conditional GET", True, f"Unchanged list answered 304 for ETag {etag}")
+                    return
+                if revalidated.status_code != 200:
+                    break
+            self.log_test("Conditional GET", False, f"Expected 304, got {revalidated.status_code}")
+                
+        except Exception as e:
+            self.log_test("Conditional GET", False, f"Error: {str(e)}")
+    
+    async def test_bulk_create(self):
+        """Test POST /api/projects/bulk in ordered and unordered mode"""
+        try:
+            marker = uuid.uuid4().hex[:8]
+            items = [self.sample_project(marker), {"title": ""}, self.sample_project(marker)]
+            
+            ordered = await self.client.post("/api/projects/bulk?ordered=true", json=items)
+            result = ordered.json() if ordered.status_code == 200 else {}
+            if result.get('inserted') == 1 and result.get('stopped_at') == 1 and len(result.get('results', [])) == 2:
+                self.log_test("Bulk Create - Ordered", True, "Stopped at the invalid item after inserting 1")
+            else:
+                self.log_test("Bulk Create - Ordered", False, f"HTTP {ordered.status_code}: {ordered.text}")
+            
+            unordered = await self.client.post("/api/projects/bulk?ordered=false", json=items)
+            result = unordered.json() if unordered.status_code == 200 else {}
+            if result.get('inserted') == 2 and result.get('failed') == 1 and result.get('stopped_at') is None:
+                self.log_test("Bulk Create - Unordered", True, "Inserted 2 and reported 1 failure")
+            else:
+                self.log_test("Bulk Create - Unordered", False, f"HTTP {unordered.status_code}: {unordered.text}")
+            
+            for response in (ordered, unordered):
+                if response.status_code == 200:
+                    self.created_ids['projects'].extend(
+                        r['id'] for r in response.json()['results'] if r['status'] == 'created')
+                
+        except Exception as e:
+            self.log_test("Bulk Create", False, f"Error: {str(e)}")
+    
+    async def test_contact_dedup(self):
+        """Test that queued contact messages are written once, and a repeat is not stored again"""
+        try:
+            marker = uuid.uuid4().hex[:8]
+            message = {"name": "Dedup Test", "email": "dedup@example.com", "subject": f"Dedup {marker}",
+                       "message": f"Sent twice by backend_test.py ({marker})"}
+            first = await self.client.post("/api/contact", json=message)
+            second = await self.client.post("/api/contact", json=message)
+            if first.status_code != 200 or second.status_code != 200:
+                self.log_test("Contact Dedup", False, f"HTTP {first.status_code}/{second.status_code}")
+                return
+            self.created_ids['contact'].append(first.json().get('id'))
+            
+            # Messages are written behind the response by the ingest queue; wait for a flush
+            stored = []
+            for _ in range(50):
+                messages = (await self.client.get("/api/contact")).json()
+                stored = [m for m in messages if m.get('subject') == message['subject']]
+                if stored:
+                    break
+                await asyncio.sleep(0.1)
+            await asyncio.sleep(0.2)  # give a wrongly queued duplicate time to land as well
+            messages = (await self.client.get("/api/contact")).json()
+            stored = [m for m in messages if m.get('subject') == message['subject']]
+            
+            queue = await self.client.get("/api/contact/queue")
+            if len(stored) == 1 and queue.status_code == 200:
+                self.log_test("Contact Dedup", True, f"Stored once; queue depth {queue.json().get('depth')}")
+            else:
+                self.log_test("Contact Dedup", False, f"Stored {len(stored)} copies, queue HTTP {queue.status_code}")
+                
+        except Exception as e:
+            self.log_test("Contact Dedup", False, f"Error: {str(e)}")
+    
+    async def test_search(self):
+        """Test GET /api/search ranking and facets"""
+        try:
+            marker = uuid.uuid4().hex[:8]
+            token = f"zephyr{marker}"
+            created = await self.client.post("/api/projects", json=self.sample_project(
+                marker, title=f"Searchable {token}", technologies=["Rust", "WebAssembly"]))
+            if created.status_code != 200:
+                self.log_test("Search", False, f"Setup failed: HTTP {created.status_code}: {created.text}")
+                return
+            self.created_ids['projects'].append(created.json()['id'])
+            
+            response = await self.client.get("/api/search", params={"q": token, "type": "projects"})
+            if response.status_code != 200:
+                self.log_test("Search", False, f"HTTP {response.status_code}: {response.text}")
+                return
+            data = response.json()
+            titles = [result['title'] for result in data['results']]
+            categories = {facet['value'] for facet in data['facets']['category']}
+            if data['total'] == 1 and titles == [f"Searchable {token}"] and f"test-{marker}" in categories:
+                self.log_test("Search", True, f"Found the project by {token!r} with category facet")
+            else:
+                self.log_test("Search", False, f"Unexpected result: total {data['total']}, titles {titles}")
+                
+        except Exception as e:
+            self.log_test("Search", False, f"Error: {str(e)}")
+    
+    async def test_stats(self):
+        """Test GET /api/stats counters after a write"""
+        try:
+            marker = uuid.uuid4().hex[:8]
+            created = await self.client.post("/api/projects", json=self.sample_project(marker))
+            if created.status_code != 200:
+                self.log_test("Stats", False, f"Setup failed: HTTP {created.status_code}: {created.text}")
+                return
+            self.created_ids['projects'].append(created.json()['id'])
+            
+            response = await self.client.get("/api/stats")
+            if response.status_code != 200:
+                self.log_test("Stats", False, f"HTTP {response.status_code}: {response.text}")
+                return
+            projects = response.json()['projects']
+            counts = {facet['value']: facet['count'] for facet in projects['facets']['category']}
+            if projects['total'] >= 1 and counts.get(f"test-{marker}") == 1:
+                self.log_test("Stats", True, f"{projects['total']} projects counted, new category counted once")
+            else:
+                self.log_test("Stats", False, f"Category count {counts.get(f'test-{marker}')}, total {projects['total']}")
+                
+        except Exception as e:
+            self.log_test("Stats", False, f"Error: {str(e)}")
+    
+    async def test_rate_limit(self):
+        """Test that a client past its burst gets 429 with Retry-After while other clients are unaffected"""
+        try:
+            limits = (await self.client.get("/api/rate-limits")).json()
+            if not limits.get('per_minute'):
+                self.log_test("Rate Limit", True, "Rate limiting is disabled on this server, skipped")
+                return
+            # An empty bulk request takes a token without writing anything
+            statuses = []
+            for _ in range(limits['burst'] + 1):
+                response = await self.client.post("/api/artwork/bulk", json=[])
+                statuses.append(response.status_code)
+                if response.status_code != 200:
+                    break
+            if statuses[-1] != 429 or len(statuses) != limits['burst'] + 1 or not response.headers.get("retry-after"):
+                self.log_test("Rate Limit", False, f"Statuses {statuses}, Retry-After {response.headers.get('retry-after')!r}")
+                return
+            self.log_test("Rate Limit", True, f"429 after {limits['burst']} requests, Retry-After {response.headers['retry-after']}s")
+            
+            if limits.get('trusted_proxies'):
+                other = await self.client.post("/api/artwork/bulk", json=[], headers={"X-Forwarded-For": "192.0.2.1"})
+                if other.status_code == 200:
+                    self.log_test("Rate Limit - Per Client", True, "Another forwarded client still got through")
+                else:
+                    self.log_test("Rate Limit - Per Client", False, f"Another client got HTTP {other.status_code}")
+                
+        except Exception as e:
+            self.log_test("Rate Limit", False, f"Error: {str(e)}")
+    
+    async def test_event_retention(self):
+        """Test that the embedded stores drop events older than the events TTL index on a later write"""
+        try:
+            if self.app is None:
+                self.log_test("Event Retention", True, "Needs an in-process app to plant an expired event, skipped")
+                return
+            if self.app.state.services.settings.storage_backend == "mongo":
+                self.log_test("Event Retention", True, "mongod's own TTL monitor expires events, skipped")
+                return
+            database = self.app.state.services.database
+            events = database.events.collection
+            marker = uuid.uuid4().hex[:8]
+            # seq 0 is never streamed, so these stand-ins stay out of subscribers' way
+            expired = datetime.utcnow() - timedelta(seconds=events.ttl_fields["created_at"] + 60)
+            await database.events.insert_one({"seq": 0, "topic": "test", "data": {"id": f"old-{marker}"},
+                                              "created_at": expired})
+            events.expired_at = 0.0  # as if the TTL interval had passed
+            await database.events.insert_one({"seq": 0, "topic": "test", "data": {"id": f"new-{marker}"},
+                                              "created_at": datetime.utcnow()})
+            old = await database.events.find_one({"data.id": f"old-{marker}"})
+            new = await database.events.find_one({"data.id": f"new-{marker}"})
+            if old is None and new is not None:
+                self.log_test("Event Retention", True, "The expired event was removed, the recent one kept")
+            else:
+                self.log_test("Event Retention", False, f"Expired event kept: {old is not None}, recent kept: {new is not None}")
+                
+        except Exception as e:
+            self.log_test("Event Retention", False, f"Error: {str(e)}")
+    
+    async def test_contact_queue_full(self):
+        """Test that a full contact queue answers 503 with Retry-After, and the message can be resent later"""
+        try:
+            if self.app is None:
+                self.log_test("Contact Queue Full", True, "Needs an in-process app with a tiny queue, skipped")
+                return
+            message = {"name": "Queue Test", "email": "queue@example.com", "subject": "Queue full",
+                       "message": "Sent to a full queue by backend_test.py"}
+            async with isolated_client("memory", "", contact_queue_max_size=0) as (app, client):
+                rejected = await client.post("/api/contact", json=message)
+                app.state.services.contact_queue.max_size = 10
+                resent = await client.post("/api/contact", json=message)
+                queue = (await client.get("/api/contact/queue")).json()
+            if rejected.status_code != 503 or not rejected.headers.get("retry-after"):
+                self.log_test("Contact Queue Full", False, f"Expected 503 with Retry-After, got HTTP {rejected.status_code}")
+            elif resent.status_code == 200 and queue.get("rejected") == 1 and queue.get("enqueued") == 1:
+                self.log_test("Contact Queue Full", True, f"503 with Retry-After {rejected.headers['retry-after']}s; "
+                              "the resent message was queued, not taken for a duplicate")
+            else:
+                self.log_test("Contact Queue Full", False, f"Resend HTTP {resent.status_code}, queue {queue}")
+                
+        except Exception as e:
+            self.log_test("Contact Queue Full", False, f"Error: {str(e)}")
+    
+    async def test_export(self):
+        """Test GET /api/export/{collection} streams NDJSON oldest first, and `since` skips older items"""
+        try:
+            marker = uuid.uuid4().hex[:8]
+            created = []
+            for index in range(2):
+                response = await self.client.post("/api/projects", json=self.sample_project(marker, title=f"Export {index}"))
+                if response.status_code != 200:
+                    self.log_test("Export", False, f"Setup failed: HTTP {response.status_code}: {response.text}")
+                    return
+                created.append(response.json())
+                self.created_ids['projects'].append(created[-1]['id'])
+            
+            response = await self.client.get("/api/export/projects")
+            lines = [json.loads(line) for line in response.text.splitlines() if line]
+            # Reads report the stored document's id, so the items are recognised by title
+            mine = [item['title'] for item in lines if item.get('category') == f"test-{marker}"]
+            if response.status_code != 200 or not response.headers.get("content-type", "").startswith("application/x-ndjson"):
+                self.log_test("Export", False, f"HTTP {response.status_code}, content type {response.headers.get('content-type')}")
+                return
+            if mine != ["Export 0", "Export 1"] or any('_id' in item for item in lines):
+                self.log_test("Export", False, f"Expected both items oldest first, got {mine}")
+                return
+            self.log_test("Export", True, f"{len(lines)} projects streamed as NDJSON, oldest first")
+            
+            since = await self.client.get("/api/export/projects", params={"since": created[0]['created_at']})
+            mine = [item['title'] for item in map(json.loads, filter(None, since.text.splitlines()))
+                    if item.get('category') == f"test-{marker}"]
+            unknown = await self.client.get("/api/export/secrets")
+            if mine == ["Export 1"] and unknown.status_code == 404:
+                self.log_test("Export - Since", True, "Only the newer item was exported; unknown collections are 404")
+            else:
+                self.log_test("Export - Since", False, f"Got {mine}, unknown collection HTTP {unknown.status_code}")
+                
+        except Exception as e:
+            self.log_test("Export", False, f"Error: {str(e)}")
+    
+    def metric_value(self, text: str, sample: str) -> float:
+        """A sample's value in a Prometheus text exposition, 0 if it is absent"""
+        for line in text.splitlines():
+            if line.startswith(sample + " "):
+                return float(line.rsplit(" ", 1)[1])
+        return 0.0
+    
+    async def test_metrics(self):
+        """Test GET /metrics labels requests by route template and keeps streams out of the latency histogram"""
+        try:
+            requests = 'http_requests_total{method="GET",route="/api/projects/{project_id}",status="404"}'
+            latency = 'http_request_duration_seconds_count{method="GET",route="/api/export/{collection_name}"}'
+            streams = 'http_stream_duration_seconds_count{method="GET",route="/api/export/{collection_name}"}'
+            before = (await self.client.get("/metrics")).text
+            for _ in range(2):
+                await self.client.get(f"/api/projects/missing-{uuid.uuid4().hex}")
+            await self.client.get("/api/export/certifications")
+            response = await self.client.get("/metrics")
+            if response.status_code != 200 or not response.headers.get("content-type", "").startswith("text/plain"):
+                self.log_test("Metrics", False, f"HTTP {response.status_code}, content type {response.headers.get('content-type')}")
+                return
+            text = response.text
+            # Every worker process keeps its own metrics, so counts are only checked in-process
+            expected = 2 if self.app is not None else 0
+            counted = self.metric_value(text, requests) - self.metric_value(before, requests)
+            if "# TYPE http_request_duration_seconds histogram" not in text or counted < expected or "missing-" in text:
+                self.log_test("Metrics", False, f"404s counted {counted} times under the route template")
+                return
+            self.log_test("Metrics", True, "Requests counted by route template and status")
+            
+            if self.app is None:
+                return
+            if self.metric_value(text, streams) > self.metric_value(before, streams) and self.metric_value(text, latency) == 0:
+                self.log_test("Metrics - Streams", True, "The export was timed as a stream, not as request latency")
+            else:
+                self.log_test("Metrics - Streams", False, "The export was not timed as a stream")
+                
+        except Exception as e:
+            self.log_test("Metrics", False, f"Error: {str(e)}")
+    
+    async def test_health_probes(self):
+        """Test the liveness and readiness probes, including 503 while warm-up is still running"""
+        try:
+            live = await self.client.get("/api/health/live")
+            ready = await self.client.get("/api/health/ready")
+            if live.status_code != 200 or ready.status_code != 200 or ready.json().get('status') != 'ready':
+                self.log_test("Health Probes", False, f"Live HTTP {live.status_code}, ready HTTP {ready.status_code}: {ready.text}")
+                return
+            self.log_test("Health Probes", True, f"Alive and ready, last ping {(ready.json().get('ping') or {}).get('latency_ms')} ms")
+            
+            if self.app is None:
+                return
+            async with isolated_client("memory", "") as (app, client):
+                app.state.services.warm_up = {"status": "pending"}  # as if warm-up were still building
+                warming = await client.get("/api/health/ready")
+                live = await client.get("/api/health/live")
+            if warming.status_code == 503 and warming.json().get('status') == 'warming up' and live.status_code == 200:
+                self.log_test("Health Probes - Warm-up", True, "Not ready during warm-up while still alive")
+            else:
+                self.log_test("Health Probes - Warm-up", False, f"Ready HTTP {warming.status_code}, live HTTP {live.status_code}")
+                
+        except Exception as e:
+            self.log_test("Health Probes", False, f"Error: {str(e)}")
+    
+    async def test_portfolio(self):
+        """Test GET /api/portfolio returns every section in one response, honouring per-section limits and ETags"""
+        try:
+            marker = uuid.uuid4().hex[:8]
+            created = await self.client.post("/api/projects", json=self.sample_project(marker, featured=True))
+            if created.status_code != 200:
+                self.log_test("Portfolio", False, f"Setup failed: HTTP {created.status_code}: {created.text}")
+                return
+            self.created_ids['projects'].append(created.json()['id'])
+            
+            params = {"featured_only": "true", "projects_limit": 100, "certifications_limit": 1, "artwork_limit": 1}
+            response = await self.client.get("/api/portfolio", params=params)
+            if response.status_code != 200:
+                self.log_test("Portfolio", False, f"HTTP {response.status_code}: {response.text}")
+                return
+            data = response.json()
+            projects = data['projects']
+            if not data['about'].get('bio') or len(data['certifications']) > 1 or len(data['artwork']) > 1 or \
+                    not all(project['featured'] for project in projects) or \
+                    f"test-{marker}" not in {project['category'] for project in projects}:
+                self.log_test("Portfolio", False, f"Unexpected sections: {len(projects)} projects, "
+                              f"{len(data['certifications'])} certifications, {len(data['artwork'])} artwork")
+                return
+            self.log_test("Portfolio", True, f"All sections in one response, cursors {sorted(data['cursors'])}")
+            
+            # Concurrent tests write these sections too, so a changed ETag in between is retried
+            for _ in range(5):
+                response = await self.client.get("/api/portfolio", params=params)
+                revalidated = await self.client.get("/api/portfolio", params=params,
+                                                    headers={"If-None-Match": response.headers.get("etag", "")})
+                if revalidated.status_code != 200:
+                    break
+            if revalidated.status_code == 304:
+                self.log_test("Portfolio - Conditional GET", True, "Unchanged portfolio answered 304")
+            else:
+                self.log_test("Portfolio - Conditional GET", False, f"Expected 304, got {revalidated.status_code}")
+                
+        except Exception as e:
+            self.log_test("Portfolio", False, f"Error: {str(e)}")
+    
+    async def test_snapshot(self):
+        """Test that list pages come from the snapshot, which is rebuilt after writes and warm-starts from disk"""
+        try:
+            if self.app is None:
+                self.log_test("Snapshot", True, "Needs in-process apps sharing a database, skipped")
+                return
+            marker = uuid.uuid4().hex[:8]
+            workdir = tempfile.mkdtemp(prefix="portfolio-test-")
+            shared = {"sqlite_path": os.path.join(workdir, "portfolio.sqlite3"),
+                      "snapshot_dir": os.path.join(workdir, "snapshot"), "snapshot_debounce": 0.05}
+            try:
+                async with isolated_client("sqlite", "", **shared) as (app, client):
+                    created = await client.post("/api/projects", json=self.sample_project(marker))
+                    # The rebuild is debounced behind the write; meanwhile pages fall back to the database
+                    for _ in range(50):
+                        await asyncio.sleep(0.1)
+                        snapshot = (await client.get("/api/cache/stats")).json()['snapshot']
+                        if not snapshot['rebuilding']:
+                            break
+                    served = snapshot['served']
+                    titles = [project['title'] for project in (await client.get("/api/projects")).json()]
+                    after_write = (await client.get("/api/cache/stats")).json()['snapshot']
+                async with isolated_client("sqlite", "", **shared) as (app, client):
+                    restarted = (await client.get("/api/cache/stats")).json()['snapshot']
+                    warm_titles = [project['title'] for project in (await client.get("/api/projects")).json()]
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+            
+            title = self.sample_project(marker)['title']
+            if created.status_code != 200 or title not in titles or after_write['served'] <= served:
+                self.log_test("Snapshot", False, f"New project served from the snapshot: {title in titles}, "
+                              f"snapshot pages {served} -> {after_write['served']}")
+            elif restarted['warm_starts'] == 4 and restarted['builds'] == 0 and title in warm_titles:
+                self.log_test("Snapshot", True, "Rebuilt after a write, and every section warm-started from disk after a restart")
+            else:
+                self.log_test("Snapshot", False, f"After a restart: {restarted['warm_starts']} warm starts, "
+                              f"{restarted['builds']} builds, project listed: {title in warm_titles}")
+                
+        except Exception as e:
+            self.log_test("Snapshot", False, f"Error: {str(e)}")
+    
+    async def test_static_export(self):
+        """Test that exported responses are served precompressed from disk until their content changes"""
+        try:
+            if self.app is None:
+                self.log_test("Static Export", True, "Needs an in-process app with an export directory, skipped")
+                return
+            marker = uuid.uuid4().hex[:8]
+            workdir = tempfile.mkdtemp(prefix="portfolio-test-")
+            directory = os.path.join(workdir, "static")
+            os.makedirs(directory)
+            try:
+                async with isolated_client("memory", "", static_export_dir=directory) as (app, client):
+                    await client.post("/api/projects", json=self.sample_project(marker, title=f"Exported {marker}"))
+                    live = await client.get("/api/projects")
+                    export = app.state.services.static_export
+                    manifest = await export.export(app)
+                    export.reload()
+                    files = set(os.listdir(directory))
+                    exported = await client.get("/api/projects", headers={"Accept-Encoding": "gzip"})
+                    await client.post("/api/projects", json=self.sample_project(marker, title=f"Later {marker}"))
+                    changed = await client.get("/api/projects", headers={"Accept-Encoding": "gzip"})
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+            
+            entry = manifest['routes'].get("/api/projects", {})
+            if not {"manifest.json", "nginx.conf", entry.get('file'), f"{entry.get('file')}.gz"} <= files:
+                self.log_test("Static Export", False, f"Export wrote {sorted(files)}")
+            elif live.headers.get("x-static-export") or exported.headers.get("x-static-export") != "hit" or \
+                    exported.headers.get("content-encoding") != "gzip" or exported.json() != live.json():
+                self.log_test("Static Export", False, f"Exported page: {dict(exported.headers)}")
+            elif changed.headers.get("x-static-export") or f"Later {marker}" not in {p['title'] for p in changed.json()}:
+                self.log_test("Static Export", False, "A stale export was served after the projects changed")
+            else:
+                self.log_test("Static Export", True, f"{len(manifest['routes'])} responses exported; served gzipped "
+                              "from disk, and live again after a write")
+                
+        except Exception as e:
+            self.log_test("Static Export", False, f"Error: {str(e)}")
+    
+    async def fetch_raw(self, path: str, encoding: str) -> Tuple[httpx.Response, bytes]:
+        """GET a response and its body as sent, without decoding it"""
+        async with self.client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+            return response, b"".join([chunk async for chunk in response.aiter_raw()])
+    
+    def decompress(self, body: bytes, encoding: str) -> Optional[bytes]:
+        """Decode a compressed body, or None when the codec is not installed here"""
+        if encoding == "gzip":
+            return gzip.decompress(body)
+        with contextlib.suppress(ImportError):
+            if encoding == "br":
+                import brotli
+                return brotli.decompress(body)
+            import zstandard
+            return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+        return None
+    
+    async def test_compression(self):
+        """Test negotiated br/zstd/gzip compression of large and streamed responses, and none for small ones"""
+        try:
+            marker = uuid.uuid4().hex[:8]
+            items = [self.sample_project(marker, description="Compressible " * 100) for _ in range(3)]
+            bulk = await self.client.post("/api/projects/bulk", json=items)
+            if bulk.status_code != 200:
+                self.log_test("Compression", False, f"Setup failed: HTTP {bulk.status_code}: {bulk.text}")
+                return
+            self.created_ids['projects'].extend(r['id'] for r in bulk.json()['results'] if r['status'] == 'created')
+            
+            served, failures = [], []
+            for encoding in ("br", "zstd", "gzip"):
+                for path in ("/api/projects?limit=100", "/api/export/projects"):
+                    response, raw = await self.fetch_raw(path, encoding)
+                    used = response.headers.get("content-encoding")
+                    if used is None and encoding != "gzip":
+                        continue  # not installed on the server
+                    body = self.decompress(raw, encoding) if used == encoding else None
+                    if used != encoding or "Accept-Encoding" not in response.headers.get("vary", ""):
+                        failures.append(f"{path} asked for {encoding}, got {used}")
+                    elif body is not None and f"test-{marker}".encode() not in body:
+                        failures.append(f"{path} did not decode as {encoding}")
+                    elif path.startswith("/api/projects"):
+                        served.append(encoding)
+            small, raw = await self.fetch_raw("/api/health/live", "gzip")
+            if small.headers.get("content-encoding"):
+                failures.append(f"a {len(raw)} byte response was compressed")
+            
+            if failures:
+                self.log_test("Compression", False, "; ".join(failures))
+            else:
+                self.log_test("Compression", True, f"Pages and streams compressed with {', '.join(served)}; small bodies left alone")
+                
+        except Exception as e:
+            self.log_test("Compression", False, f"Error: {str(e)}")
+    
+    def sample_png(self, width: int, height: int) -> Optional[bytes]:
+        """A random-coloured PNG, so every run uploads a new image; None without Pillow"""
+        try:
+            from PIL import Image
+        except ImportError:
+            return None
+        buffer = io.BytesIO()
+        Image.new("RGB", (width, height), tuple(os.urandom(3))).save(buffer, "PNG")
+        return buffer.getvalue()
+    
+    async def upload_png(self, client: httpx.AsyncClient, data: bytes) -> Dict[str, Any]:
+        response = await client.post("/api/media", files={"file": ("test.png", data, "image/png")})
+        response.raise_for_status()
+        return response.json()
+    
+    async def test_media(self):
+        """Test image upload, resized derivatives, revalidation, image info on content and LRU eviction"""
+        try:
+            data = self.sample_png(800, 600)
+            if data is None:
+                self.log_test("Media", True, "Pillow is not installed here to draw a test image, skipped")
+                return
+            media = await self.upload_png(self.client, data)
+            if (media['width'], media['height']) != (800, 600) or not media['blurhash']:
+                self.log_test("Media", False, f"Unexpected upload result: {media}")
+                return
+            
+            widths = (await self.client.get("/api/cache/stats")).json()['media']['widths']
+            expected = next((w for w in widths if w >= 300), widths[-1])
+            expected = (expected, expected * 3 // 4)
+            resized = await self.client.get(media['url'], params={"w": 300, "fmt": "png"})
+            from PIL import Image
+            size = Image.open(io.BytesIO(resized.content)).size if resized.status_code == 200 else None
+            etag = resized.headers.get("etag")
+            revalidated = await self.client.get(media['url'], params={"w": 300, "fmt": "png"},
+                                                headers={"If-None-Match": etag or ""})
+            if size != expected or "immutable" not in resized.headers.get("cache-control", "") or \
+                    revalidated.status_code != 304:
+                self.log_test("Media", False, f"Derivative size {size}, HTTP {resized.status_code}, "
+                              f"revalidation HTTP {revalidated.status_code}")
+                return
+            self.log_test("Media", True, f"800x600 upload served at the next configured width ({size[0]}x{size[1]}), "
+                          "304 on revalidation")
+            
+            marker = uuid.uuid4().hex[:8]
+            project = await self.client.post("/api/projects", json=self.sample_project(marker, image_url=media['url']))
+            image = project.json().get('image') if project.status_code == 200 else None
+            if project.status_code == 200:
+                self.created_ids['projects'].append(project.json()['id'])
+            if image and image['width'] == 800 and image['blurhash'] == media['blurhash']:
+                self.log_test("Media - Image Info", True, "A project pointing at the upload got its size and BlurHash")
+            else:
+                self.log_test("Media - Image Info", False, f"Project image info {image}")
+            
+            if self.app is None:
+                return
+            async with isolated_client("memory", "", media_cache_max_bytes=1) as (app, client):
+                media = await self.upload_png(client, data)
+                for width in (160, 320, 480):
+                    await client.get(media['url'], params={"w": width, "fmt": "png"})
+                stats = (await client.get("/api/cache/stats")).json()['media']
+            # With room for none, each new render evicts everything but itself
+            if stats['renders'] == 3 and stats['evictions'] == 2 and stats['derivatives'] == 1:
+                self.log_test("Media - Eviction", True, "Least recently used derivatives evicted past the cache size")
+            else:
+                self.log_test("Media - Eviction", False, f"Media stats {stats}")
+                
+        except Exception as e:
+            self.log_test("Media", False, f"Error: {str(e)}")
+    
+    async def stream_text(self, path: str, headers: Dict[str, str]):
+        """Yield a streamed GET's text as it arrives; the in-process transport would buffer it until the end"""
+        if self.app is None:
+            async with self.client.stream("GET", path, headers=headers) as response:
+                async for text in response.aiter_text():
+                    yield text
+            return
+        chunks: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        requested = False
+        
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+        
+        async def send(message):
+            if message["type"] == "http.response.body":
+                await chunks.put(message.get("body", b""))
+        
+        route, _, query = path.partition("?")
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                 "scheme": "http", "path": route, "raw_path": route.encode(), "root_path": "",
+                 "query_string": query.encode(), "client": ("127.0.0.1", 0), "server": ("portfolio.test", 80),
+                 "headers": [(b"host", b"portfolio.test")] + [(k.lower().encode(), v.encode()) for k, v in headers.items()]}
+        task = asyncio.create_task(self.app(scope, receive, send))
+        try:
+            while True:
+                yield (await chunks.get()).decode()
+        finally:
+            disconnected.set()
+            await asyncio.wait_for(task, 5)
+    
+    @contextlib.asynccontextmanager
+    async def subscribe(self, path: str, headers: Optional[Dict[str, str]] = None):
+        """Open an SSE stream and yield the list its events are appended to as they arrive"""
+        events: List[Dict[str, str]] = []
+        opened = asyncio.Event()
+        
+        async def read():
+            buffer = ""
+            async for text in self.stream_text(path, headers or {}):
+                opened.set()  # the stream starts with its retry hint
+                *frames, buffer = (buffer + text).split("\n\n")
+                for frame in frames:
+                    fields = dict(line.split(": ", 1) for line in frame.splitlines() if ": " in line and not line.startswith(":"))
+                    if "event" in fields:
+                        events.append({**fields, "data": json.loads(fields.get("data", "{}"))})
+        
+        task = asyncio.create_task(read())
+        try:
+            await asyncio.wait_for(opened.wait(), 10)
+            yield events
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+    
+    async def wait_until(self, check: Callable[[], bool], timeout: float = 10) -> bool:
+        deadline = time.monotonic() + timeout
+        while not check() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return check()
+    
+    async def test_events(self):
+        """Test /api/events: per-item bulk events, topic filters, private contact events and Last-Event-ID resume"""
+        try:
+            marker = uuid.uuid4().hex[:8]
+            titles = {f"Event {marker} {index}" for index in range(2)}
+            message = {"name": "Events Test", "email": "events@example.com", "subject": f"Events {marker}",
+                       "message": f"Sent by backend_test.py ({marker})"}
+            
+            async with self.subscribe("/api/events?topics=projects") as projects, \
+                    self.subscribe("/api/events?topics=contact") as contact:
+                sent = await self.client.post("/api/contact", json=message)
+                
+                def mine():
+                    return [e for e in contact if e['data'].get('id') == sent.json().get('id')]
+                if sent.status_code != 200 or not await self.wait_until(lambda: bool(mine())):
+                    self.log_test("Events - Contact", False, f"No contact.created event (HTTP {sent.status_code})")
+                    return
+                private = sorted(mine()[0]['data']) == ["created_at", "id"]
+                self.log_test("Events - Contact", private, f"contact.created carries {sorted(mine()[0]['data'])}")
+                
+                bulk = await self.client.post("/api/projects/bulk",
+                                              json=[self.sample_project(marker, title=title) for title in sorted(titles)])
+                if bulk.status_code == 200:
+                    self.created_ids['projects'].extend(r['id'] for r in bulk.json()['results'] if r['status'] == 'created')
+                
+                def created():
+                    return [e for e in projects if e['event'] == 'projects.created' and e['data'].get('title') in titles]
+                received = await self.wait_until(lambda: len(created()) == 2)
+                topics = {e['event'].split('.')[0] for e in projects}
+            if not received or topics != {"projects"}:
+                self.log_test("Events - Bulk", False, f"Got {len(created())} of 2 item events; topics seen {topics}")
+                return
+            self.log_test("Events - Bulk", True, "One projects.created event per bulk item; the projects stream saw no contact events")
+            
+            # A client that missed both events reconnects from the id it saw before them
+            last_seen = int(created()[0]['id']) - 1
+            async with self.subscribe("/api/events?topics=projects", {"Last-Event-ID": str(last_seen)}) as resumed:
+                replayed = await self.wait_until(lambda: {e['data'].get('title') for e in resumed} >= titles)
+            if replayed and int(resumed[0]['id']) > last_seen:
+                self.log_test("Events - Resume", True, f"Both events replayed after Last-Event-ID {last_seen}")
+            else:
+                self.log_test("Events - Resume", False, f"Replayed {[e['event'] for e in resumed]}")
+                
+        except Exception as e:
+            self.log_test("Events", False, f"Error: {str(e)}")
+    
+    async def timed(self, name: str):
+        """Run one test as its own client address, recording its wall time"""
+        CLIENT_ADDRESS.set(f"198.51.100.{self.TESTS.index(name) + 1}")
+        started = time.perf_counter()
+        try:
+            await getattr(self, name)()
+        finally:
+            self.timings[name] = time.perf_counter() - started
+
+    async def run_all_tests(self, concurrent: bool = False, target: str = API_BASE):
+        """Run all API tests, one after another or all at once"""
         print("🚀 Starting Portfolio Backend API Tests")
-        print(f"📡 Testing API at: {API_BASE}")
+        print(f"📡 Testing API at: {target}")
         print("=" * 60)
         
         # Test all endpoints
-        self.test_health_check()
-        self.test_projects_get()
-        self.test_projects_post()
-        self.test_certifications_get()
-        self.test_certifications_post()
-        self.test_artwork_get()
-        self.test_artwork_post()
-        self.test_about_get()
-        self.test_about_put()
-        self.test_contact_post()
-        self.test_contact_get()
-        self.test_error_handling()
+        started = time.perf_counter()
+        if concurrent:
+            await asyncio.gather(*(self.timed(name) for name in self.TESTS))
+        else:
+            for name in self.TESTS:
+                await self.timed(name)
+        elapsed = time.perf_counter() - started
         
         # Summary
         print("\n" + "=" * 60)
@@ -340,6 +1133,10 @@ class PortfolioAPITester:
                 if not result['success']:
                     print(f"  • {result['test']}: {result['message']}")
         
+        print(f"\n⏱️  Test timings, slowest first ({elapsed * 1000:.1f} ms total):")
+        for name, seconds in sorted(self.timings.items(), key=lambda item: -item[1]):
+            print(f"  {seconds * 1000:9.1f} ms  {name}")
+        
         print(f"\n📝 Created test data:")
         for category, ids in self.created_ids.items():
             if ids:
@@ -347,13 +1144,64 @@ class PortfolioAPITester:
         
         return passed == total
 
+@contextlib.asynccontextmanager
+async def isolated_client(backend: str, mongo_url: str, **settings):
+    """Start the app in-process on a throwaway database and yield it with a client; everything is removed on exit"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+    import database
+    import server
+
+    workdir = tempfile.mkdtemp(prefix="portfolio-test-")
+    database_name = f"portfolio_test_{uuid.uuid4().hex[:12]}"
+    app = server.create_app(server.Settings(**{
+        "storage_backend": backend,
+        "mongo_url": mongo_url,
+        "mongo_db_name": database_name,
+        "sqlite_path": os.path.join(workdir, "portfolio.sqlite3"),
+        "snapshot_dir": os.path.join(workdir, "snapshot"),
+        "media_dir": os.path.join(workdir, "media"),
+        "static_export_dir": "",
+        "trusted_proxies": "127.0.0.1",  # the in-process transport's address, standing in for nginx
+        "contact_flush_interval": 0.05,
+        **settings,
+    }))
+
+    try:
+        async with app.router.lifespan_context(app):
+            while app.state.services.warm_up.get("status") != "done":
+                await asyncio.sleep(0.01)
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                         base_url="http://portfolio.test", timeout=10) as client:
+                yield app, client
+    finally:
+        # Shutdown flushes queued contact messages, so the database is dropped only after it
+        if backend == "mongo":
+            with contextlib.closing(database.MongoClient(mongo_url, **database.mongo_client_options(mongo_url))) as mongo:
+                mongo.drop_database(database_name)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+async def main() -> bool:
+    parser = argparse.ArgumentParser(description="Portfolio backend API tests")
+    parser.add_argument("--isolated", action="store_true",
+                        help="run the checks concurrently in-process against a throwaway database")
+    parser.add_argument("--backend", choices=["memory", "sqlite", "mongo"], default="memory",
+                        help="storage for --isolated (default: memory)")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017/"))
+    args = parser.parse_args()
+
+    if not args.isolated:
+        async with httpx.AsyncClient(base_url=BACKEND_URL, timeout=10) as client:
+            return await PortfolioAPITester(client).run_all_tests()
+
+    async with isolated_client(args.backend, args.mongo_url) as (app, client):
+        return await PortfolioAPITester(client, app).run_all_tests(concurrent=True, target=f"in-process app ({args.backend})")
+
 if __name__ == "__main__":
-    tester = PortfolioAPITester()
-    success = tester.run_all_tests()
+    success = asyncio.run(main())
     
     if success:
         print("\n🎉 All tests passed! Backend API is working correctly.")
         sys.exit(0)
     else:
         print("\n⚠️  Some tests failed. Check the output above for details.")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -1,6 +1,7 @@
 import React, { useState } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { useArtwork } from '../hooks/useApi';
+import { imageProps } from '../utils/api';
 import { HiX, HiPlus, HiPhotograph, HiZoomIn } from 'react-icons/hi';
 
 const Artwork = () => {
@@ -171,7 +172,7 @@ const Artwork = () => {
                   {/* Image */}
                   <div className="aspect-square overflow-hidden bg-gradient-to-br from-primary-100 to-electric-100 dark:from-primary-900 dark:to-electric-900">
                     <img
-                      src={art.image_url}
+                      {...imageProps(art.image_url, art.image, '(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw')}
                       alt={art.title}
                       className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-110"
                       loading="lazy"
@@ -250,7 +251,7 @@ const Artwork = () => {
               {/* Image */}
               <div className="relative rounded-lg overflow-hidden shadow-2xl">
                 <img
-                  src={selectedArtwork.image_url}
+                  {...imageProps(selectedArtwork.image_url, selectedArtwork.image)}
                   alt={selectedArtwork.title}
                   className="w-full h-auto max-h-[80vh] object-contain"
                 />
@@ -28,24 +28,62 @@ export const useApi = (apiFunction, dependencies = []) => {
   return { data, loading, error, refetch: () => setLoading(true) };
 };
 
+// Fetch the pages after `cursor` and append them, so list hooks return every item
+const loadRemaining = async (response, cursor, fetchPage) => {
+  let data = response.data;
+  while (cursor) {
+    const page = await fetchPage({ after: cursor });
+    data = data.concat(page.data);
+    cursor = page.headers['x-next-cursor'];
+  }
+  return { ...response, data };
+};
+
+const loadList = async (fetchPage) => {
+  const response = await fetchPage({});
+  return loadRemaining(response, response.headers['x-next-cursor'], fetchPage);
+};
+
+// Sections mounted together share one /api/portfolio request instead of four
+let portfolioRequest = null;
+
+const getPortfolioSection = async (section, fetchPage) => {
+  if (!portfolioRequest) {
+    portfolioRequest = apiClient.getPortfolio();
+    portfolioRequest.catch(() => {}).finally(() => {
+      portfolioRequest = null;
+    });
+  }
+  const response = await portfolioRequest;
+  const sectionResponse = { ...response, data: response.data[section] };
+  // The homepage response holds the first page of each list; the rest comes from the section endpoint
+  return fetchPage ? loadRemaining(sectionResponse, response.data.cursors?.[section], fetchPage) : sectionResponse;
+};
+
 // Hook for projects
 export const useProjects = (featuredOnly = false) => {
-  return useApi(() => apiClient.getProjects(featuredOnly), [featuredOnly]);
+  return useApi(
+    () =>
+      featuredOnly
+        ? loadList((params) => apiClient.getProjects(true, params))
+        : getPortfolioSection('projects', (params) => apiClient.getProjects(false, params)),
+    [featuredOnly]
+  );
 };
 
 // Hook for certifications
 export const useCertifications = () => {
-  return useApi(() => apiClient.getCertifications());
+  return useApi(() => getPortfolioSection('certifications', apiClient.getCertifications));
 };
 
 // Hook for artwork
 export const useArtwork = () => {
-  return useApi(() => apiClient.getArtwork());
+  return useApi(() => getPortfolioSection('artwork', apiClient.getArtwork));
 };
 
 // Hook for about information
 export const useAbout = () => {
-  return useApi(() => apiClient.getAbout());
+  return useApi(() => getPortfolioSection('about'));
 };
 
 // Hook for submitting contact form
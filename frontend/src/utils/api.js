@@ -38,27 +38,57 @@ export const apiClient = {
   // Health check
   health: () => api.get('/api/health'),
 
-  // Projects
-  getProjects: (featuredOnly = false) => 
-    api.get(`/api/projects${featuredOnly ? '?featured_only=true' : ''}`),
+  // Every homepage section in one request
+  getPortfolio: (params = {}) => api.get('/api/portfolio', { params }),
+
+  // Projects (lists are paged: pass { after } with the previous page's X-Next-Cursor header)
+  getProjects: (featuredOnly = false, params = {}) =>
+    api.get('/api/projects', { params: featuredOnly ? { ...params, featured_only: true } : params }),
   getProject: (id) => api.get(`/api/projects/${id}`),
   createProject: (data) => api.post('/api/projects', data),
 
   // Certifications
-  getCertifications: () => api.get('/api/certifications'),
+  getCertifications: (params = {}) => api.get('/api/certifications', { params }),
   createCertification: (data) => api.post('/api/certifications', data),
 
   // Artwork
-  getArtwork: () => api.get('/api/artwork'),
+  getArtwork: (params = {}) => api.get('/api/artwork', { params }),
   createArtwork: (data) => api.post('/api/artwork', data),
 
   // About
   getAbout: () => api.get('/api/about'),
   updateAbout: (data) => api.put('/api/about', data),
 
+  // Totals and facet counts per collection, without downloading the lists
+  getStats: () => api.get('/api/stats'),
+
+  // Search (params: q, type, category, technology, year, offset, limit)
+  search: (params = {}) => api.get('/api/search', { params }),
+
   // Contact
   submitContact: (data) => api.post('/api/contact', data),
   getContactMessages: () => api.get('/api/contact'),
+
+  // Live events ("projects.created", "contact.created", ...; "reset" means refetch).
+  // EventSource reconnects by itself and resumes from the last event id it saw.
+  subscribeEvents: (topics = []) =>
+    new EventSource(`${BASE_URL}/api/events${topics.length ? `?topics=${topics.join(',')}` : ''}`),
+};
+
+// <img> attributes for an uploaded image: a srcset of resized derivatives plus its
+// intrinsic size so the browser reserves space before it loads
+const MEDIA_WIDTHS = [320, 640, 960, 1280, 1920];
+
+export const imageProps = (url, image, sizes = '100vw') => {
+  if (!image) return { src: url };
+  const widths = MEDIA_WIDTHS.filter((w) => w < image.width).concat(image.width);
+  return {
+    src: `${BASE_URL}${image.src}?w=${widths[Math.min(1, widths.length - 1)]}`,
+    srcSet: widths.map((w) => `${BASE_URL}${image.src}?w=${w} ${w}w`).join(', '),
+    sizes,
+    width: image.width,
+    height: image.height,
+  };
 };
 
 export default api;
\ No newline at end of file